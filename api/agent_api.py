@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
+from pydantic import BaseModel
+
+from retail_rag_sim.agents.graph import achat
+from retail_rag_sim.retrieval.registry import retriever_stats
+from retail_rag_sim.retrieval.reranker import reranker_ready, reranker_stats, warm_up_reranker
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # load the cross-encoder in the background; chat is served meanwhile
+    warm_up_reranker()
+    yield
+
+
+app = FastAPI(title="Retail RAG Agent API", version="0.1", lifespan=lifespan)
+
+
+class ChatRequest(BaseModel):
+    message: str
+
+
+@app.post("/chat")
+async def chat(req: ChatRequest):
+    return await achat(req.message)
+
+
+@app.get("/healthz")
+def healthz():
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+def readyz(response: Response):
+    """503 until the reranker has finished loading (or failed to, see /status)."""
+    ready = reranker_ready()
+    if not ready:
+        response.status_code = 503
+    return {"ready": ready}
+
+
+@app.get("/status")
+def status():
+    return {"reranker": reranker_stats(), "retriever": retriever_stats()}
@@ -0,0 +1,138 @@
+"""
+Cascade reranking trade-off: recall@k against the full cross-encoder rerank, latency and skip
+rate over a grid of RERANK_SKIP_MARGIN x RERANK_CASCADE_KEEP.
+
+    python benchmarks/bench_cascade.py --n 20000 --candidates 20 --queries 200
+    python benchmarks/bench_cascade.py --margins 0.2,0.35,0.5 --keeps 4,6,10 --json cascade.json
+
+Uses the configured cross-encoder when it loads. Otherwise a lexical + hashing-embedding stand-in
+scores the pairs, sleeping --fake-pair-ms per pair to mimic model cost (reported as "scorer").
+Score caching and micro-batching are off so every configuration pays for its own pairs.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from synthetic import (
+    corpus_documents,
+    corpus_vectors,
+    synthetic_corpus,
+    synthetic_queries,
+    synthetic_vocab,
+)
+
+from retail_rag_sim.llms.fake import HashingEmbeddings
+from retail_rag_sim.retrieval.bm25 import BM25Retriever, tokenize
+from retail_rag_sim.retrieval.reranker import RerankService, load_cross_encoder
+from retail_rag_sim.retrieval.retriever import HybridRetriever, doc_key
+from retail_rag_sim.retrieval.vector_index import DenseVectorRetriever, ExactIndex
+
+
+class StandInCrossEncoder:
+    """Term-frequency overlap plus embedding cosine, with a simulated per-pair cost."""
+
+    def __init__(self, emb: HashingEmbeddings, pair_ms: float):
+        self.emb = emb
+        self.pair_ms = pair_ms
+
+    def predict(self, pairs: List[Tuple[str, str]], **_) -> List[float]:
+        time.sleep(self.pair_ms * len(pairs) / 1000.0)
+        out = []
+        for q, d in pairs:
+            d_toks = tokenize(d)
+            tf = sum(d_toks.count(t) for t in set(tokenize(q))) / max(len(d_toks), 1)
+            cos = float(np.dot(self.emb.embed_query(q), self.emb.embed_query(d)))
+            out.append(10.0 * tf + cos)
+        return out
+
+
+def recall_at_k(truth: List[str], got: List[str]) -> float:
+    return len(set(truth) & set(got)) / max(len(truth), 1)
+
+
+def run(n: int, candidates: int, n_queries: int, k: int, margins: Sequence[float], keeps: Sequence[int],
+        pair_ms: float) -> Dict:
+    emb = HashingEmbeddings(latency_ms=0)
+    vocab = synthetic_vocab()
+    ids = synthetic_corpus(n, vocab)
+    docs = corpus_documents(ids, vocab)
+    retr = HybridRetriever(bm25=BM25Retriever.from_documents(docs),
+                           vector_retriever=DenseVectorRetriever(ExactIndex(corpus_vectors(ids, vocab, emb)), emb, docs),
+                           top_k=candidates)
+    queries = synthetic_queries(vocab, n_queries)
+    retrieved = [retr.invoke_with_scores(q) for q in queries]
+
+    scorer = "cross-encoder"
+    try:
+        model = load_cross_encoder()
+    except Exception as e:
+        scorer = f"stand-in ({pair_ms} ms/pair; cross-encoder unavailable: {type(e).__name__})"
+        model = StandInCrossEncoder(emb, pair_ms)
+
+    def service(**cascade) -> RerankService:
+        return RerankService(loader=lambda: model, cache_size=0, batch_window_ms=0, **cascade)
+
+    def measure(svc: RerankService) -> Tuple[List[List[str]], float]:
+        top, elapsed = [], 0.0
+        for q, scored in zip(queries, retrieved, strict=True):
+            cand = [d for d, _ in scored]
+            fused = [s["fused"] for _, s in scored]
+            t0 = time.perf_counter()
+            ranked = svc.rerank(q, cand, top_k=k, fused_scores=fused)
+            elapsed += time.perf_counter() - t0
+            top.append([doc_key(d) for d, _ in ranked])
+        return top, elapsed * 1000 / len(queries)
+
+    truth, full_ms = measure(service(cascade=False))
+    fused_top = [[doc_key(d) for d, _ in scored[:k]] for scored in retrieved]
+    results: Dict = {"n": n, "candidates": candidates, "queries": n_queries, "k": k, "scorer": scorer,
+                     "full": {"ms_per_query": round(full_ms, 3), f"recall@{k}": 1.0},
+                     "fused_only": {f"recall@{k}": round(float(np.mean([recall_at_k(t, g) for t, g in
+                                                                         zip(truth, fused_top, strict=True)])), 4)},
+                     "grid": []}
+    for margin in margins:
+        for keep in keeps:
+            svc = service(cascade=True, skip_margin=margin, cascade_keep=keep)
+            top, ms = measure(svc)
+            st = svc.stats()
+            results["grid"].append({
+                "skip_margin": margin, "keep": keep, "ms_per_query": round(ms, 3),
+                f"recall@{k}": round(float(np.mean([recall_at_k(t, g) for t, g in zip(truth, top, strict=True)])), 4),
+                "skip_rate": round(st["cascade_skipped_margin"] / max(st["cascade_requests"], 1), 4),
+                "pairs_per_query": round(st["pairs_scored"] / len(queries), 2),
+                "speedup": round(full_ms / ms, 2) if ms > 0 else None,
+            })
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--n", type=int, default=20_000)
+    ap.add_argument("--candidates", type=int, default=20, help="retriever top_k fed to the reranker")
+    ap.add_argument("--queries", type=int, default=100)
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--margins", default="0.1,0.2,0.35,0.5,1.01", help="1.01 never skips")
+    ap.add_argument("--keeps", default="4,6,10")
+    ap.add_argument("--fake-pair-ms", type=float, default=1.0)
+    ap.add_argument("--json", help="write results to this path")
+    args = ap.parse_args()
+
+    results = run(args.n, args.candidates, args.queries, args.k,
+                  [float(m) for m in args.margins.split(",")], [int(x) for x in args.keeps.split(",")],
+                  args.fake_pair_ms)
+    print(f"scorer: {results['scorer']}")
+    print(f"full rerank        ms_per_query={results['full']['ms_per_query']}")
+    print(f"fused order only   recall@{args.k}={results['fused_only'][f'recall@{args.k}']}")
+    for row in results["grid"]:
+        print("  ".join(f"{k}={v}" for k, v in row.items()))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Recall / latency of the quantized vector backends against the exact index.
+
+    python benchmarks/bench_quantized.py --n 100000 --dim 384 --queries 200
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from retail_rag_sim.retrieval.quantized import (
+    BinaryIndex,
+    Int8Index,
+    quantize_binary,
+    quantize_int8,
+)
+from retail_rag_sim.retrieval.vector_index import ExactIndex, IVFIndex, normalize
+
+
+def synthetic_embeddings(n: int, dim: int, n_clusters: int = 64, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors (closer to real text embeddings than isotropic noise)."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim)).astype(np.float32)
+    assign = rng.integers(0, n_clusters, size=n)
+    return normalize(centers[assign] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32))
+
+
+def recall_at_k(truth: list, got: list) -> float:
+    return float(np.mean([len(set(t[0].tolist()) & set(g[0].tolist())) / max(len(t[0]), 1)
+                          for t, g in zip(truth, got, strict=True)]))
+
+
+def run(n: int, dim: int, n_queries: int, k: int, oversample: int) -> dict:
+    vectors = synthetic_embeddings(n, dim)
+    rng = np.random.default_rng(1)
+    queries = normalize(vectors[rng.integers(0, n, size=n_queries)]
+                        + 0.3 * rng.normal(size=(n_queries, dim)).astype(np.float32))
+
+    codes8, scale = quantize_int8(vectors)
+    indexes = {
+        "exact": ExactIndex(vectors),
+        "ivf": IVFIndex.build(vectors),
+        "int8": Int8Index(codes8, scale, vectors, oversample=oversample),
+        "binary": BinaryIndex(quantize_binary(vectors), vectors, oversample=oversample),
+    }
+    bytes_per_row = {"exact": 4 * dim, "ivf": 4 * dim, "int8": dim, "binary": dim // 8}
+
+    results: dict = {"n": n, "dim": dim, "queries": n_queries, "k": k, "oversample": oversample, "backends": {}}
+    truth = None
+    for name, index in indexes.items():
+        t0 = time.perf_counter()
+        hits = [index.search(q, k) for q in queries]
+        ms = (time.perf_counter() - t0) * 1000 / n_queries
+        truth = truth if truth is not None else hits
+        results["backends"][name] = {
+            "ms_per_query": round(ms, 3),
+            f"recall@{k}": round(recall_at_k(truth, hits), 4),
+            "first_pass_bytes_per_row": bytes_per_row[name],
+        }
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--n", type=int, default=50_000)
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--queries", type=int, default=100)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--oversample", type=int, default=8)
+    ap.add_argument("--json", help="write results to this path")
+    args = ap.parse_args()
+
+    results = run(args.n, args.dim, args.queries, args.k, args.oversample)
+    for name, row in results["backends"].items():
+        print(f"{name:8s} " + "  ".join(f"{k}={v}" for k, v in row.items()))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Reranker input shaping: CPU time per rerank and padded tokens with length bucketing
+(RERANK_BUCKET_SIZE) and passage truncation (RERANK_MAX_PASSAGE_TOKENS) vs one padded batch.
+
+    python benchmarks/bench_rerank_padding.py --candidates 64 --queries 50
+
+Uses the configured cross-encoder when it loads. Otherwise a stand-in whose cost is proportional
+to padded tokens per forward pass (--fake-token-us) is used, which is the cost model being tuned.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import Dict, List
+
+import numpy as np
+from langchain_core.documents import Document
+from synthetic import synthetic_queries, synthetic_vocab
+
+from retail_rag_sim.retrieval.reranker import RerankService, load_cross_encoder
+
+
+class PaddedCostCrossEncoder:
+    """Sleeps for (bucket size x longest pair in the bucket) tokens, like a padded forward pass."""
+
+    def __init__(self, token_us: float):
+        self.token_us = token_us
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        for lo in range(0, len(pairs), batch_size):
+            bucket = pairs[lo:lo + batch_size]
+            longest = max(len(q) + len(p) for q, p in bucket) / 4
+            time.sleep(len(bucket) * longest * self.token_us / 1e6)
+        return [float(len(set(q.split()) & set(p.split()))) for q, p in pairs]
+
+
+def variable_length_docs(n: int, vocab: List[str], seed: int = 0) -> List[Document]:
+    """Chunks of 20-220 words, like splitter output where most chunks are full and a few are tails."""
+    rng = np.random.default_rng(seed)
+    lengths = np.where(rng.random(n) < 0.7, rng.integers(150, 220, n), rng.integers(20, 150, n))
+    words = np.asarray(vocab, dtype=object)
+    return [Document(page_content=" ".join(words[(rng.zipf(1.2, size=m) - 1) % len(vocab)]),
+                     metadata={"chunk_id": f"c{i}"}) for i, m in enumerate(lengths)]
+
+
+def run(candidates: int, n_queries: int, token_us: float) -> Dict:
+    vocab = synthetic_vocab()
+    docs = variable_length_docs(candidates, vocab)
+    queries = synthetic_queries(vocab, n_queries)
+
+    scorer = "cross-encoder"
+    try:
+        model = load_cross_encoder()
+    except Exception as e:
+        scorer = f"stand-in ({token_us} us/padded token; cross-encoder unavailable: {type(e).__name__})"
+        model = PaddedCostCrossEncoder(token_us)
+
+    configs = {
+        "one_batch_untruncated": {"bucket_size": candidates, "max_passage_tokens": 0},
+        "bucketed_untruncated": {"bucket_size": 16, "max_passage_tokens": 0},
+        "bucketed_256": {"bucket_size": 16, "max_passage_tokens": 256},
+        "bucketed_128": {"bucket_size": 16, "max_passage_tokens": 128},
+    }
+    results: Dict = {"candidates": candidates, "queries": n_queries, "scorer": scorer, "configs": {}}
+    for name, cfg in configs.items():
+        svc = RerankService(loader=lambda: model, cache_size=0, batch_window_ms=0, tokens_dir=None, **cfg)
+        svc.rerank(queries[0], docs)  # load + measure chunk lengths once, as ingest would have
+        t0, c0 = time.perf_counter(), time.process_time()
+        for q in queries:
+            svc.rerank(q, docs)
+        st = svc.stats()
+        results["configs"][name] = {
+            **cfg,
+            "ms_per_rerank": round((time.perf_counter() - t0) * 1000 / n_queries, 3),
+            "cpu_ms_per_rerank": round((time.process_time() - c0) * 1000 / n_queries, 3),
+            "padding_ratio": round(st["padding_ratio"], 3),
+            "truncated_passages": st["truncated_passages"],
+        }
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--candidates", type=int, default=64)
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("--fake-token-us", type=float, default=2.0)
+    ap.add_argument("--json", help="write results to this path")
+    args = ap.parse_args()
+
+    results = run(args.candidates, args.queries, args.fake_token_us)
+    print(f"scorer: {results['scorer']}")
+    for name, row in results["configs"].items():
+        print(f"{name:24s} " + "  ".join(f"{k}={v}" for k, v in row.items()))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
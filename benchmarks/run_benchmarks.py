@@ -0,0 +1,275 @@
+"""
+End-to-end benchmark suite: per-stage latency (p50/p95) at synthetic corpus sizes, JSON output,
+and regression checks against a stored baseline. Runs offline: the graph uses LLM_BACKEND=fake
+and every index lives in a scratch directory.
+
+    python benchmarks/run_benchmarks.py --sizes 1000,10000,100000 --json results.json
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json --tolerance 0.25
+    python benchmarks/run_benchmarks.py --save-baseline benchmarks/baseline.json
+
+Stages: retriever@N (HybridRetriever.invoke, BM25 + exact dense leg), bm25_build@N, rerank,
+run_select, call_api (in-process dummy API, skipped without uvicorn), redact_pii, ingest
+(chunks/s into Chroma with hashing embeddings), chat (full graph) and chat.<node> per-node time.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parents[1]
+WORKDIR = Path(tempfile.mkdtemp(prefix="rag-bench-"))
+
+# Modules read their config at import time, so the environment is pinned before importing them
+os.environ["LLM_BACKEND"] = "fake"
+os.environ["CHROMA_DIR"] = str(WORKDIR / "chroma")
+os.environ["BM25_DIR"] = str(WORKDIR / "bm25")
+os.environ["VECTOR_DIR"] = str(WORKDIR / "vectors")
+os.environ["RERANK_TOKENS_DIR"] = str(WORKDIR / "rerank_tokens")
+os.environ["EMBED_CACHE_PATH"] = ""
+os.environ["ANSWER_CACHE_ENABLED"] = "false"
+os.environ.setdefault("VECTOR_BACKEND", "exact")
+os.environ.setdefault("DB_URL", f"sqlite:///{REPO / 'data' / 'retail.db'}")
+os.environ.setdefault("DUMMY_API_BASE_URL", "http://127.0.0.1:8765")
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import platform  # noqa: E402
+import shutil  # noqa: E402
+import socket  # noqa: E402
+import sys  # noqa: E402
+import threading  # noqa: E402
+import time  # noqa: E402
+from typing import Any, Callable, Dict, List, Optional, Sequence  # noqa: E402
+
+import numpy as np  # noqa: E402
+from langchain_core.documents import Document  # noqa: E402
+from synthetic import (  # noqa: E402
+    corpus_documents,
+    corpus_vectors,
+    synthetic_corpus,
+    synthetic_queries,
+    synthetic_vocab,
+)
+
+from retail_rag_sim.llms.fake import HashingEmbeddings  # noqa: E402
+from retail_rag_sim.retrieval.bm25 import BM25Retriever  # noqa: E402
+from retail_rag_sim.retrieval.retriever import HybridRetriever  # noqa: E402
+from retail_rag_sim.retrieval.vector_index import DenseVectorRetriever, ExactIndex  # noqa: E402
+
+QUESTIONS = [
+    "What is the return window for in-store pickup?",
+    "Can I exchange an opened laptop?",
+    "How much tax did I pay on order R-10002 and what was the total?",
+    "Do you price match online deals?",
+    "Can someone else pick up my order?",
+]
+
+
+def summarize(samples_ms: Sequence[float], **extra: Any) -> Dict[str, Any]:
+    a = np.asarray(samples_ms, dtype=np.float64)
+    return {"n": int(a.size), "p50_ms": round(float(np.percentile(a, 50)), 3),
+            "p95_ms": round(float(np.percentile(a, 95)), 3), "mean_ms": round(float(a.mean()), 3), **extra}
+
+
+def time_calls(fn: Callable[[Any], Any], inputs: Sequence[Any], warmup: int = 2) -> List[float]:
+    for x in inputs[:warmup]:
+        fn(x)
+    out = []
+    for x in inputs:
+        t0 = time.perf_counter()
+        fn(x)
+        out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+
+# -------------------------
+# Stages
+# -------------------------
+def bench_retriever(sizes: Sequence[int], n_queries: int, results: Dict[str, Any]) -> List[Document]:
+    emb = HashingEmbeddings(latency_ms=0)
+    vocab = synthetic_vocab()
+    queries = synthetic_queries(vocab, n_queries)
+    sample_docs: List[Document] = []
+    for n in sizes:
+        ids = synthetic_corpus(n, vocab)
+        docs = corpus_documents(ids, vocab)
+        vectors = corpus_vectors(ids, vocab, emb)
+        t0 = time.perf_counter()
+        bm25 = BM25Retriever.from_documents(docs)
+        results[f"bm25_build@{n}"] = summarize([(time.perf_counter() - t0) * 1000])
+        retr = HybridRetriever(bm25=bm25, vector_retriever=DenseVectorRetriever(ExactIndex(vectors), emb, docs))
+        results[f"retriever@{n}"] = summarize(time_calls(retr.invoke, queries), chunks=n)
+        print(f"retriever@{n}: {results[f'retriever@{n}']}", flush=True)
+        if not sample_docs:
+            sample_docs = retr.invoke(queries[0])
+    return sample_docs
+
+
+def bench_rerank(docs: List[Document], n_queries: int, results: Dict[str, Any]) -> None:
+    from retail_rag_sim.retrieval import reranker
+    queries = synthetic_queries(synthetic_vocab(), n_queries)
+    samples = time_calls(lambda q: reranker.rerank(q, docs), queries)
+    stats = reranker.reranker_stats()
+    results["rerank"] = summarize(samples, candidates=len(docs), model_loaded=stats["model_loaded"],
+                                  cache_hit_rate=round(stats["cache_hit_rate"], 3))
+
+
+def bench_run_select(n: int, results: Dict[str, Any]) -> None:
+    from retail_rag_sim.tools.db import run_select
+    sql = "SELECT * FROM orders WHERE order_id = 'R-10002'"
+    results["run_select"] = summarize(time_calls(lambda _: run_select(sql), range(n)))
+
+
+def _start_dummy_api() -> Optional[str]:
+    try:
+        import uvicorn
+    except ImportError:
+        return "uvicorn not installed"
+    sys.path.insert(0, str(REPO))
+    from api.dummy_api import app
+    url = os.environ["DUMMY_API_BASE_URL"]
+    host, port = url.split("://", 1)[1].split(":")
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=int(port), log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    for _ in range(100):
+        try:
+            socket.create_connection((host, int(port)), timeout=0.1).close()
+            return None
+        except OSError:
+            time.sleep(0.05)
+    return "dummy API did not start"
+
+
+def bench_call_api(n: int, results: Dict[str, Any]) -> bool:
+    skipped = _start_dummy_api()
+    if skipped:
+        results["call_api"] = {"skipped": skipped}
+        return False
+    from retail_rag_sim.tools.api import call_api
+    results["call_api"] = summarize(time_calls(lambda _: call_api("/store_hours", {"store_id": "ST-CHI-01"}), range(n)))
+    return True
+
+
+def bench_redact_pii(n: int, results: Dict[str, Any]) -> None:
+    from retail_rag_sim.tools.pii import redact_pii
+    text = ("Customer jordan.rivera@example.com called from (312) 555-0199 about order R-10001. " * 20)
+    results["redact_pii"] = summarize(time_calls(redact_pii, [text] * n), chars=len(text))
+
+
+def bench_ingest(n_files: int, results: Dict[str, Any]) -> None:
+    from langchain_chroma import Chroma
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    from retail_rag_sim.llms.factory import get_embeddings
+    from retail_rag_sim.retrieval import ingest
+
+    docs_dir = WORKDIR / "docs"
+    docs_dir.mkdir(parents=True, exist_ok=True)
+    for src in (REPO / "data" / "docs").glob("*.md"):
+        (docs_dir / src.name).write_text(src.read_text(encoding="utf-8"), encoding="utf-8")
+    vocab = synthetic_vocab()
+    ids = synthetic_corpus(n_files * 80, vocab, words_per_chunk=12, seed=2)
+    for i in range(n_files):
+        lines = [" ".join(vocab[j] for j in row) for row in ids[i * 80:(i + 1) * 80]]
+        (docs_dir / f"synthetic_{i:04d}.md").write_text(f"# Synthetic {i}\n\n" + "\n".join(lines), encoding="utf-8")
+
+    vs = Chroma(collection_name=ingest.COLLECTION, embedding_function=get_embeddings(),
+                persist_directory=os.environ["CHROMA_DIR"])
+    splitter = RecursiveCharacterTextSplitter(chunk_size=900, chunk_overlap=120)
+    t0 = time.perf_counter()
+    counts = ingest.sync_index(vs, str(docs_dir), WORKDIR / "chroma" / ingest.MANIFEST_NAME, splitter)
+    t_sync = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    ingest.write_artifacts(vs)
+    t_art = time.perf_counter() - t0
+    results["ingest"] = {"files": counts["files_added"], "chunks": counts["chunks_added"],
+                         "sync_s": round(t_sync, 3), "artifacts_s": round(t_art, 3),
+                         "chunks_per_s": round(counts["chunks_added"] / t_sync, 1) if t_sync else None}
+
+
+def bench_chat(n_rounds: int, with_api: bool, results: Dict[str, Any]) -> None:
+    from retail_rag_sim.agents import graph
+    questions = QUESTIONS + (["What are today's hours for store ST-CHI-01?"] if with_api else [])
+    inputs = (questions * n_rounds)[:max(n_rounds, len(questions))]
+    results["chat"] = summarize(time_calls(graph.chat, inputs), backend="fake")
+
+    per_node: Dict[str, List[float]] = {}
+    for q in inputs:
+        t_prev = time.perf_counter()
+        for update in graph.GRAPH.stream(graph._initial_state(q), stream_mode="updates"):
+            now = time.perf_counter()
+            for node in update:
+                per_node.setdefault(node, []).append((now - t_prev) * 1000)
+            t_prev = now
+    for node, samples in per_node.items():
+        results[f"chat.{node}"] = summarize(samples)
+
+
+# -------------------------
+# Baseline comparison
+# -------------------------
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    regressions = []
+    for name, base in baseline.get("stages", {}).items():
+        cur = current["stages"].get(name)
+        if not cur or "p50_ms" not in cur or "p50_ms" not in base:
+            continue
+        ratio = cur["p50_ms"] / base["p50_ms"] if base["p50_ms"] else 1.0
+        flag = "REGRESSION" if ratio > 1 + tolerance else ("faster" if ratio < 1 - tolerance else "ok")
+        print(f"{name:24s} p50 {base['p50_ms']:>10.3f} -> {cur['p50_ms']:>10.3f} ms  x{ratio:5.2f}  {flag}")
+        if flag == "REGRESSION":
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description="End-to-end benchmarks (offline, fake LLM backend).")
+    ap.add_argument("--sizes", default="1000,10000", help="synthetic corpus sizes for retriever@N, up to 1000000")
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("--ingest-files", type=int, default=50)
+    ap.add_argument("--chat-rounds", type=int, default=20)
+    ap.add_argument("--only", help="comma-separated stage groups: retriever,rerank,db,api,pii,ingest,chat")
+    ap.add_argument("--json", help="write results to this path")
+    ap.add_argument("--baseline", help="compare against this results JSON; exit 1 on regressions")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown vs baseline")
+    ap.add_argument("--save-baseline", help="also write results here as the new baseline")
+    ap.add_argument("--keep-workdir", action="store_true", help="keep the scratch indexes for inspection")
+    args = ap.parse_args()
+
+    groups = set((args.only or "retriever,rerank,db,api,pii,ingest,chat").split(","))
+    stages: Dict[str, Any] = {}
+    sample_docs: List[Document] = []
+    if "retriever" in groups or "rerank" in groups:
+        sample_docs = bench_retriever([int(s) for s in args.sizes.split(",")], args.queries, stages)
+    if "rerank" in groups:
+        bench_rerank(sample_docs, args.queries, stages)
+    if "db" in groups:
+        bench_run_select(args.queries, stages)
+    with_api = bench_call_api(args.queries, stages) if "api" in groups else False
+    if "pii" in groups:
+        bench_redact_pii(args.queries, stages)
+    if "ingest" in groups or "chat" in groups:
+        bench_ingest(args.ingest_files, stages)
+    if "chat" in groups:
+        bench_chat(args.chat_rounds, with_api, stages)
+
+    results = {"meta": {"python": platform.python_version(), "machine": platform.machine(),
+                        "numpy": np.__version__, "workdir": str(WORKDIR), "argv": sys.argv[1:]},
+               "stages": stages}
+    for name, row in stages.items():
+        print(f"{name:24s} " + "  ".join(f"{k}={v}" for k, v in row.items()))
+    for path in filter(None, [args.json, args.save_baseline]):
+        Path(path).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if not args.keep_workdir:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text(encoding="utf-8")), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} stage(s) regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Synthetic retail-flavoured corpus shared by the benchmark scripts: Zipf-distributed words with
+a handful of topic words up front, hashing-embedding vectors and short keyword queries.
+"""
+from __future__ import annotations
+
+from typing import List
+
+import numpy as np
+from langchain_core.documents import Document
+
+from retail_rag_sim.llms.fake import HashingEmbeddings
+from retail_rag_sim.retrieval.vector_index import normalize
+
+TOPIC_WORDS = ["return", "refund", "exchange", "pickup", "order", "receipt", "warranty", "laptop", "headphones",
+               "store", "hours", "appointment", "inventory", "policy", "gift", "card", "price", "match", "damaged",
+               "delivery", "shipping", "tax", "membership", "repair", "installation", "battery", "opened", "box"]
+
+
+def synthetic_vocab(size: int = 5000) -> List[str]:
+    return TOPIC_WORDS + [f"w{i:05d}" for i in range(size - len(TOPIC_WORDS))]
+
+
+def synthetic_corpus(n: int, vocab: List[str], words_per_chunk: int = 60, seed: int = 0) -> np.ndarray:
+    """(n, words_per_chunk) vocab ids, Zipf-distributed like real text."""
+    rng = np.random.default_rng(seed)
+    return (rng.zipf(1.2, size=(n, words_per_chunk)) - 1) % len(vocab)
+
+
+def corpus_documents(word_ids: np.ndarray, vocab: List[str]) -> List[Document]:
+    words = np.asarray(vocab, dtype=object)
+    return [Document(page_content=" ".join(words[row]), metadata={"source": f"synthetic/{i // 50}.md", "chunk_id": f"c{i}"})
+            for i, row in enumerate(word_ids)]
+
+
+def corpus_vectors(word_ids: np.ndarray, vocab: List[str], emb: HashingEmbeddings, block: int = 20_000) -> np.ndarray:
+    """
+    Hashing embeddings are linear in the bag of words, so chunk vectors are sums of per-word
+    vectors: same result as embed_documents, without hashing 60 tokens per chunk in Python.
+    """
+    word_vecs = np.asarray(emb.embed_documents(vocab), dtype=np.float32)
+    out = np.empty((len(word_ids), emb.dim), dtype=np.float32)
+    for lo in range(0, len(word_ids), block):
+        out[lo:lo + block] = word_vecs[word_ids[lo:lo + block]].sum(axis=1)
+    return normalize(out)
+
+
+def synthetic_queries(vocab: List[str], n: int, seed: int = 1) -> List[str]:
+    rng = np.random.default_rng(seed)
+    return [" ".join(rng.choice(TOPIC_WORDS, size=2).tolist() + [vocab[int(rng.integers(len(vocab)))]]) for _ in range(n)]
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import copy
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Container, Dict, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from retail_rag_sim.tools.pii import EMAIL_RE, PHONE_RE
+
+load_dotenv()
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "false").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+
+# Anything tied to one customer/store/order, or to live data, must never be served from cache
+PERSONAL_RE = re.compile(r"\b(?:R-\d+|ST-[A-Z]{3}-\d+|SKU-[A-Z0-9-]+)\b|\border\s*#?\s*\d+", re.IGNORECASE)
+LIVE_INTENTS = {"store_hours", "inventory", "order_status", "appointment"}
+LIVE_TOOLS = {"db_select", "store_hours", "inventory_lookup", "appointment_slots", "send_email"}
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_question(text: str) -> str:
+    return _WS_RE.sub(" ", text.strip().lower()).strip(" ?!.")
+
+
+def is_personal(text: str) -> bool:
+    return bool(PERSONAL_RE.search(text) or EMAIL_RE.search(text) or PHONE_RE.search(text))
+
+
+def is_cacheable(user_input: str, result: Dict[str, Any]) -> bool:
+    """
+    Only verified, KB-grounded, non-personal answers are shared across users.
+    """
+    plan = result.get("plan") or {}
+    if is_personal(user_input) or plan.get("intent") in LIVE_INTENTS:
+        return False
+    if plan.get("needs_db") or plan.get("needs_api") or plan.get("needs_email"):
+        return False
+    if any(t.get("tool") in LIVE_TOOLS for t in result.get("tool_outputs", [])):
+        return False
+    if result.get("recommended_action") != "answer":
+        return False
+    cites = result.get("citations") or []
+    return bool(cites) and all(c.get("chunk_id") for c in cites)
+
+
+class SemanticAnswerCache:
+    """
+    Near-duplicate question cache in front of `chat()`.
+
+    Questions are embedded after normalization; a lookup returns the stored answer of the most
+    similar prior question if cosine >= `threshold`, the entry is younger than `ttl_seconds`,
+    and every chunk it cited still exists in the live index (`live_chunks()`).
+    Least recently used entries are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, embeddings, live_chunks: Optional[Callable[[], Container[str]]] = None,
+                 threshold: float = ANSWER_CACHE_THRESHOLD, ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+                 max_entries: int = ANSWER_CACHE_MAX_ENTRIES):
+        self.embeddings = embeddings
+        self.live_chunks = live_chunks
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None  # (max_entries, dim), allocated on first store
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()  # slot -> entry, LRU order
+        self._free = list(range(max_entries - 1, -1, -1))
+        self._stats = {"hits": 0, "misses": 0, "bypassed": 0, "stored": 0, "expired": 0, "stale": 0,
+                       "evicted": 0, "errors": 0}
+
+    def _embed(self, text: str) -> Optional[np.ndarray]:
+        try:
+            vec = np.asarray(self.embeddings.embed_query(normalize_question(text)), dtype=np.float32)
+        except Exception:
+            self._count("errors")
+            return None
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def _drop(self, slot: int, reason: str) -> None:
+        self._entries.pop(slot, None)
+        self._free.append(slot)
+        self._stats[reason] += 1
+
+    def lookup(self, user_input: str) -> Optional[Dict[str, Any]]:
+        if is_personal(user_input):
+            self._count("bypassed")
+            return None
+        vec = self._embed(user_input)
+        # Resolved outside the lock: it may load the retriever (index files, embeddings)
+        live = self.live_chunks() if vec is not None and self.live_chunks is not None else None
+        with self._lock:
+            if vec is None or not self._entries or self._vectors is None or len(vec) != self._vectors.shape[1]:
+                self._stats["misses"] += 1
+                return None
+            slots = np.fromiter(self._entries.keys(), dtype=np.int64, count=len(self._entries))
+            sims = self._vectors[slots] @ vec
+            best = int(np.argmax(sims))
+            slot, sim = int(slots[best]), float(sims[best])
+            if sim < self.threshold:
+                self._stats["misses"] += 1
+                return None
+
+            entry = self._entries[slot]
+            age = time.time() - entry["stored_at"]
+            if age > self.ttl_seconds:
+                self._drop(slot, "expired")
+                self._stats["misses"] += 1
+                return None
+            if live is not None and not all(c in live for c in entry["chunk_ids"]):
+                self._drop(slot, "stale")
+                self._stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(slot)
+            self._stats["hits"] += 1
+            result = copy.deepcopy(entry["result"])
+        result["cache"] = {"hit": True, "similarity": sim, "age_seconds": age}
+        return result
+
+    def store(self, user_input: str, result: Dict[str, Any]) -> bool:
+        if not is_cacheable(user_input, result):
+            return False
+        vec = self._embed(user_input)
+        if vec is None:
+            return False
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, len(vec)), dtype=np.float32)
+            elif len(vec) != self._vectors.shape[1]:
+                return False
+            if not self._free:
+                oldest = next(iter(self._entries))
+                self._drop(oldest, "evicted")
+            slot = self._free.pop()
+            self._vectors[slot] = vec
+            self._entries[slot] = {
+                "result": copy.deepcopy(result),
+                "chunk_ids": {c["chunk_id"] for c in result["citations"]},
+                "stored_at": time.time(),
+            }
+            self._stats["stored"] += 1
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._free = list(range(self.max_entries - 1, -1, -1))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats, entries = dict(self._stats), len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        return {**stats, "entries": entries, "hit_rate": (stats["hits"] / lookups) if lookups else 0.0}
+
+
+_cache: Optional[SemanticAnswerCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    """
+    Process-wide cache, opt-in: None unless ANSWER_CACHE_ENABLED=true, since a near-duplicate
+    match can answer a differently worded question with another question's answer. Staleness is checked against
+    the chunk IDs of the currently loaded retriever.
+    """
+    global _cache
+    if not ANSWER_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            from retail_rag_sim.llms.factory import get_embeddings
+            from retail_rag_sim.retrieval.registry import get_retriever
+            _cache = SemanticAnswerCache(get_embeddings(), live_chunks=lambda: get_retriever().chunk_ids)
+        return _cache
@@ -1,37 +1,61 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import os
-from typing import Any, Dict, List, TypedDict
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, TypedDict
 
 from dotenv import load_dotenv
-from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages import AIMessageChunk, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
 from langchain_core.tools import tool
 from langgraph.graph import END, START, StateGraph
 
+from retail_rag_sim.agents import speculative
+from retail_rag_sim.agents.answer_cache import get_answer_cache
+from retail_rag_sim.agents.intent import get_intent_classifier, log_plan
 from retail_rag_sim.agents.prompts import SYSTEM_BRAND_TONE, PLANNER_INSTRUCTIONS, VERIFIER_INSTRUCTIONS
-from retail_rag_sim.llms.factory import get_chat_model
-from retail_rag_sim.retrieval.retriever import build_hybrid_retriever, format_citations
+from retail_rag_sim.agents.verification import get_verifier_policy
+from retail_rag_sim.agents.verifier_payload import build_verifier_payload
+from retail_rag_sim.agents.tool_runner import arun_tool_calls, run_tool_calls
+from retail_rag_sim.llms.factory import get_chat_model, get_tool_model
+from retail_rag_sim.retrieval.registry import get_retriever
+from retail_rag_sim.retrieval.retriever import format_citations
 from retail_rag_sim.retrieval.reranker import rerank
-from retail_rag_sim.tools.db import run_select
-from retail_rag_sim.tools.api import call_api
-from retail_rag_sim.tools.email import send_gmail_smtp
+from retail_rag_sim.tools.db import arun_select, run_select
+from retail_rag_sim.tools.api import acall_api, call_api
+from retail_rag_sim.tools.email import asend_gmail_smtp, send_gmail_smtp
 
 load_dotenv()
 
 CONFIDENCE_THRESHOLD = float(os.getenv("CONFIDENCE_THRESHOLD", "0.55"))
+# Buffer the draft of high-sensitivity plans until the verifier has approved it
+STREAM_HOLD_SENSITIVE = os.getenv("STREAM_HOLD_SENSITIVE", "true").lower() == "true"
 
 # -------------------------
 # Tools (tool calling)
 # -------------------------
+def _search_kb(query: str) -> Dict[str, Any]:
+    retr = get_retriever()
+    scored = retr.invoke_with_scores(query)
+    ranked = rerank(query, [d for d, _ in scored], fused_scores=[s["fused"] for _, s in scored])
+    top_docs = [d for d, _ in ranked]
+    return {"citations": format_citations(top_docs)}
+
+# retrieval on the raw user input may already be running (SPECULATIVE_RETRIEVAL)
+speculative.configure(_search_kb)
+
 @tool
 def retrieve_kb(query: str) -> Dict[str, Any]:
     """Retrieve KB snippets with citations."""
-    retr = build_hybrid_retriever()
-    docs = retr.invoke(query)
-    ranked = rerank(query, docs)
-    top_docs = [d for d, _ in ranked]
-    return {"citations": format_citations(top_docs)}
+    spec = speculative.claim(query)
+    if spec is not None:
+        try:
+            return spec.result()[0]
+        except Exception:
+            pass  # speculative run failed; retrieve normally
+    return _search_kb(query)
 
 @tool
 def db_select(sql: str) -> Dict[str, Any]:
@@ -58,6 +82,43 @@ def send_email(to_email: str, subject: str, body: str) -> Dict[str, Any]:
     """Send email via Gmail SMTP."""
     return {"status": send_gmail_smtp(to_email, subject, body)}
 
+# Async implementations, used when the graph runs via ainvoke (achat)
+async def _aretrieve_kb(query: str) -> Dict[str, Any]:
+    spec = speculative.claim(query)
+    if spec is not None:
+        try:
+            return (await asyncio.wrap_future(spec))[0]
+        except Exception:
+            pass
+    # the first call (and any call after an index version bump) builds the retriever: keep it off the loop
+    retr = await asyncio.to_thread(get_retriever)
+    scored = await retr.ainvoke_with_scores(query)
+    ranked = await asyncio.to_thread(rerank, query, [d for d, _ in scored],
+                                     fused_scores=[s["fused"] for _, s in scored])
+    return {"citations": format_citations([d for d, _ in ranked])}
+
+async def _adb_select(sql: str) -> Dict[str, Any]:
+    return {"rows": await arun_select(sql)}
+
+async def _astore_hours(store_id: str) -> Dict[str, Any]:
+    return await acall_api("/store_hours", {"store_id": store_id})
+
+async def _ainventory_lookup(store_id: str, sku: str) -> Dict[str, Any]:
+    return await acall_api("/inventory", {"store_id": store_id, "sku": sku})
+
+async def _aappointment_slots(store_id: str, service: str) -> Dict[str, Any]:
+    return await acall_api("/appointment_slots", {"store_id": store_id, "service": service})
+
+async def _asend_email(to_email: str, subject: str, body: str) -> Dict[str, Any]:
+    return {"status": await asend_gmail_smtp(to_email, subject, body)}
+
+retrieve_kb.coroutine = _aretrieve_kb
+db_select.coroutine = _adb_select
+store_hours.coroutine = _astore_hours
+inventory_lookup.coroutine = _ainventory_lookup
+appointment_slots.coroutine = _aappointment_slots
+send_email.coroutine = _asend_email
+
 TOOLS = [retrieve_kb, db_select, store_hours, inventory_lookup, appointment_slots, send_email]
 TOOLS_BY_NAME = {t.name: t for t in TOOLS}
 
@@ -75,20 +136,25 @@ class AgentState(TypedDict):
     recommended_action: str
 
 
-def planner_node(state: AgentState) -> AgentState:
-    llm = get_chat_model()
-    prompt = [
+def _planner_prompt(state: AgentState) -> List[Any]:
+    return [
         SystemMessage(content=SYSTEM_BRAND_TONE),
         SystemMessage(content=PLANNER_INSTRUCTIONS),
         HumanMessage(content=state["user_input"]),
     ]
-    raw = llm.invoke(prompt).content
+
+
+def _parse_plan(state: AgentState, raw: str) -> Dict[str, Any]:
     try:
         plan = json.loads(raw)
     except Exception:
-        plan = {"intent": "other", "needs_retrieval": True, "needs_db": False, "needs_api": False,
+        return {"intent": "other", "needs_retrieval": True, "needs_db": False, "needs_api": False,
                 "needs_email": False, "sensitivity": "medium", "sql_hint": None}
+    log_plan(state["user_input"], plan)
+    return plan
 
+
+def _apply_plan(state: AgentState, plan: Dict[str, Any]) -> AgentState:
     state["plan"] = plan
     state["messages"] = [SystemMessage(content=SYSTEM_BRAND_TONE), HumanMessage(content=state["user_input"])]
     state["citations"] = []
@@ -99,9 +165,46 @@ def planner_node(state: AgentState) -> AgentState:
     return state
 
 
+def _fast_plan(state: AgentState) -> Optional[Dict[str, Any]]:
+    classifier = get_intent_classifier()
+    return classifier.classify(state["user_input"]) if classifier is not None else None
+
+
+def planner_node(state: AgentState) -> AgentState:
+    # confident rule/classifier plans skip the planner LLM call entirely
+    plan = _fast_plan(state)
+    if plan is None:
+        llm = get_chat_model("planner")
+        plan = _parse_plan(state, llm.invoke(_planner_prompt(state)).content)
+    return _apply_plan(state, plan)
+
+
+async def aplanner_node(state: AgentState) -> AgentState:
+    plan = _fast_plan(state)
+    if plan is None:
+        llm = get_chat_model("planner")
+        plan = _parse_plan(state, (await llm.ainvoke(_planner_prompt(state))).content)
+    return _apply_plan(state, plan)
+
+
+def _record_tool_results(messages: List[Any], tool_outputs: List[dict], tool_calls: List[dict], outs: List[Any]) -> None:
+    for tc, out in zip(tool_calls, outs, strict=True):
+        tool_outputs.append({"tool": tc.get("name"), "args": tc.get("args") or {}, "output": out})
+        messages.append(ToolMessage(content=json.dumps(out, ensure_ascii=False), tool_call_id=tc.get("id", "")))
+
+
+def _finish_execution(state: AgentState, messages: List[Any], tool_outputs: List[dict]) -> AgentState:
+    for t in tool_outputs:
+        if t["tool"] == "retrieve_kb":
+            state["citations"] = t["output"].get("citations", [])
+
+    state["tool_outputs"] = tool_outputs
+    state["messages"] = messages
+    return state
+
+
 def executor_node(state: AgentState) -> AgentState:
-    llm = get_chat_model()
-    llm_tools = llm.bind_tools(TOOLS)
+    llm_tools = get_tool_model(TOOLS)
 
     messages = state["messages"]
     tool_outputs: List[dict] = []
@@ -114,58 +217,98 @@ def executor_node(state: AgentState) -> AgentState:
             state["final_answer"] = resp.content
             break
 
-        for tc in resp.tool_calls:
-            name = tc.get("name")
-            args = tc.get("args") or {}
-            tool_obj = TOOLS_BY_NAME.get(name)
-            out = tool_obj.invoke(args) if tool_obj else {"error": f"Unknown tool {name}"}
-            tool_outputs.append({"tool": name, "args": args, "output": out})
-            messages.append(ToolMessage(content=json.dumps(out, ensure_ascii=False), tool_call_id=tc.get("id", "")))
+        # independent calls from one response run concurrently; results keep call order
+        outs = run_tool_calls(resp.tool_calls, TOOLS_BY_NAME)
+        _record_tool_results(messages, tool_outputs, resp.tool_calls, outs)
 
-    for t in tool_outputs:
-        if t["tool"] == "retrieve_kb":
-            state["citations"] = t["output"].get("citations", [])
+    return _finish_execution(state, messages, tool_outputs)
 
-    state["tool_outputs"] = tool_outputs
-    state["messages"] = messages
-    return state
 
+async def aexecutor_node(state: AgentState) -> AgentState:
+    llm_tools = get_tool_model(TOOLS)
 
-def verifier_node(state: AgentState) -> AgentState:
-    llm = get_chat_model()
-    payload = {
-        "draft_answer": state.get("final_answer", ""),
-        "citations": state.get("citations", []),
-        "tool_outputs": state.get("tool_outputs", []),
-    }
-    prompt = [SystemMessage(content=VERIFIER_INSTRUCTIONS), HumanMessage(content=json.dumps(payload, ensure_ascii=False))]
-    raw = llm.invoke(prompt).content
+    messages = state["messages"]
+    tool_outputs: List[dict] = []
+
+    for _ in range(6):
+        resp = await llm_tools.ainvoke(messages)
+        messages.append(resp)
+
+        if not getattr(resp, "tool_calls", None):
+            state["final_answer"] = resp.content
+            break
 
+        outs = await arun_tool_calls(resp.tool_calls, TOOLS_BY_NAME)
+        _record_tool_results(messages, tool_outputs, resp.tool_calls, outs)
+
+    return _finish_execution(state, messages, tool_outputs)
+
+
+def _verifier_prompt(state: AgentState) -> List[Any]:
+    # deduped citations; tool outputs compacted to what the draft relies on only if over VERIFIER_TOKEN_BUDGET
+    payload, _ = build_verifier_payload(
+        state.get("final_answer", ""), state.get("citations", []), state.get("tool_outputs", []))
+    return [SystemMessage(content=VERIFIER_INSTRUCTIONS), HumanMessage(content=payload)]
+
+
+def _parse_verdict(raw: str) -> Dict[str, Any]:
     try:
-        verdict = json.loads(raw)
+        return json.loads(raw)
     except Exception:
-        verdict = {"grounded": False, "issues": ["verifier_parse_error"], "confidence": 0.3, "recommended_action": "ask_clarify"}
+        return {"grounded": False, "issues": ["verifier_parse_error"], "confidence": 0.3, "recommended_action": "ask_clarify"}
 
+
+def _apply_verdict(state: AgentState, verdict: Dict[str, Any]) -> AgentState:
     state["confidence"] = float(verdict.get("confidence", 0.4))
     state["recommended_action"] = verdict.get("recommended_action", "answer")
 
     if state["confidence"] < CONFIDENCE_THRESHOLD and state["recommended_action"] == "answer":
         state["recommended_action"] = "ask_clarify"
 
-    answer = state.get("final_answer", "")
-    if state.get("citations"):
-        answer += "\n\nSources (sanitized):\n" + "\n".join([f"- [{c['id']}] {c['source']}" for c in state["citations"]])
-
-    answer = answer.strip() + f"\n\nConfidence: {state['confidence']:.2f} | Next: {state['recommended_action']}"
+    answer = (state.get("final_answer", "") + _sources_block(state)).strip() + _confidence_line(state)
     state["final_answer"] = answer
     return state
 
 
+def _sources_block(state: AgentState) -> str:
+    if not state.get("citations"):
+        return ""
+    return "\n\nSources (sanitized):\n" + "\n".join([f"- [{c['id']}] {c['source']}" for c in state["citations"]])
+
+
+def _confidence_line(state: AgentState) -> str:
+    return f"\n\nConfidence: {state['confidence']:.2f} | Next: {state['recommended_action']}"
+
+
+def verifier_node(state: AgentState) -> AgentState:
+    # deterministic checks first; the LLM verifier only for high sensitivity or failed checks
+    policy = get_verifier_policy()
+    verdict = policy.decide(state)
+    if verdict is None:
+        llm = get_chat_model("verifier")
+        t0 = time.perf_counter()
+        verdict = _parse_verdict(llm.invoke(_verifier_prompt(state)).content)
+        policy.record_llm(time.perf_counter() - t0)
+    return _apply_verdict(state, verdict)
+
+
+async def averifier_node(state: AgentState) -> AgentState:
+    policy = get_verifier_policy()
+    verdict = policy.decide(state)
+    if verdict is None:
+        llm = get_chat_model("verifier")
+        t0 = time.perf_counter()
+        verdict = _parse_verdict((await llm.ainvoke(_verifier_prompt(state))).content)
+        policy.record_llm(time.perf_counter() - t0)
+    return _apply_verdict(state, verdict)
+
+
 def build_graph():
     g = StateGraph(AgentState)
-    g.add_node("planner", planner_node)
-    g.add_node("executor", executor_node)
-    g.add_node("verifier", verifier_node)
+    # each node has a sync and an async implementation: GRAPH.invoke / GRAPH.ainvoke pick one
+    g.add_node("planner", RunnableLambda(planner_node, afunc=aplanner_node, name="planner"))
+    g.add_node("executor", RunnableLambda(executor_node, afunc=aexecutor_node, name="executor"))
+    g.add_node("verifier", RunnableLambda(verifier_node, afunc=averifier_node, name="verifier"))
 
     g.add_edge(START, "planner")
     g.add_edge("planner", "executor")
@@ -175,8 +318,8 @@ def build_graph():
 
 GRAPH = build_graph()
 
-def chat(user_input: str) -> Dict[str, Any]:
-    state: AgentState = {
+def _initial_state(user_input: str) -> AgentState:
+    return {
         "user_input": user_input.strip(),
         "messages": [],
         "plan": {},
@@ -186,7 +329,9 @@ def chat(user_input: str) -> Dict[str, Any]:
         "confidence": 0.0,
         "recommended_action": "answer",
     }
-    out = GRAPH.invoke(state)
+
+
+def _result(out: AgentState) -> Dict[str, Any]:
     return {
         "answer": out["final_answer"],
         "plan": out.get("plan", {}),
@@ -195,3 +340,191 @@ def chat(user_input: str) -> Dict[str, Any]:
         "confidence": out.get("confidence", 0.0),
         "recommended_action": out.get("recommended_action", "answer"),
     }
+
+
+def chat(user_input: str) -> Dict[str, Any]:
+    cache = get_answer_cache()
+    if cache is not None:
+        cached = cache.lookup(user_input)
+        if cached is not None:
+            return cached
+
+    with speculative.speculate(user_input):
+        result = _result(GRAPH.invoke(_initial_state(user_input)))
+    if cache is not None:
+        cache.store(user_input, result)
+    return result
+
+
+async def achat(user_input: str) -> Dict[str, Any]:
+    """
+    Async variant of `chat`: LLM calls, tools and retrieval are awaited, so one process can
+    serve many conversations concurrently without a thread per conversation.
+    """
+    cache = get_answer_cache()
+    if cache is not None:
+        cached = await asyncio.to_thread(cache.lookup, user_input)
+        if cached is not None:
+            return cached
+
+    with speculative.speculate(user_input):
+        result = _result(await GRAPH.ainvoke(_initial_state(user_input)))
+    if cache is not None:
+        await asyncio.to_thread(cache.store, user_input, result)
+    return result
+
+
+# -------------------------
+# Streaming
+# -------------------------
+_STREAM_MODES = ["messages", "updates"]
+
+
+class _AnswerStream:
+    """
+    Turns LangGraph `messages` + `updates` stream parts into client events:
+
+    - {"type": "token", "text": ...}   executor answer tokens, as generated
+    - {"type": "footer", "text": ...}  sources + confidence, once the verifier has run
+    - {"type": "final", "result": ...} the same dict `chat()` returns
+
+    Text is sent as soon as it arrives, unless its LLM turn has already produced tool-call
+    chunks: such turns (and the ToolMessages the executor streams) are not part of the answer.
+    Tokens are whitespace-trimmed like the final answer, so tokens + footer == result["answer"].
+    Tokens of a high-sensitivity plan are held back and released as one chunk after
+    verification when `hold_sensitive` is set.
+    """
+
+    def __init__(self, hold_sensitive: bool):
+        self.hold_sensitive = hold_sensitive
+        self.held = False
+        self.streamed = False
+        self.sent = ""
+        self.draft = ""
+        self.final: Optional[AgentState] = None
+        self._turn_id: Optional[str] = None
+        self._turn_tools = False
+        self._pending = ""
+
+    def _emit(self, text: str) -> List[Dict[str, Any]]:
+        # trailing whitespace waits for more text: the final answer is stripped
+        text = self._pending + text
+        if not self.streamed:
+            text = text.lstrip()
+        body = text.rstrip()
+        self._pending = text[len(body):]
+        if not body:
+            return []
+        self.streamed = True
+        self.sent += body
+        return [{"type": "token", "text": body}]
+
+    def _on_chunk(self, chunk: Any) -> List[Dict[str, Any]]:
+        # the executor node also streams the ToolMessages of the tools it runs
+        if not isinstance(chunk, AIMessageChunk):
+            return []
+        if chunk.id != self._turn_id:
+            self._turn_id, self._turn_tools = chunk.id, False
+        if chunk.tool_call_chunks or chunk.tool_calls:
+            self._turn_tools = True
+            return []
+        if self._turn_tools or not isinstance(chunk.content, str) or not chunk.content:
+            return []
+        return self._emit(chunk.content)
+
+    def feed(self, mode: str, payload: Any) -> List[Dict[str, Any]]:
+        if mode == "messages":
+            chunk, meta = payload
+            if meta.get("langgraph_node") != "executor" or self.held:
+                return []
+            return self._on_chunk(chunk)
+
+        events: List[Dict[str, Any]] = []
+        for node, state in payload.items():
+            if node == "planner":
+                self.held = self.hold_sensitive and state.get("plan", {}).get("sensitivity") == "high"
+            elif node == "executor" and not self.held:
+                if not self.streamed and state.get("final_answer"):
+                    # model did not stream (or yielded one message): send the draft in one piece
+                    events.extend(self._emit(state["final_answer"]))
+            elif node == "executor" and self.held:
+                self.draft = state.get("final_answer", "")
+            elif node == "verifier":
+                self.final = state
+                if self.held:
+                    events.extend(self._emit(self.draft))
+                answer = state.get("final_answer", "")
+                footer = answer[len(self.sent):] if answer.startswith(self.sent) else _sources_block(state) + _confidence_line(state)
+                events.append({"type": "footer", "text": footer})
+        return events
+
+    def result(self) -> Dict[str, Any]:
+        return {"type": "final", "result": _result(self.final)}
+
+
+def _cached_events(cached: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"type": "token", "text": cached["answer"]}, {"type": "final", "result": cached}]
+
+
+def stream_chat(user_input: str, hold_sensitive: bool = STREAM_HOLD_SENSITIVE) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming variant of `chat`: yields answer tokens while the executor generates them,
+    then the verifier footer, then the final result (see `_AnswerStream` for event shapes).
+    """
+    cache = get_answer_cache()
+    if cache is not None:
+        cached = cache.lookup(user_input)
+        if cached is not None:
+            yield from _cached_events(cached)
+            return
+
+    stream = _AnswerStream(hold_sensitive)
+    spec = speculative.start(user_input)
+    try:
+        parts = GRAPH.stream(_initial_state(user_input), stream_mode=_STREAM_MODES)
+        while True:
+            # set the speculation around each step only: the consumer may close us from another context
+            with speculative.active(spec):
+                part = next(parts, None)
+            if part is None:
+                break
+            yield from stream.feed(*part)
+    finally:
+        if spec is not None:
+            spec.finish()
+    final = stream.result()
+    if cache is not None:
+        cache.store(user_input, final["result"])
+    yield final
+
+
+async def astream_chat(user_input: str, hold_sensitive: bool = STREAM_HOLD_SENSITIVE) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Async counterpart of `stream_chat`.
+    """
+    cache = get_answer_cache()
+    if cache is not None:
+        cached = await asyncio.to_thread(cache.lookup, user_input)
+        if cached is not None:
+            for event in _cached_events(cached):
+                yield event
+            return
+
+    stream = _AnswerStream(hold_sensitive)
+    spec = speculative.start(user_input)
+    try:
+        parts = GRAPH.astream(_initial_state(user_input), stream_mode=_STREAM_MODES)
+        while True:
+            with speculative.active(spec):
+                part = await anext(parts, None)
+            if part is None:
+                break
+            for event in stream.feed(*part):
+                yield event
+    finally:
+        if spec is not None:
+            spec.finish()
+    final = stream.result()
+    if cache is not None:
+        await asyncio.to_thread(cache.store, user_input, final["result"])
+    yield final
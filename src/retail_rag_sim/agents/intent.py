@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from retail_rag_sim.retrieval.bm25 import tokenize
+from retail_rag_sim.tools.pii import EMAIL_RE, ORDER_ID_RE, PHONE_RE, redact_order_ids, redact_pii
+
+load_dotenv()
+
+INTENT_FAST_PATH = os.getenv("INTENT_FAST_PATH", "true").lower() == "true"
+INTENT_MODEL_PATH = os.getenv("INTENT_MODEL_PATH", "./data/intent_model.npz")
+INTENT_MIN_CONFIDENCE = float(os.getenv("INTENT_MIN_CONFIDENCE", "0.85"))
+# LLM planner outputs are appended here (JSONL) as training data for the classifier; empty disables
+PLAN_LOG_PATH = os.getenv("PLAN_LOG_PATH", "")
+
+INTENTS = ["store_hours", "inventory", "order_status", "returns", "appointment",
+           "product_advice", "policy_question", "other"]
+PLAN_FLAGS = ["needs_retrieval", "needs_db", "needs_api", "needs_email"]
+
+# Plan emitted for each intent when no logged planner outputs say otherwise
+DEFAULT_PLANS: Dict[str, Dict[str, Any]] = {
+    "store_hours": {"needs_retrieval": False, "needs_db": False, "needs_api": True, "needs_email": False, "sensitivity": "low"},
+    "inventory": {"needs_retrieval": False, "needs_db": False, "needs_api": True, "needs_email": False, "sensitivity": "low"},
+    "order_status": {"needs_retrieval": False, "needs_db": True, "needs_api": False, "needs_email": False, "sensitivity": "high"},
+    "returns": {"needs_retrieval": True, "needs_db": False, "needs_api": False, "needs_email": False, "sensitivity": "medium"},
+    "appointment": {"needs_retrieval": False, "needs_db": False, "needs_api": True, "needs_email": False, "sensitivity": "low"},
+    "product_advice": {"needs_retrieval": True, "needs_db": False, "needs_api": False, "needs_email": False, "sensitivity": "low"},
+    "policy_question": {"needs_retrieval": True, "needs_db": False, "needs_api": False, "needs_email": False, "sensitivity": "low"},
+}
+
+# "available" alone is as often a policy question ("Is same-day pickup available?"): it counts as
+# inventory only next to a SKU, store ID or store/location mention
+_STOCK_ENTITY = r"(?:SKU-[A-Z0-9-]+|ST-[A-Z]{3}-\d+|stores?|locations?|near me)"
+
+# A rule fires only when exactly one intent matches; overlaps (e.g. a policy question about an order) go on.
+# Patterns are whole phrases: single words like "open" or "schedule" also occur in other intents
+# ("open-box", "schedule a pickup").
+RULES: List[Tuple[str, re.Pattern]] = [
+    ("store_hours", re.compile(
+        r"\b(?:(?:store|opening|business|holiday) hours|hours of operation|what are (?:the |your |today's )?hours"
+        r"|(?:when|what time) (?:do|does|is|are) (?:you|it|the [\w ]*?store) (?:open|close)"
+        r"|(?:are you|is it|is the [\w ]*?store) open|open (?:today|tomorrow|now|late|on \w+day)"
+        r"|clos(?:e|es|ing) (?:today|tomorrow|early|time))\b", re.IGNORECASE)),
+    ("inventory", re.compile(r"\b(?:in stock|stock|inventory|SKU-[A-Z0-9-]+)\b"
+                             rf"|\bavailab(?:le|ility)\b.*\b{_STOCK_ENTITY}\b|\b{_STOCK_ENTITY}\b.*\bavailab(?:le|ility)\b",
+                             re.IGNORECASE)),
+    ("order_status", re.compile(r"\b(?:order status|where is my order|track(?:ing)? my order)\b", re.IGNORECASE)),
+    ("returns", re.compile(r"\b(?:return(?:s|ed|ing|able)?|refund(?:s|ed)?|exchange(?:s|d)?)\b", re.IGNORECASE)),
+    ("appointment", re.compile(
+        r"\b(?:appointments?|(?:book|schedule|reschedule|cancel) (?:an? |my )?(?:consultation|session|visit|repair|setup)"
+        r"|(?:appointment|consultation) slots?|(?:available|open) slots?)\b", re.IGNORECASE)),
+]
+# About one customer's order/refund: needs a DB lookup and high-sensitivity handling, which only
+# the order_status rule plans locally; anything else goes to the LLM planner
+_PERSONAL_RE = re.compile(r"\bmy (?:orders?|refunds?|returns?|purchases?|receipts?|account|package|delivery)\b",
+                          re.IGNORECASE)
+# Anything mentioning email/notifications needs the LLM to decide on needs_email
+_ALWAYS_LLM_RE = re.compile(r"\b(?:e-?mail|notify|send me)\b", re.IGNORECASE)
+
+
+def _features(text: str) -> List[str]:
+    toks = tokenize(text)
+    return toks + [f"{a} {b}" for a, b in zip(toks, toks[1:], strict=False)]
+
+
+class _SparseRows:
+    """
+    TF-IDF rows in CSR form (indptr, indices, values): a dense texts x vocab matrix of a
+    large planner log would not fit in memory, and each row holds only a few dozen terms.
+    """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, values: np.ndarray, n_cols: int):
+        self.indices = indices
+        self.values = values
+        self.n_cols = n_cols
+        self.rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        self.n_rows = len(indptr) - 1
+
+    def dot(self, W: np.ndarray) -> np.ndarray:
+        """X @ W"""
+        out = np.zeros((self.n_rows, W.shape[1]), dtype=W.dtype)
+        np.add.at(out, self.rows, W[self.indices] * self.values[:, None])
+        return out
+
+    def tdot(self, G: np.ndarray) -> np.ndarray:
+        """X.T @ G"""
+        out = np.zeros((self.n_cols, G.shape[1]), dtype=G.dtype)
+        np.add.at(out, self.indices, G[self.rows] * self.values[:, None])
+        return out
+
+
+class IntentModel:
+    """
+    Multinomial logistic regression over L2-normalized TF-IDF (unigrams + bigrams), trained with
+    plain NumPy gradient descent. `flag_plans` holds the majority plan flags per intent as seen
+    in the planner log, so predictions reproduce what the LLM planner would have emitted.
+    """
+
+    def __init__(self, vocab: Dict[str, int], idf: np.ndarray, W: np.ndarray, b: np.ndarray,
+                 labels: Sequence[str], flag_plans: Dict[str, Dict[str, Any]]):
+        self.vocab = vocab
+        self.idf = idf
+        self.W = W
+        self.b = b
+        self.labels = list(labels)
+        self.flag_plans = flag_plans
+
+    def _vectorize(self, texts: Sequence[str]) -> _SparseRows:
+        indptr, indices, values = [0], [], []
+        for text in texts:
+            row = {}
+            for term, tf in Counter(_features(text)).items():
+                j = self.vocab.get(term)
+                if j is not None:
+                    row[j] = tf * float(self.idf[j])
+            norm = float(np.sqrt(sum(v * v for v in row.values()))) or 1.0
+            indices.extend(row)
+            values.extend(v / norm for v in row.values())
+            indptr.append(len(indices))
+        return _SparseRows(np.asarray(indptr, dtype=np.int64), np.asarray(indices, dtype=np.int64),
+                           np.asarray(values, dtype=np.float32), len(self.vocab))
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        logits = self._vectorize(texts).dot(self.W) + self.b
+        logits -= logits.max(axis=1, keepdims=True)
+        p = np.exp(logits)
+        return p / p.sum(axis=1, keepdims=True)
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        p = self.predict_proba([text])[0]
+        i = int(np.argmax(p))
+        return self.labels[i], float(p[i])
+
+    @classmethod
+    def fit(cls, texts: Sequence[str], plans: Sequence[Dict[str, Any]], epochs: int = 300,
+            lr: float = 2.0, l2: float = 1e-3, min_df: int = 1) -> "IntentModel":
+        labels = sorted({p.get("intent", "other") for p in plans})
+        y = np.array([labels.index(p.get("intent", "other")) for p in plans])
+
+        df = Counter(term for text in texts for term in set(_features(text)))
+        terms = sorted(t for t, n in df.items() if n >= min_df)
+        vocab = {t: i for i, t in enumerate(terms)}
+        idf = np.array([np.log((1 + len(texts)) / (1 + df[t])) + 1.0 for t in terms], dtype=np.float32)
+
+        model = cls(vocab, idf, np.zeros((len(terms), len(labels)), dtype=np.float32),
+                    np.zeros(len(labels), dtype=np.float32), labels, _majority_plans(plans))
+        X = model._vectorize(texts)
+        Y = np.eye(len(labels), dtype=np.float32)[y]
+        for _ in range(epochs):
+            logits = X.dot(model.W) + model.b
+            logits -= logits.max(axis=1, keepdims=True)
+            P = np.exp(logits)
+            P /= P.sum(axis=1, keepdims=True)
+            G = (P - Y) / len(texts)
+            model.W -= lr * (X.tdot(G) + l2 * model.W)
+            model.b -= lr * G.sum(axis=0)
+        return model
+
+    def save(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        terms = sorted(self.vocab, key=self.vocab.get)
+        meta = {"labels": self.labels, "flag_plans": self.flag_plans}
+        with open(path, "wb") as f:
+            np.savez(f, terms=np.array(terms, dtype=str), idf=self.idf, W=self.W, b=self.b,
+                     meta=np.array(json.dumps(meta)))
+
+    @classmethod
+    def load(cls, path: str) -> "IntentModel":
+        z = np.load(path)
+        meta = json.loads(str(z["meta"]))
+        vocab = {str(t): i for i, t in enumerate(z["terms"])}
+        return cls(vocab, z["idf"], z["W"], z["b"], meta["labels"], meta["flag_plans"])
+
+
+def _majority_plans(plans: Sequence[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    by_intent: Dict[str, List[Dict[str, Any]]] = {}
+    for p in plans:
+        by_intent.setdefault(p.get("intent", "other"), []).append(p)
+    out: Dict[str, Dict[str, Any]] = {}
+    for intent, ps in by_intent.items():
+        flags = {f: sum(bool(p.get(f)) for p in ps) * 2 > len(ps) for f in PLAN_FLAGS}
+        flags["sensitivity"] = Counter(p.get("sensitivity", "medium") for p in ps).most_common(1)[0][0]
+        out[intent] = flags
+    return out
+
+
+def is_personal(text: str) -> bool:
+    return bool(_PERSONAL_RE.search(text) or ORDER_ID_RE.search(text) or EMAIL_RE.search(text)
+                or PHONE_RE.search(text))
+
+
+def rule_intent(text: str) -> Optional[str]:
+    hits = {intent for intent, pattern in RULES if pattern.search(text)}
+    return hits.pop() if len(hits) == 1 else None
+
+
+def _plan(intent: str, flag_plans: Dict[str, Dict[str, Any]], planned_by: str) -> Optional[Dict[str, Any]]:
+    flags = flag_plans.get(intent) or DEFAULT_PLANS.get(intent)
+    if flags is None:
+        return None
+    return {"intent": intent, **flags, "sql_hint": None, "planned_by": planned_by}
+
+
+class IntentClassifier:
+    """
+    Planner fast path: regex rules first, then the trained model (if an artifact exists).
+    `classify` returns a plan in the planner's JSON shape, or None when the LLM planner should decide.
+    """
+
+    def __init__(self, model: Optional[IntentModel] = None, min_confidence: float = INTENT_MIN_CONFIDENCE):
+        self.model = model
+        self.min_confidence = min_confidence
+        self._lock = threading.Lock()
+        self._stats = {"rules": 0, "model": 0, "llm": 0}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def classify(self, text: str) -> Optional[Dict[str, Any]]:
+        flag_plans = self.model.flag_plans if self.model is not None else {}
+        intent = rule_intent(text)
+        if not _ALWAYS_LLM_RE.search(text) and (intent == "order_status" or not is_personal(text)):
+            plan = _plan(intent, flag_plans, "rules") if intent else None
+            if plan is None and self.model is not None:
+                intent, p = self.model.predict(text)
+                if p >= self.min_confidence:
+                    plan = _plan(intent, flag_plans, "model")
+            if plan is not None:
+                self._count(plan["planned_by"])
+                return plan
+        self._count("llm")
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            s = dict(self._stats)
+        total = sum(s.values())
+        s["fast_path_rate"] = ((s["rules"] + s["model"]) / total) if total else 0.0
+        return s
+
+
+_classifier: Optional[IntentClassifier] = None
+_classifier_lock = threading.Lock()
+_log_lock = threading.Lock()
+
+
+def get_intent_classifier() -> Optional[IntentClassifier]:
+    """
+    Process-wide classifier (None when INTENT_FAST_PATH=false); loads INTENT_MODEL_PATH if present.
+    """
+    global _classifier
+    if not INTENT_FAST_PATH:
+        return None
+    with _classifier_lock:
+        if _classifier is None:
+            model = IntentModel.load(INTENT_MODEL_PATH) if Path(INTENT_MODEL_PATH).exists() else None
+            _classifier = IntentClassifier(model)
+        return _classifier
+
+
+def log_plan(user_input: str, plan: Dict[str, Any]) -> None:
+    if not PLAN_LOG_PATH:
+        return
+    path = Path(PLAN_LOG_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _log_lock, path.open("a", encoding="utf-8") as f:
+        # training data only needs the phrasing, not whose order it was
+        text = redact_pii(redact_order_ids(user_input))
+        f.write(json.dumps({"input": text, "plan": plan}, ensure_ascii=False) + "\n")
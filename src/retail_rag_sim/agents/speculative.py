@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from dotenv import load_dotenv
+
+from retail_rag_sim.agents.answer_cache import is_personal
+from retail_rag_sim.retrieval.bm25 import tokenize
+
+load_dotenv()
+
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "false").lower() == "true"
+# Share of the executor's retrieve_kb query tokens that must appear in the raw user input to reuse the result
+SPECULATIVE_MIN_OVERLAP = float(os.getenv("SPECULATIVE_MIN_OVERLAP", "0.5"))
+SPECULATIVE_POOL_SIZE = int(os.getenv("SPECULATIVE_POOL_SIZE", "4"))
+
+
+def query_overlap(user_input: str, query: str) -> float:
+    """
+    Containment rather than Jaccard: the executor usually rewrites the question into a shorter
+    keyword query, which should still count as a match.
+    """
+    tu, tq = set(tokenize(user_input)), set(tokenize(query))
+    if not tu or not tq:
+        return 0.0
+    return len(tu & tq) / len(tq)
+
+
+class Speculation:
+    """
+    One in-flight retrieval on the raw user input, started while the planner is thinking.
+    The first `retrieve_kb` query that overlaps enough claims it; anything else runs normally.
+    """
+
+    def __init__(self, owner: "SpeculativeRetriever", query: str, future: Future):
+        self.owner = owner
+        self.query = query
+        self.future = future
+        self.claimed = False
+        self.finished = False
+        # concurrent retrieve_kb calls from one response may race for the same speculation
+        self._lock = threading.Lock()
+
+    def claim(self, query: str) -> Optional[Future]:
+        with self._lock:
+            if self.claimed or self.finished:
+                return None
+            if query_overlap(self.query, query) < self.owner.min_overlap:
+                self.owner._count("mismatched")
+                return None
+            self.claimed = True
+        self.owner._count("hits")
+        if self.future.done():
+            # retrieval finished before the executor asked for it: its whole latency was hidden
+            self.owner._count("hidden_ms", self.owner._elapsed_ms(self.future))
+        return self.future
+
+    def finish(self) -> None:
+        with self._lock:
+            self.finished = True
+            if self.claimed:
+                return
+        self.owner._count("unused")
+        if self.future.cancel():
+            return
+        self.future.add_done_callback(lambda f: self.owner._count("wasted_ms", self.owner._elapsed_ms(f)))
+
+
+class SpeculativeRetriever:
+    """
+    Runs `fn(query)` (retrieval + rerank) on a small thread pool so it overlaps the planner
+    LLM call. Personal/transactional inputs (order IDs, emails, phones) are not speculated on,
+    since they rarely end in a KB lookup.
+    """
+
+    def __init__(self, fn: Callable[[str], Any], min_overlap: float = SPECULATIVE_MIN_OVERLAP,
+                 pool_size: int = SPECULATIVE_POOL_SIZE):
+        self.fn = fn
+        self.min_overlap = min_overlap
+        self._pool = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="speculate")
+        self._lock = threading.Lock()
+        self._stats: Dict[str, float] = {"launched": 0, "skipped": 0, "hits": 0, "mismatched": 0, "unused": 0,
+                                         "hidden_ms": 0.0, "wasted_ms": 0.0}
+
+    def _count(self, key: str, n: float = 1) -> None:
+        with self._lock:
+            self._stats[key] += n
+
+    @staticmethod
+    def _elapsed_ms(future: Future) -> float:
+        if future.cancelled() or future.exception() is not None:
+            return 0.0
+        return future.result()[1]
+
+    def _timed(self, query: str):
+        t0 = time.perf_counter()
+        out = self.fn(query)
+        return out, (time.perf_counter() - t0) * 1000.0
+
+    def start(self, query: str) -> Optional[Speculation]:
+        if is_personal(query):
+            self._count("skipped")
+            return None
+        self._count("launched")
+        future = self._pool.submit(contextvars.copy_context().run, self._timed, query)
+        return Speculation(self, query, future)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            s = dict(self._stats)
+        s["hit_rate"] = (s["hits"] / s["launched"]) if s["launched"] else 0.0
+        return s
+
+
+_active: contextvars.ContextVar[Optional[Speculation]] = contextvars.ContextVar("speculation", default=None)
+_speculator: Optional[SpeculativeRetriever] = None
+
+
+def configure(fn: Callable[[str], Any]) -> Optional[SpeculativeRetriever]:
+    """
+    Install the process-wide speculator (no-op when SPECULATIVE_RETRIEVAL=false).
+    """
+    global _speculator
+    if SPECULATIVE_RETRIEVAL and _speculator is None:
+        _speculator = SpeculativeRetriever(fn)
+    return _speculator
+
+
+def start(user_input: str) -> Optional[Speculation]:
+    """
+    Start retrieval on `user_input` for one conversation turn (None when speculation is off);
+    the caller must `finish()` it.
+    """
+    return _speculator.start(user_input) if _speculator is not None else None
+
+
+@contextmanager
+def active(spec: Optional[Speculation]) -> Iterator[Optional[Speculation]]:
+    """
+    Make `spec` the current turn's speculation. Generators must not hold this across a
+    `yield`: the ContextVar token can only be reset in the context that set it.
+    """
+    token = _active.set(spec)
+    try:
+        yield spec
+    finally:
+        _active.reset(token)
+
+
+@contextmanager
+def speculate(user_input: str) -> Iterator[Optional[Speculation]]:
+    """
+    Scope one conversation turn: start retrieval on `user_input` now, discard it on exit if unused.
+    """
+    spec = start(user_input)
+    try:
+        with active(spec):
+            yield spec
+    finally:
+        if spec is not None:
+            spec.finish()
+
+
+def claim(query: str) -> Optional[Future]:
+    """
+    Future resolving to (result, elapsed_ms) if the current turn's speculation matches `query`.
+    """
+    spec = _active.get()
+    return spec.claim(query) if spec is not None else None
+
+
+def speculation_stats() -> Optional[Dict[str, Any]]:
+    return _speculator.stats() if _speculator is not None else None
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Mapping
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TOOL_POOL_SIZE = int(os.getenv("TOOL_POOL_SIZE", "16"))
+TOOL_DEFAULT_CONCURRENCY = int(os.getenv("TOOL_DEFAULT_CONCURRENCY", "4"))
+
+
+def _parse_limits(spec: str) -> Dict[str, int]:
+    """'send_email=1,retrieve_kb=4' -> {'send_email': 1, 'retrieve_kb': 4}"""
+    limits: Dict[str, int] = {}
+    for part in spec.split(","):
+        if "=" in part:
+            name, n = part.split("=", 1)
+            limits[name.strip()] = max(1, int(n))
+    return limits
+
+
+# Max in-flight calls per tool name, across all conversations in this process
+TOOL_CONCURRENCY = {"send_email": 1, **_parse_limits(os.getenv("TOOL_CONCURRENCY", ""))}
+
+_POOL = ThreadPoolExecutor(max_workers=TOOL_POOL_SIZE, thread_name_prefix="tools")
+_sync_limits: Dict[str, threading.BoundedSemaphore] = {}
+_sync_limits_lock = threading.Lock()
+_async_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = \
+    weakref.WeakKeyDictionary()
+
+
+def _limit(name: str) -> int:
+    return TOOL_CONCURRENCY.get(name, TOOL_DEFAULT_CONCURRENCY)
+
+
+def _sync_semaphore(name: str) -> threading.BoundedSemaphore:
+    with _sync_limits_lock:
+        if name not in _sync_limits:
+            _sync_limits[name] = threading.BoundedSemaphore(_limit(name))
+        return _sync_limits[name]
+
+
+def _async_semaphore(name: str) -> asyncio.Semaphore:
+    per_loop = _async_limits.setdefault(asyncio.get_running_loop(), {})
+    if name not in per_loop:
+        per_loop[name] = asyncio.Semaphore(_limit(name))
+    return per_loop[name]
+
+
+def _is_async_only(tool_obj: Any) -> bool:
+    return getattr(tool_obj, "func", None) is None and getattr(tool_obj, "coroutine", None) is not None
+
+
+def _unknown(name: Any) -> Dict[str, Any]:
+    return {"error": f"Unknown tool {name}"}
+
+
+def _invoke(tool_obj: Any, name: str, args: Dict[str, Any]) -> Any:
+    with _sync_semaphore(name):
+        return tool_obj.invoke(args)
+
+
+async def _ainvoke(tool_obj: Any, name: str, args: Dict[str, Any]) -> Any:
+    async with _async_semaphore(name):
+        return await tool_obj.ainvoke(args)
+
+
+def run_tool_calls(tool_calls: List[Dict[str, Any]], tools_by_name: Mapping[str, Any]) -> List[Any]:
+    """
+    Run all tool calls of one model response concurrently; results come back in call order
+    (the order the ToolMessages must follow). Sync tools go to a thread pool, async-only
+    tools are gathered on a private event loop. A tool's exception is re-raised once all calls are done.
+    """
+    outputs: List[Any] = [None] * len(tool_calls)
+    futures = {}
+    async_calls = []
+    for i, tc in enumerate(tool_calls):
+        name = tc.get("name")
+        args = tc.get("args") or {}
+        tool_obj = tools_by_name.get(name)
+        if tool_obj is None:
+            outputs[i] = _unknown(name)
+        elif _is_async_only(tool_obj):
+            async_calls.append((i, tool_obj, name, args))
+        elif len(tool_calls) == 1:
+            outputs[i] = _invoke(tool_obj, name, args)
+        else:
+            # copy_context keeps tracing/callback context in the worker thread
+            futures[i] = _POOL.submit(contextvars.copy_context().run, _invoke, tool_obj, name, args)
+
+    gathered = None
+    if async_calls:
+        async def _gather():
+            return await asyncio.gather(*[_ainvoke(t, n, a) for _, t, n, a in async_calls], return_exceptions=True)
+        gathered = _POOL.submit(asyncio.run, _gather())
+    # let every call finish before surfacing the first error, so no side effect outlives the turn
+    wait([*futures.values(), *([gathered] if gathered is not None else [])])
+    errors: Dict[int, BaseException] = {}
+    if gathered is not None:
+        for (i, *_), out in zip(async_calls, gathered.result(), strict=True):
+            if isinstance(out, BaseException):
+                errors[i] = out
+            else:
+                outputs[i] = out
+    for i, fut in futures.items():
+        if fut.exception() is not None:
+            errors[i] = fut.exception()
+        else:
+            outputs[i] = fut.result()
+    if errors:
+        raise errors[min(errors)]
+    return outputs
+
+
+async def arun_tool_calls(tool_calls: List[Dict[str, Any]], tools_by_name: Mapping[str, Any]) -> List[Any]:
+    """
+    Async counterpart of `run_tool_calls`: every call is awaited concurrently via `ainvoke`.
+    """
+    async def _one(tc: Dict[str, Any]) -> Any:
+        name = tc.get("name")
+        tool_obj = tools_by_name.get(name)
+        if tool_obj is None:
+            return _unknown(name)
+        return await _ainvoke(tool_obj, name, tc.get("args") or {})
+
+    return list(await asyncio.gather(*[_one(tc) for tc in tool_calls]))
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+from collections import Counter
+from pathlib import Path
+
+from retail_rag_sim.agents.intent import (
+    INTENT_MIN_CONFIDENCE,
+    INTENT_MODEL_PATH,
+    PLAN_LOG_PATH,
+    IntentModel,
+)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Train the planner fast-path classifier from logged planner outputs.")
+    ap.add_argument("--log", default=PLAN_LOG_PATH or "./data/planner_log.jsonl")
+    ap.add_argument("--out", default=INTENT_MODEL_PATH)
+    ap.add_argument("--holdout", type=float, default=0.2)
+    ap.add_argument("--epochs", type=int, default=300)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    rows = [json.loads(line) for line in Path(args.log).read_text(encoding="utf-8").splitlines() if line.strip()]
+    # the latest plan wins for repeated questions
+    latest = {r["input"].strip().lower(): r for r in rows}
+    rows = list(latest.values())
+    random.Random(args.seed).shuffle(rows)
+    n_test = int(len(rows) * args.holdout)
+    test, train = rows[:n_test], rows[n_test:]
+    print(f"{len(train)} train / {len(test)} held out | intents: {dict(Counter(r['plan'].get('intent') for r in rows))}")
+
+    model = IntentModel.fit([r["input"] for r in train], [r["plan"] for r in train], epochs=args.epochs)
+    if test:
+        preds = [model.predict(r["input"]) for r in test]
+        confident = [(r, intent) for r, (intent, p) in zip(test, preds, strict=True) if p >= INTENT_MIN_CONFIDENCE]
+        acc = sum(intent == r["plan"].get("intent") for r, (intent, _) in zip(test, preds, strict=True)) / len(test)
+        conf_acc = (sum(intent == r["plan"].get("intent") for r, intent in confident) / len(confident)) if confident else 0.0
+        print(f"held-out accuracy {acc:.3f} | coverage at p>={INTENT_MIN_CONFIDENCE} "
+              f"{len(confident) / len(test):.3f} with accuracy {conf_acc:.3f}")
+
+    # final model uses every example
+    IntentModel.fit([r["input"] for r in rows], [r["plan"] for r in rows], epochs=args.epochs).save(args.out)
+    print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from retail_rag_sim.eval.metrics import citation_presence, numeric_claims_in_sources
+
+load_dotenv()
+
+# always: LLM verifier on every turn | conditional: only for high sensitivity or failed checks
+VERIFIER_MODE = os.getenv("VERIFIER_MODE", "conditional").lower()
+# Confidence reported for drafts that pass the deterministic checks without an LLM verdict
+VERIFIER_PASS_CONFIDENCE = float(os.getenv("VERIFIER_PASS_CONFIDENCE", "0.8"))
+
+
+def deterministic_checks(state: Dict[str, Any]) -> List[str]:
+    """
+    Same rules the LLM verifier is told to enforce, evaluated like the offline metrics:
+    policy claims need a citation, numbers must appear in tool outputs or cited excerpts.
+    """
+    output = {"answer": state.get("final_answer", ""), "citations": state.get("citations", []),
+              "tool_outputs": state.get("tool_outputs", [])}
+    issues = []
+    if not output["answer"].strip():
+        issues.append("empty_draft")
+    if citation_presence(output) < 1.0:
+        issues.append("policy_claim_without_citation")
+    if numeric_claims_in_sources(output) < 1.0:
+        issues.append("number_not_in_sources")
+    return issues
+
+
+class VerifierPolicy:
+    """
+    Decides per turn whether the LLM verifier is needed. `decide` returns a verdict (same shape
+    as the LLM's) when the deterministic checks are enough, otherwise None. Keeps per-path counts
+    and a running mean of LLM verifier latency to estimate the time saved by skipped calls.
+    """
+
+    def __init__(self, mode: str = VERIFIER_MODE, pass_confidence: float = VERIFIER_PASS_CONFIDENCE):
+        self.mode = mode
+        self.pass_confidence = pass_confidence
+        self._lock = threading.Lock()
+        self._stats = {"skipped": 0, "llm_always": 0, "llm_high_sensitivity": 0, "llm_checks_failed": 0}
+        self._llm_seconds = 0.0
+        self._llm_calls = 0
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def decide(self, state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if self.mode == "always":
+            self._count("llm_always")
+            return None
+        if (state.get("plan") or {}).get("sensitivity") == "high":
+            self._count("llm_high_sensitivity")
+            return None
+        if deterministic_checks(state):
+            self._count("llm_checks_failed")
+            return None
+        self._count("skipped")
+        return {"grounded": True, "issues": [], "confidence": self.pass_confidence,
+                "recommended_action": "answer", "verified_by": "checks"}
+
+    def record_llm(self, seconds: float) -> None:
+        with self._lock:
+            self._llm_seconds += seconds
+            self._llm_calls += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            s: Dict[str, Any] = dict(self._stats)
+            mean_llm = (self._llm_seconds / self._llm_calls) if self._llm_calls else 0.0
+        s["llm_mean_ms"] = mean_llm * 1000.0
+        s["est_ms_saved"] = s["skipped"] * mean_llm * 1000.0
+        return s
+
+
+_policy = VerifierPolicy()
+
+
+def get_verifier_policy() -> VerifierPolicy:
+    return _policy
+
+
+def verification_stats() -> Dict[str, Any]:
+    return _policy.stats()
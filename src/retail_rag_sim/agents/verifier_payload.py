@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, List, Set, Tuple
+
+from dotenv import load_dotenv
+
+from retail_rag_sim.eval.metrics import NUM_RE
+from retail_rag_sim.llms.tokens import count_tokens
+
+load_dotenv()
+
+VERIFIER_TOKEN_BUDGET = int(os.getenv("VERIFIER_TOKEN_BUDGET", "2000"))
+# Rows kept per tool output when none of them is referenced by the draft
+VERIFIER_MAX_ROWS = int(os.getenv("VERIFIER_MAX_ROWS", "3"))
+# Citation excerpt lengths tried, longest first, while over budget
+_EXCERPT_STEPS = [220, 120, 60]
+# "picked_up" in a tool output is "picked up" in the draft
+_SEP_RE = re.compile(r"[\s_-]+")
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, default=str)
+
+
+def _numbers(text: str) -> Set[float]:
+    return {float(n.replace("$", "").strip()) for n in NUM_RE.findall(text)}
+
+
+def _normalize(text: str) -> str:
+    return _SEP_RE.sub(" ", text.strip().lower())
+
+
+def _structured(value: Any) -> bool:
+    """Booleans, lists and nested objects are never dropped: the draft rarely quotes them verbatim."""
+    return isinstance(value, (bool, list, tuple, dict))
+
+
+class _Refs:
+    """What the draft mentions: lowercased text for string values, parsed numbers for numeric ones."""
+
+    def __init__(self, draft: str):
+        self.text = _normalize(draft)
+        self.nums = _numbers(draft)
+
+    def mentions(self, value: Any) -> bool:
+        if isinstance(value, bool) or value is None:
+            return False
+        if isinstance(value, (int, float)):
+            return float(value) in self.nums
+        s = _normalize(str(value))
+        try:
+            return float(s.replace("$", "")) in self.nums
+        except ValueError:
+            return len(s) >= 3 and s in self.text
+
+
+def _compact_rows(rows: List[Any], refs: _Refs) -> Dict[str, Any]:
+    dict_rows = [r for r in rows if isinstance(r, dict)]
+    hit_rows = [r for r in dict_rows if any(refs.mentions(v) for v in r.values())]
+    if hit_rows:
+        # keep only the columns the draft actually relies on (plus ID-like keys to keep rows identifiable)
+        cols = {k for r in hit_rows for k, v in r.items()
+                if refs.mentions(v) or _structured(v) or k == "id" or k.endswith("_id")}
+        kept = [{k: v for k, v in r.items() if k in cols} for r in hit_rows]
+    else:
+        kept = rows[:VERIFIER_MAX_ROWS]
+    out: Dict[str, Any] = {"rows": kept}
+    if len(rows) > len(kept):
+        out["omitted_rows"] = len(rows) - len(kept)
+    return out
+
+
+def _compact_output(output: Any, refs: _Refs) -> Any:
+    if isinstance(output, dict) and isinstance(output.get("rows"), list):
+        return {**{k: v for k, v in output.items() if k != "rows"}, **_compact_rows(output["rows"], refs)}
+    if isinstance(output, dict) and any(refs.mentions(v) for v in output.values()):
+        return {k: v for k, v in output.items() if refs.mentions(v) or _structured(v)}
+    return output
+
+
+def dedupe_citations(citations: List[dict]) -> List[dict]:
+    seen: Set[str] = set()
+    out = []
+    for c in citations:
+        key = c.get("chunk_id") or f"{c.get('source')}\x00{c.get('excerpt')}"
+        if key in seen:
+            continue
+        seen.add(key)
+        out.append({"id": c.get("id"), "source": c.get("source"), "excerpt": c.get("excerpt", "")})
+    return out
+
+
+def build_verifier_payload(draft: str, citations: List[dict], tool_outputs: List[dict],
+                           budget: int = VERIFIER_TOKEN_BUDGET) -> Tuple[str, Dict[str, int]]:
+    """
+    Verifier prompt body within `budget` tokens. Citations are always deduped (retrieve_kb outputs
+    point at them). Only while over budget: compact tool outputs to the fields the draft references
+    (booleans, lists and nested values are kept), shorten excerpts, drop the lowest-ranked citations
+    and finally trailing rows. The draft itself is never cut.
+    Returns (json_text, {"tokens_full", "tokens_compact", "tokens_saved"}).
+    """
+    full = _dumps({"draft_answer": draft, "citations": citations, "tool_outputs": tool_outputs})
+    refs = _Refs(draft)
+    payload: Dict[str, Any] = {
+        "draft_answer": draft,
+        "citations": dedupe_citations(citations),
+        "tool_outputs": [{"tool": t.get("tool"), "args": t.get("args") or {},
+                          "output": {"citations": "see citations"} if t.get("tool") == "retrieve_kb" else t.get("output")}
+                         for t in tool_outputs],
+    }
+
+    text = _dumps(payload)
+    if count_tokens(text) > budget:
+        for t in payload["tool_outputs"]:
+            t["output"] = _compact_output(t["output"], refs)
+        text = _dumps(payload)
+    for n in _EXCERPT_STEPS:
+        if count_tokens(text) <= budget:
+            break
+        for c in payload["citations"]:
+            c["excerpt"] = c["excerpt"][:n]
+        text = _dumps(payload)
+    while count_tokens(text) > budget and len(payload["citations"]) > 1:
+        payload["citations"].pop()
+        text = _dumps(payload)
+    while count_tokens(text) > budget and _drop_last_row(payload["tool_outputs"]):
+        text = _dumps(payload)
+
+    stats = {"tokens_full": count_tokens(full), "tokens_compact": count_tokens(text)}
+    stats["tokens_saved"] = stats["tokens_full"] - stats["tokens_compact"]
+    _record(stats)
+    return text, stats
+
+
+def _drop_last_row(tool_outputs: List[dict]) -> bool:
+    for t in reversed(tool_outputs):
+        out = t["output"]
+        if isinstance(out, dict) and out.get("rows"):
+            out["rows"].pop()
+            out["omitted_rows"] = out.get("omitted_rows", 0) + 1
+            return True
+    return False
+
+
+_stats_lock = threading.Lock()
+_stats = {"requests": 0, "tokens_full": 0, "tokens_compact": 0, "tokens_saved": 0}
+_last: Dict[str, int] = {}
+
+
+def _record(stats: Dict[str, int]) -> None:
+    with _stats_lock:
+        _stats["requests"] += 1
+        for k, v in stats.items():
+            _stats[k] += v
+        _last.clear()
+        _last.update(stats)
+
+
+def payload_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        s: Dict[str, Any] = dict(_stats)
+        s["last"] = dict(_last)
+    s["mean_tokens_saved"] = (s["tokens_saved"] / s["requests"]) if s["requests"] else 0.0
+    return s
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import json
 import re
 from typing import Any, Dict
 
@@ -22,6 +23,22 @@ def grounded_numeric_claims(output: Dict[str, Any]) -> float:
     has_structured = any(t.get("tool") in ["db_select", "inventory_lookup", "store_hours", "appointment_slots"] for t in tools)
     return 1.0 if has_structured else 0.0
 
+def numeric_claims_in_sources(output: Dict[str, Any]) -> float:
+    """
+    Stricter than `grounded_numeric_claims`: every number in the answer must literally occur in
+    a tool output or a cited excerpt (compared by value, so "$14.00" matches "14").
+    """
+    nums = NUM_RE.findall(output.get("answer", ""))
+    if not nums:
+        return 1.0
+    sources = json.dumps(output.get("tool_outputs", []), ensure_ascii=False, default=str)
+    sources += " " + " ".join(str(c.get("excerpt", "")) for c in output.get("citations", []))
+    known = {_num_value(n) for n in NUM_RE.findall(sources)}
+    return 1.0 if all(_num_value(n) in known for n in nums) else 0.0
+
+def _num_value(text: str) -> float:
+    return float(text.replace("$", "").strip())
+
 def escalation_when_low_confidence(output: Dict[str, Any]) -> float:
     conf = float(output.get("confidence", 0.0))
     action = output.get("recommended_action", "answer")
@@ -5,6 +5,9 @@ from pathlib import Path
 from statistics import mean
 
 from retail_rag_sim.agents.graph import chat
+from retail_rag_sim.agents.speculative import speculation_stats
+from retail_rag_sim.agents.verification import verification_stats
+from retail_rag_sim.agents.verifier_payload import payload_stats
 from retail_rag_sim.eval.metrics import citation_presence, grounded_numeric_claims, escalation_when_low_confidence
 
 DATA = Path("data/eval_examples.jsonl")
@@ -23,5 +26,21 @@ def main():
     for k, v in scores.items():
         print(f"- {k}: {mean(v):.2f}  (n={len(v)})")
 
+    ver = verification_stats()
+    print(f"Verifier: skipped={ver['skipped']} llm_high_sensitivity={ver['llm_high_sensitivity']} "
+          f"llm_checks_failed={ver['llm_checks_failed']} llm_always={ver['llm_always']} "
+          f"est_ms_saved={ver['est_ms_saved']:.0f}")
+
+    pay = payload_stats()
+    if pay["requests"]:
+        print(f"Verifier payload: {pay['requests']} prompts, {pay['tokens_compact']} tokens sent "
+              f"(saved {pay['tokens_saved']}, mean {pay['mean_tokens_saved']:.0f}/request)")
+
+    spec = speculation_stats()
+    if spec:
+        print(f"Speculative retrieval: hit_rate={spec['hit_rate']:.2f} launched={spec['launched']} "
+              f"unused={spec['unused']} mismatched={spec['mismatched']} "
+              f"hidden_ms={spec['hidden_ms']:.0f} wasted_ms={spec['wasted_ms']:.0f}")
+
 if __name__ == "__main__":
     main()
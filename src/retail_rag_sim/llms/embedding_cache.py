@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_SQL_CHUNK = 500  # stay well below SQLite's bound-parameter limit
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def cache_key(text: str, kind: str) -> str:
+    """
+    Cache key of `text` embedded as a "document" or a "query". Asymmetric models encode the two
+    differently, so they never share an entry; document keys stay the plain text hash.
+    """
+    return text_hash(text) if kind == "document" else text_hash(f"{kind}\x00{text}")
+
+
+def embed_queries(embeddings: Any, texts: Sequence[str]) -> List[List[float]]:
+    """
+    Query vectors for a batch in one embeddings request: the model's `embed_queries` hook if it
+    has one (asymmetric models that encode queries differently from passages must provide it),
+    else `embed_documents`, which symmetric models (OpenAI, the hashing fake) encode like `embed_query`.
+    """
+    hook = getattr(embeddings, "embed_queries", None)
+    return hook(list(texts)) if hook is not None else embeddings.embed_documents(list(texts))
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Persistent embedding cache in front of any LangChain `Embeddings`.
+
+    Vectors are stored as float32 blobs in SQLite keyed by (model, `cache_key(text, kind)`), so
+    ingest and repeated queries only hit the network for unseen text; query and document
+    embeddings of the same text are kept apart. When the table grows past `max_entries`, the
+    least recently used rows are evicted.
+    """
+
+    def __init__(self, inner: Embeddings, model: str, path: str, max_entries: int = 200_000):
+        self.inner = inner
+        self.model = model
+        self.max_entries = max_entries
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, text_hash TEXT NOT NULL, vec BLOB NOT NULL, last_used REAL NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(self, hashes: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            for i in range(0, len(hashes), _SQL_CHUNK):
+                part = hashes[i:i + _SQL_CHUNK]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vec FROM embeddings WHERE model = ? AND text_hash IN ({marks})",
+                    [self.model, *part],
+                ).fetchall()
+                for h, blob in rows:
+                    found[h] = np.frombuffer(blob, dtype=np.float32).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, self.model, h) for h in found],
+                )
+                self._conn.commit()
+        return found
+
+    def _store(self, items: Dict[str, List[float]]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vec, last_used) VALUES (?, ?, ?, ?)",
+                [(self.model, h, np.asarray(v, dtype=np.float32).tobytes(), now) for h, v in items.items()],
+            )
+            self._entries += len(items)
+            if self._entries > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        # trim to 90% so we don't evict on every insert once full
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = self._entries - int(self.max_entries * 0.9)
+        if excess <= 0:
+            return
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        self._entries -= excess
+        self.evictions += excess
+
+    def _embed_many(self, texts: List[str], kind: str,
+                    embed: Callable[[List[str]], List[List[float]]]) -> List[List[float]]:
+        hashes = [cache_key(t, kind) for t in texts]
+        cached = self._lookup(list(dict.fromkeys(hashes)))
+
+        missing: Dict[str, str] = {}
+        for h, t in zip(hashes, texts, strict=True):
+            if h not in cached:
+                missing.setdefault(h, t)
+        self.hits += len(texts) - sum(1 for h in hashes if h in missing)
+        self.misses += len(missing)
+
+        if missing:
+            vectors = embed(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors, strict=True))
+            self._store(fresh)
+            cached.update(fresh)
+        return [cached[h] for h in hashes]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed_many(texts, "document", self.inner.embed_documents)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Batch counterpart of `embed_query`: cache misses go to the inner model in one request."""
+        return self._embed_many(texts, "query", lambda missing: embed_queries(self.inner, missing))
+
+    def embed_query(self, text: str) -> List[float]:
+        h = cache_key(text, "query")
+        cached = self._lookup([h])
+        if h in cached:
+            self.hits += 1
+            return cached[h]
+        self.misses += 1
+        vec = self.inner.embed_query(text)
+        self._store({h: vec})
+        return vec
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "model": self.model,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "entries": self._entries,
+            "max_entries": self.max_entries,
+            "evictions": self.evictions,
+        }
@@ -1,22 +1,135 @@
 from __future__ import annotations
 
 import os
+import threading
+from typing import Any, Dict, Optional, Sequence, Tuple
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def get_chat_model():
+# openai | fake (offline scripted chat model + hashing embeddings, see llms/fake.py)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai").lower()
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "./data/embed_cache.sqlite3")
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "200000"))
+
+# Shared HTTP connection pool for every chat model in the process (keep-alive across turns; async: one per event loop)
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "50"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "20"))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "30"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+
+_embeddings = None
+_embeddings_lock = threading.Lock()
+
+_http_clients: Optional[Tuple[Any, Any]] = None
+_chat_models: Dict[str, Any] = {}
+_tool_models: Dict[Tuple[str, Tuple[str, ...]], Any] = {}
+_models_lock = threading.Lock()
+_model_stats = {"models_created": 0, "models_reused": 0, "tool_models_created": 0, "tool_models_reused": 0}
+
+def chat_model_name(role: Optional[str] = None) -> str:
+    """
+    OPENAI_MODEL_<ROLE> (e.g. OPENAI_MODEL_PLANNER) if set, else OPENAI_MODEL.
+    """
+    default = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
+    return os.getenv(f"OPENAI_MODEL_{role.upper()}", default) if role else default
+
+def _get_http_clients() -> Tuple[Any, Any]:
+    global _http_clients
+    if _http_clients is None:
+        import httpx
+
+        from retail_rag_sim.llms.http_pool import LoopLocalAsyncClient
+        limits = httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_KEEPALIVE,
+                              keepalive_expiry=LLM_KEEPALIVE_SECONDS)
+        timeout = httpx.Timeout(LLM_TIMEOUT_SECONDS)
+        _http_clients = (httpx.Client(limits=limits, timeout=timeout),
+                         LoopLocalAsyncClient(limits=limits, timeout=timeout))
+    return _http_clients
+
+def get_chat_model(role: Optional[str] = None):
     """
-    OpenAI-only chat model factory.
+    Chat model registry: one instance per model name, all sharing one pooled HTTP client
+    (LLM_BACKEND=fake returns the offline scripted model instead). `role` ("planner", "executor", "verifier") selects a per-node model.
     """
-    from langchain_openai import ChatOpenAI
-    model = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
-    return ChatOpenAI(model=model, temperature=0.0)
+    name = chat_model_name(role)
+    with _models_lock:
+        model = _chat_models.get(name)
+        if model is not None:
+            _model_stats["models_reused"] += 1
+            return model
+        if LLM_BACKEND == "fake":
+            from retail_rag_sim.llms.fake import ScriptedChatModel
+            model = ScriptedChatModel(model_name=name)
+        else:
+            from langchain_openai import ChatOpenAI
+            http_client, http_async_client = _get_http_clients()
+            model = ChatOpenAI(model=name, temperature=0.0, http_client=http_client, http_async_client=http_async_client)
+        _chat_models[name] = model
+        _model_stats["models_created"] += 1
+        return model
+
+def get_tool_model(tools: Sequence[Any], role: Optional[str] = "executor"):
+    """
+    `get_chat_model(role).bind_tools(tools)`, cached per model name and tool set.
+    """
+    key = (chat_model_name(role), tuple(t.name for t in tools))
+    with _models_lock:
+        bound = _tool_models.get(key)
+        if bound is not None:
+            _model_stats["tool_models_reused"] += 1
+            return bound
+    bound = get_chat_model(role).bind_tools(list(tools))
+    with _models_lock:
+        _model_stats["tool_models_created"] += 1
+        return _tool_models.setdefault(key, bound)
+
+def _pool_stats(client: Any) -> Dict[str, int]:
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    conns = list(getattr(pool, "connections", []) or [])
+    return {
+        "connections": len(conns),
+        "idle": sum(1 for c in conns if c.is_idle()),
+        "queued_requests": len(getattr(pool, "_requests", []) or []),
+    }
+
+def chat_pool_stats() -> Dict[str, Any]:
+    """
+    Registry counters plus live connection counts of the shared sync/async HTTP pools
+    (async summed over event loops).
+    """
+    with _models_lock:
+        stats: Dict[str, Any] = {**_model_stats, "models": sorted(_chat_models)}
+    if _http_clients is not None:
+        stats["sync_pool"] = _pool_stats(_http_clients[0])
+        per_loop = [_pool_stats(c) for c in _http_clients[1].clients()]
+        stats["async_pool"] = {k: sum(p[k] for p in per_loop) for k in ("connections", "idle", "queued_requests")}
+        stats["async_pool"]["loops"] = len(per_loop)
+    return stats
 
 def get_embeddings():
     """
-    OpenAI-only embeddings.
+    OpenAI (or LLM_BACKEND=fake hashing) embeddings, wrapped in a persistent local cache unless
+    EMBED_CACHE_PATH is empty.
+    One instance is shared per process so hit-rate counters cover every caller.
     """
-    from langchain_openai import OpenAIEmbeddings
-    embed_model = os.getenv("OPENAI_EMBED_MODEL", "text-embedding-3-small")
-    return OpenAIEmbeddings(model=embed_model)
+    global _embeddings
+    with _embeddings_lock:
+        if _embeddings is None:
+            if LLM_BACKEND == "fake":
+                from retail_rag_sim.llms.fake import HashingEmbeddings
+                _embeddings = HashingEmbeddings()
+                embed_model = f"fake-hashing-{_embeddings.dim}"
+            else:
+                from langchain_openai import OpenAIEmbeddings
+                embed_model = os.getenv("OPENAI_EMBED_MODEL", "text-embedding-3-small")
+                _embeddings = OpenAIEmbeddings(model=embed_model)
+            if EMBED_CACHE_PATH:
+                from retail_rag_sim.llms.embedding_cache import CachedEmbeddings
+                _embeddings = CachedEmbeddings(_embeddings, model=embed_model, path=EMBED_CACHE_PATH,
+                                               max_entries=EMBED_CACHE_MAX_ENTRIES)
+        return _embeddings
+
+def embedding_cache_stats() -> Optional[Dict[str, Any]]:
+    stats = getattr(_embeddings, "stats", None)
+    return stats() if stats else None
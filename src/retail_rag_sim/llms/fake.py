@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+load_dotenv()
+
+# Latency injection, to approximate a hosted model while load-testing our own overhead
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "0"))
+FAKE_LLM_TOKEN_MS = float(os.getenv("FAKE_LLM_TOKEN_MS", "0"))
+FAKE_EMBED_LATENCY_MS = float(os.getenv("FAKE_EMBED_LATENCY_MS", "0"))
+FAKE_EMBED_DIM = int(os.getenv("FAKE_EMBED_DIM", "384"))
+
+_STORE_RE = re.compile(r"\bST-[A-Z]{3}-\d+\b", re.IGNORECASE)
+_SKU_RE = re.compile(r"\bSKU-[A-Z0-9-]+\b", re.IGNORECASE)
+_ORDER_RE = re.compile(r"\bR-\d+\b", re.IGNORECASE)
+_TOKEN_RE = re.compile(r"\w+")
+_WORD_RE = re.compile(r"\S+\s*")
+
+
+def _system_text(messages: Sequence[BaseMessage]) -> str:
+    return "\n".join(m.content for m in messages if isinstance(m, SystemMessage) and isinstance(m.content, str))
+
+
+def _last_human(messages: Sequence[BaseMessage]) -> str:
+    for m in reversed(messages):
+        if isinstance(m, HumanMessage):
+            return m.content if isinstance(m.content, str) else ""
+    return ""
+
+
+def scripted_plan(user_input: str) -> Dict[str, Any]:
+    """Planner JSON from the same rules as the planner fast path (policy_question otherwise)."""
+    from retail_rag_sim.agents.intent import DEFAULT_PLANS, rule_intent
+    intent = rule_intent(user_input) or ("order_status" if _ORDER_RE.search(user_input) else "policy_question")
+    return {"intent": intent, **DEFAULT_PLANS[intent], "sql_hint": None}
+
+
+def scripted_tool_calls(user_input: str, tool_names: Sequence[str]) -> List[Dict[str, Any]]:
+    """
+    Tool calls the executor would plausibly make for `user_input`. Several independent calls can
+    come back in one turn, which exercises the concurrent tool runner.
+    """
+    calls: List[Dict[str, Any]] = []
+    store = _STORE_RE.search(user_input)
+    sku = _SKU_RE.search(user_input)
+    order = _ORDER_RE.search(user_input)
+    text = user_input.lower()
+    if order:
+        calls.append(("db_select", {"sql": f"SELECT * FROM orders WHERE order_id = '{order.group(0).upper()}'"}))
+    if store and sku:
+        calls.append(("inventory_lookup", {"store_id": store.group(0).upper(), "sku": sku.group(0).upper()}))
+    elif store and "appointment" in text:
+        calls.append(("appointment_slots", {"store_id": store.group(0).upper(), "service": "consultation"}))
+    elif store:
+        calls.append(("store_hours", {"store_id": store.group(0).upper()}))
+    calls.append(("retrieve_kb", {"query": user_input}))
+    return [{"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:12]}", "type": "tool_call"}
+            for name, args in calls if name in tool_names]
+
+
+def scripted_answer(messages: Sequence[BaseMessage]) -> str:
+    """Draft built only from tool outputs, so it stays grounded for the deterministic verifier checks."""
+    parts: List[str] = []
+    for m in messages:
+        if not isinstance(m, ToolMessage):
+            continue
+        try:
+            out = json.loads(m.content)
+        except Exception:
+            continue
+        cites = out.get("citations") if isinstance(out, dict) else None
+        if cites:
+            parts.append(f"According to {cites[0]['source']}: {cites[0]['excerpt']}")
+        elif isinstance(out, dict) and out.get("rows"):
+            parts.append("Order details: " + ", ".join(f"{k} {v}" for k, v in out["rows"][0].items() if v is not None))
+        elif isinstance(out, dict) and "error" not in out:
+            parts.append("Details: " + ", ".join(f"{k} {v}" for k, v in out.items() if not isinstance(v, (list, dict))))
+    return "\n".join(parts) or "I could not find that information. Could you share more details?"
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Deterministic, offline stand-in for ChatOpenAI. Recognizes the planner and verifier prompts
+    by their system instructions and otherwise behaves as the tool-calling executor: tool calls
+    first, then an answer assembled from the tool results. Supports streaming (word chunks).
+    """
+
+    model_name: str = "fake-scripted"
+    latency_ms: float = FAKE_LLM_LATENCY_MS
+    token_ms: float = FAKE_LLM_TOKEN_MS
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-scripted"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def _reply(self, messages: List[BaseMessage], tools: Optional[List[dict]]) -> AIMessage:
+        from retail_rag_sim.agents.prompts import PLANNER_INSTRUCTIONS, VERIFIER_INSTRUCTIONS
+        system = _system_text(messages)
+        if PLANNER_INSTRUCTIONS in system:
+            return AIMessage(content=json.dumps(scripted_plan(_last_human(messages))))
+        if VERIFIER_INSTRUCTIONS in system:
+            verdict = {"grounded": True, "issues": [], "confidence": 0.85, "recommended_action": "answer"}
+            return AIMessage(content=json.dumps(verdict))
+        if tools and not isinstance(messages[-1], ToolMessage):
+            names = [t["function"]["name"] for t in tools]
+            calls = scripted_tool_calls(_last_human(messages), names)
+            if calls:
+                return AIMessage(content="", tool_calls=calls)
+        return AIMessage(content=scripted_answer(messages))
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency_ms / 1000.0)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages, kwargs.get("tools")))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency_ms / 1000.0)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages, kwargs.get("tools")))])
+
+    def _chunks(self, reply: AIMessage) -> List[AIMessageChunk]:
+        if reply.tool_calls:
+            return [AIMessageChunk(content="", tool_call_chunks=[
+                {"name": tc["name"], "args": json.dumps(tc["args"]), "id": tc["id"], "index": i}
+                for i, tc in enumerate(reply.tool_calls)])]
+        return [AIMessageChunk(content=w) for w in _WORD_RE.findall(reply.content)] or [AIMessageChunk(content="")]
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency_ms / 1000.0)
+        for chunk in self._chunks(self._reply(messages, kwargs.get("tools"))):
+            time.sleep(self.token_ms / 1000.0)
+            if run_manager is not None:
+                run_manager.on_llm_new_token(chunk.content, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency_ms / 1000.0)
+        for chunk in self._chunks(self._reply(messages, kwargs.get("tools"))):
+            await asyncio.sleep(self.token_ms / 1000.0)
+            if run_manager is not None:
+                await run_manager.on_llm_new_token(chunk.content, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Feature-hashed bag of words (signed, L2-normalized): no network, deterministic across
+    processes, and texts sharing words get similar vectors, so retrieval still behaves sensibly.
+    """
+
+    def __init__(self, dim: int = FAKE_EMBED_DIM, latency_ms: float = FAKE_EMBED_LATENCY_MS):
+        self.dim = dim
+        self.latency_ms = latency_ms
+
+    def _embed(self, text: str) -> List[float]:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for tok in _TOKEN_RE.findall(text.lower()):
+            h = int.from_bytes(hashlib.blake2b(tok.encode("utf-8"), digest_size=8).digest(), "little")
+            vec[h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        norm = np.linalg.norm(vec)
+        return (vec / norm if norm > 0 else vec).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.latency_ms / 1000.0)
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self.latency_ms / 1000.0)
+        return self._embed(text)
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import weakref
+from typing import Any, List
+
+import httpx
+
+
+class LoopLocalAsyncClient(httpx.AsyncClient):
+    """
+    httpx.AsyncClient that sends through one pooled client per running event loop.
+
+    An AsyncClient's connections belong to the loop that opened them, so a single process-wide
+    client breaks as soon as a second loop (e.g. a second `asyncio.run(achat(...))`) reuses a
+    keep-alive connection: "Event loop is closed". Chat models hold this object for their whole
+    life; each loop gets its own pool, dropped when the loop is garbage-collected.
+    """
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._client_kwargs = kwargs
+        self._per_loop: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient] = \
+            weakref.WeakKeyDictionary()
+        self._per_loop_lock = threading.Lock()
+
+    def for_loop(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._per_loop_lock:
+            client = self._per_loop.get(loop)
+            if client is None or client.is_closed:
+                client = self._per_loop[loop] = httpx.AsyncClient(**self._client_kwargs)
+            return client
+
+    def clients(self) -> List[httpx.AsyncClient]:
+        with self._per_loop_lock:
+            return [c for c in self._per_loop.values() if not c.is_closed]
+
+    async def send(self, request: httpx.Request, **kwargs: Any) -> httpx.Response:
+        return await self.for_loop().send(request, **kwargs)
+
+    async def aclose(self) -> None:
+        """Close the running loop's pool (pools of other loops can only be closed from those loops)."""
+        with self._per_loop_lock:
+            client = self._per_loop.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
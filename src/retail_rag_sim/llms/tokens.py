@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TIKTOKEN_ENCODING = os.getenv("TIKTOKEN_ENCODING", "cl100k_base")
+# chars/token used when tiktoken (or its BPE file) is unavailable, e.g. offline containers
+FALLBACK_CHARS_PER_TOKEN = 4
+
+_encoder: Any = None
+_encoder_loaded = False
+_encoder_lock = threading.Lock()
+
+
+def _get_encoder() -> Optional[Any]:
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        with _encoder_lock:
+            if not _encoder_loaded:
+                try:
+                    import tiktoken
+                    _encoder = tiktoken.get_encoding(TIKTOKEN_ENCODING)
+                except Exception:
+                    _encoder = None
+                _encoder_loaded = True
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    """
+    Chat-model token count via tiktoken; falls back to a chars/4 estimate.
+    """
+    enc = _get_encoder()
+    if enc is None:
+        return (len(text) + FALLBACK_CHARS_PER_TOKEN - 1) // FALLBACK_CHARS_PER_TOKEN
+    return len(enc.encode(text, disallowed_special=()))
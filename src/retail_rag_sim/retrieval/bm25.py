@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from retail_rag_sim.retrieval.chunk_store import ChunkStore, chunk_store_exists
+
+TOKEN_RE = re.compile(r"\w+")
+FORMAT_VERSION = 1
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an inverted index stored as CSR arrays:
+
+      postings of term t = doc_ids[indptr[t]:indptr[t+1]], tfs[indptr[t]:indptr[t+1]]
+
+    Scoring only touches the postings of the query terms, so cost scales with the
+    posting lengths of the query, not with corpus size. Arrays can be memory-mapped.
+    """
+
+    def __init__(self, vocab: Dict[str, int], indptr: np.ndarray, doc_ids: np.ndarray, tfs: np.ndarray,
+                 doc_len: np.ndarray, k1: float = 1.5, b: float = 0.75):
+        self.vocab = vocab
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.k1 = k1
+        self.b = b
+
+        n_docs = len(doc_len)
+        df = np.diff(indptr).astype(np.float32)
+        avgdl = float(doc_len.mean()) if n_docs else 0.0
+        # Lucene-style idf (never negative)
+        self.idf = np.log((n_docs - df + 0.5) / (df + 0.5) + 1.0).astype(np.float32)
+        self.norm = (k1 * (1.0 - b + b * doc_len / max(avgdl, 1e-9))).astype(np.float32)
+
+    @property
+    def n_docs(self) -> int:
+        return len(self.doc_len)
+
+    @classmethod
+    def build(cls, texts: Iterable[str], k1: float = 1.5, b: float = 0.75) -> BM25Index:
+        vocab: Dict[str, int] = {}
+        term_col: List[int] = []
+        doc_col: List[int] = []
+        tf_col: List[int] = []
+        doc_len: List[int] = []
+
+        for doc_idx, text in enumerate(texts):
+            toks = tokenize(text)
+            doc_len.append(len(toks))
+            for term, tf in Counter(toks).items():
+                term_col.append(vocab.setdefault(term, len(vocab)))
+                doc_col.append(doc_idx)
+                tf_col.append(tf)
+
+        terms = np.asarray(term_col, dtype=np.int64)
+        order = np.argsort(terms, kind="stable")
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(vocab)), out=indptr[1:])
+        return cls(
+            vocab=vocab,
+            indptr=indptr,
+            doc_ids=np.asarray(doc_col, dtype=np.int32)[order],
+            tfs=np.minimum(np.asarray(tf_col, dtype=np.int64), np.iinfo(np.uint16).max).astype(np.uint16)[order],
+            doc_len=np.asarray(doc_len, dtype=np.float32),
+            k1=k1,
+            b=b,
+        )
+
+    def _query_terms(self, query: str) -> List[Tuple[int, int]]:
+        counts = Counter(self.vocab[t] for t in tokenize(query) if t in self.vocab)
+        return list(counts.items())
+
+    def score(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (doc_idx, scores) for every doc that matches at least one query term.
+        """
+        doc_parts: List[np.ndarray] = []
+        score_parts: List[np.ndarray] = []
+        for term_id, qtf in self._query_terms(query):
+            lo, hi = self.indptr[term_id], self.indptr[term_id + 1]
+            docs = np.asarray(self.doc_ids[lo:hi])
+            tf = np.asarray(self.tfs[lo:hi], dtype=np.float32)
+            doc_parts.append(docs)
+            score_parts.append(qtf * self.idf[term_id] * tf * (self.k1 + 1.0) / (tf + self.norm[docs]))
+
+        if not doc_parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if len(doc_parts) == 1:
+            return doc_parts[0].astype(np.int64), score_parts[0]
+
+        docs = np.concatenate(doc_parts)
+        uniq, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts)).astype(np.float32)
+        return uniq.astype(np.int64), scores
+
+    def search(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k (doc_idx, scores), highest first.
+        """
+        docs, scores = self.score(query)
+        if len(docs) > k:
+            part = np.argpartition(-scores, k - 1)[:k]
+            docs, scores = docs[part], scores[part]
+        order = np.argsort(-scores, kind="stable")
+        return docs[order], scores[order]
+
+    def search_batch(self, queries: List[str], k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Top-k for many queries in one pass, equivalent to a sparse (queries x terms) @ (terms x docs)
+        product: each distinct term's postings are scored once and scattered to every query using it.
+        """
+        n_docs = max(self.n_docs, 1)
+        term_queries: Dict[int, List[Tuple[int, int]]] = {}
+        for qi, query in enumerate(queries):
+            for term_id, qtf in self._query_terms(query):
+                term_queries.setdefault(term_id, []).append((qi, qtf))
+
+        empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+        if not term_queries:
+            return [empty for _ in queries]
+
+        key_parts: List[np.ndarray] = []
+        score_parts: List[np.ndarray] = []
+        for term_id, users in term_queries.items():
+            lo, hi = self.indptr[term_id], self.indptr[term_id + 1]
+            docs = np.asarray(self.doc_ids[lo:hi], dtype=np.int64)
+            tf = np.asarray(self.tfs[lo:hi], dtype=np.float32)
+            base = self.idf[term_id] * tf * (self.k1 + 1.0) / (tf + self.norm[docs])
+            q_idx = np.asarray([u[0] for u in users], dtype=np.int64)
+            q_tf = np.asarray([u[1] for u in users], dtype=np.float32)
+            key_parts.append((q_idx[:, None] * n_docs + docs[None, :]).ravel())
+            score_parts.append((q_tf[:, None] * base[None, :]).ravel())
+
+        keys, inverse = np.unique(np.concatenate(key_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts)).astype(np.float32)
+        q_of, doc_of = keys // n_docs, keys % n_docs
+
+        order = np.lexsort((-scores, q_of))
+        q_of, doc_of, scores = q_of[order], doc_of[order], scores[order]
+        bounds = np.searchsorted(q_of, np.arange(len(queries) + 1))
+        out = []
+        for qi in range(len(queries)):
+            lo, hi = bounds[qi], min(bounds[qi + 1], bounds[qi] + k)
+            out.append((doc_of[lo:hi], scores[lo:hi]) if hi > lo else empty)
+        return out
+
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / "indptr.npy", np.asarray(self.indptr))
+        np.save(path / "doc_ids.npy", np.asarray(self.doc_ids))
+        np.save(path / "tfs.npy", np.asarray(self.tfs))
+        np.save(path / "doc_len.npy", np.asarray(self.doc_len))
+        (path / "vocab.json").write_text(json.dumps(self.vocab, ensure_ascii=False), encoding="utf-8")
+        meta = {"format_version": FORMAT_VERSION, "k1": self.k1, "b": self.b, "n_docs": self.n_docs}
+        (path / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: str | Path, mmap: bool = True) -> BM25Index:
+        path = Path(path)
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported BM25 artifact version: {meta.get('format_version')}")
+        mode = "r" if mmap else None
+        return cls(
+            vocab=json.loads((path / "vocab.json").read_text(encoding="utf-8")),
+            indptr=np.load(path / "indptr.npy", mmap_mode=mode),
+            doc_ids=np.load(path / "doc_ids.npy", mmap_mode=mode),
+            tfs=np.load(path / "tfs.npy", mmap_mode=mode),
+            doc_len=np.load(path / "doc_len.npy", mmap_mode=mode),
+            k1=meta["k1"],
+            b=meta["b"],
+        )
+
+
+class BM25Retriever:
+    """
+    Document-level wrapper around BM25Index (same `invoke` contract as LangChain retrievers).
+    `docs` is a list or, when loaded from an artifact, a memory-mapped ChunkStore.
+    """
+
+    def __init__(self, index: BM25Index, docs: Sequence[Document], k: int = 4):
+        self.index = index
+        self.docs = docs
+        self.k = k
+
+    @classmethod
+    def from_documents(cls, docs: List[Document], k: int = 4) -> BM25Retriever:
+        return cls(BM25Index.build(d.page_content for d in docs), list(docs), k=k)
+
+    def search(self, query: str, k: Optional[int] = None) -> List[Tuple[Document, float]]:
+        idx, scores = self.index.search(query, k or self.k)
+        return [(self.docs[i], float(s)) for i, s in zip(idx, scores, strict=True)]
+
+    def invoke(self, query: str) -> List[Document]:
+        return [d for d, _ in self.search(query)]
+
+    def batch_invoke(self, queries: List[str]) -> List[List[Document]]:
+        return [[self.docs[i] for i in idx] for idx, _ in self.index.search_batch(queries, self.k)]
+
+    def save(self, path: str | Path) -> None:
+        """
+        Write the artifact to a temp dir and swap it in, so readers never see a partial index.
+        """
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        self.index.save(tmp)
+        docs = self.docs if isinstance(self.docs, ChunkStore) else ChunkStore.from_documents(self.docs)
+        docs.save(tmp)
+
+        old = path.with_name(path.name + ".old")
+        shutil.rmtree(old, ignore_errors=True)
+        if path.exists():
+            os.replace(path, old)
+        os.replace(tmp, path)
+        shutil.rmtree(old, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path: str | Path, k: int = 4, mmap: bool = True) -> BM25Retriever:
+        path = Path(path)
+        if chunk_store_exists(path):
+            return cls(BM25Index.load(path, mmap=mmap), ChunkStore.load(path, mmap=mmap), k=k)
+        # artifacts written before the chunk store: one JSON line per chunk
+        docs = []
+        with (path / "docs.jsonl").open(encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                docs.append(Document(page_content=row["page_content"], metadata=row["metadata"]))
+        return cls(BM25Index.load(path, mmap=mmap), docs, k=k)
+
+
+def artifact_exists(path: str | Path) -> bool:
+    return (Path(path) / "meta.json").exists()
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+
+# Written next to the BM25 arrays by BM25Retriever.save; rows are BM25 / vector rows
+CHUNK_STORE_FILE = "chunks_meta.json"
+
+
+def doc_key(d: Document) -> str:
+    """
+    Stable chunk ID used for dedupe/fusion: the `chunk_id` assigned at ingest, else a content
+    hash (never Python's `hash()`, which is randomized per process).
+    """
+    md = d.metadata or {}
+    if md.get("chunk_id"):
+        return md["chunk_id"]
+    src = md.get("source", "unknown")
+    return hashlib.sha256(f"{src}\x00{d.page_content}".encode("utf-8")).hexdigest()[:32]
+
+
+class StringColumn:
+    """UTF-8 strings stored as one byte buffer plus n + 1 int64 offsets; both can be memory-mapped."""
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, values: Iterable[str]) -> StringColumn:
+        encoded = [v.encode("utf-8") for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def tolist(self) -> List[str]:
+        buf = self.data.tobytes()
+        offs = self.offsets.tolist()
+        return [buf[offs[i]:offs[i + 1]].decode("utf-8") for i in range(len(self))]
+
+    def save(self, path: Path, name: str) -> None:
+        np.save(path / f"{name}_data.npy", np.asarray(self.data))
+        np.save(path / f"{name}_offsets.npy", np.asarray(self.offsets))
+
+    @classmethod
+    def load(cls, path: Path, name: str, mmap: bool = True) -> StringColumn:
+        mode = "r" if mmap else None
+        return cls(np.load(path / f"{name}_data.npy", mmap_mode=mode), np.load(path / f"{name}_offsets.npy", mmap_mode=mode))
+
+
+class ChunkStore(Sequence[Document]):
+    """
+    Columnar, read-only chunk corpus: text, chunk key and remaining metadata (JSON) as string
+    columns, source as a dictionary-encoded int32 column. Row i is BM25 row i and vector row i.
+    `store[i]` builds the Document on access, so the retriever only materializes its top-k.
+    """
+
+    def __init__(self, texts: StringColumn, keys: StringColumn, metadata: StringColumn,
+                 source_codes: np.ndarray, sources: List[str]):
+        self.texts = texts
+        self.keys = keys
+        self.metadata = metadata
+        self.source_codes = source_codes
+        self.sources = sources
+
+    @classmethod
+    def from_documents(cls, docs: Sequence[Document]) -> ChunkStore:
+        sources: Dict[str, int] = {}
+        codes = np.empty(len(docs), dtype=np.int32)
+        rest: List[str] = []
+        for i, d in enumerate(docs):
+            md = dict(d.metadata or {})
+            src = md.pop("source", None)
+            codes[i] = -1 if src is None else sources.setdefault(src, len(sources))
+            rest.append(json.dumps(md, ensure_ascii=False) if md else "")
+        return cls(StringColumn.build(d.page_content for d in docs), StringColumn.build(doc_key(d) for d in docs),
+                   StringColumn.build(rest), codes, list(sources))
+
+    def __len__(self) -> int:
+        return len(self.source_codes)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        raw = self.metadata[i]
+        md: Dict[str, Any] = json.loads(raw) if raw else {}
+        code = int(self.source_codes[i])
+        if code >= 0:
+            md = {"source": self.sources[code], **md}
+        return Document(page_content=self.texts[i], metadata=md)
+
+    def __iter__(self) -> Iterator[Document]:
+        return (self[i] for i in range(len(self)))
+
+    def chunk_keys(self) -> List[str]:
+        """doc_key of every row, without building Documents."""
+        return self.keys.tolist()
+
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        self.texts.save(path, "chunk_text")
+        self.keys.save(path, "chunk_key")
+        self.metadata.save(path, "chunk_metadata")
+        np.save(path / "chunk_source_codes.npy", self.source_codes)
+        meta = {"n_rows": len(self), "sources": self.sources}
+        (path / CHUNK_STORE_FILE).write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: str | Path, mmap: bool = True) -> ChunkStore:
+        path = Path(path)
+        meta = json.loads((path / CHUNK_STORE_FILE).read_text(encoding="utf-8"))
+        return cls(StringColumn.load(path, "chunk_text", mmap), StringColumn.load(path, "chunk_key", mmap),
+                   StringColumn.load(path, "chunk_metadata", mmap),
+                   np.load(path / "chunk_source_codes.npy", mmap_mode="r" if mmap else None), meta["sources"])
+
+
+def corpus_keys(corpus: Sequence[Document]) -> List[str]:
+    """Row keys of a corpus; read straight from the key column for a ChunkStore."""
+    if isinstance(corpus, ChunkStore):
+        return corpus.chunk_keys()
+    return [doc_key(d) for d in corpus]
+
+
+def chunk_store_exists(path: str | Path) -> bool:
+    return (Path(path) / CHUNK_STORE_FILE).exists()
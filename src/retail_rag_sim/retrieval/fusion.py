@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import os
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+FUSION_METHOD = os.getenv("FUSION_METHOD", "rrf")
+FUSION_METHODS = ("rrf", "combsum", "combmnz")
+
+# One ranked list from one source: integer chunk ids (best first) and optional raw scores
+# (higher = better). Rank-only sources pass None.
+RankList = Tuple[np.ndarray, Optional[np.ndarray]]
+
+
+class FusionResult(NamedTuple):
+    ids: np.ndarray          # fused chunk ids, best first
+    scores: np.ndarray       # fused score per id
+    per_source: np.ndarray   # (len(ids), n_sources) contribution of each source, for debugging
+
+
+def _minmax_per_segment(values: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Min-max normalize each consecutive segment of `values` to [0, 1] (constant segments -> 1)."""
+    if len(values) == 0:
+        return values.astype(np.float64)
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    nonempty = lengths > 0
+    mins = np.zeros(len(lengths))
+    maxs = np.zeros(len(lengths))
+    mins[nonempty] = np.minimum.reduceat(values, starts[nonempty])
+    maxs[nonempty] = np.maximum.reduceat(values, starts[nonempty])
+    seg = np.repeat(np.arange(len(lengths)), lengths)
+    span = maxs[seg] - mins[seg]
+    return np.where(span > 0, (values - mins[seg]) / np.where(span > 0, span, 1.0), 1.0)
+
+
+def fuse_batch(batch: Sequence[Sequence[RankList]], weights: Sequence[float], method: str = FUSION_METHOD,
+               k0: int = 60, top_k: Optional[int] = None) -> List[FusionResult]:
+    """
+    Fuse per-source rank lists for a batch of queries in one set of array ops.
+
+    - rrf:     sum_s w_s / (k0 + rank_s)
+    - combsum: sum_s w_s * minmax(score_s)     (rank-only sources use -rank as score)
+    - combmnz: combsum * number of sources that returned the id
+    """
+    if method not in FUSION_METHODS:
+        raise ValueError(f"Unknown fusion method {method!r}; expected one of {FUSION_METHODS}")
+    n_queries = len(batch)
+    n_sources = len(weights)
+    empty = FusionResult(np.empty(0, dtype=np.int64), np.empty(0), np.empty((0, n_sources)))
+    if n_queries == 0:
+        return []
+
+    q_parts: List[np.ndarray] = []
+    id_parts: List[np.ndarray] = []
+    src_parts: List[np.ndarray] = []
+    contrib_parts: List[np.ndarray] = []
+    for s, w in enumerate(weights):
+        lists = [batch[q][s] for q in range(n_queries)]
+        lengths = np.asarray([len(ids) for ids, _ in lists], dtype=np.int64)
+        if lengths.sum() == 0:
+            continue
+        ids = np.concatenate([np.asarray(ids, dtype=np.int64) for ids, _ in lists])
+        seg_start = np.repeat(np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+        ranks = np.arange(len(ids)) - seg_start + 1
+
+        if method == "rrf":
+            contrib = float(w) / (k0 + ranks)
+        else:
+            raw = np.concatenate([
+                np.asarray(sc, dtype=np.float64) if sc is not None else -np.arange(1, len(i) + 1, dtype=np.float64)
+                for i, sc in lists
+            ])
+            contrib = float(w) * _minmax_per_segment(raw, lengths)
+
+        q_parts.append(np.repeat(np.arange(n_queries), lengths))
+        id_parts.append(ids)
+        src_parts.append(np.full(len(ids), s))
+        contrib_parts.append(contrib)
+
+    if not q_parts:
+        return [empty for _ in range(n_queries)]
+
+    q_col = np.concatenate(q_parts)
+    id_col = np.concatenate(id_parts)
+    span = int(id_col.max()) + 1
+    keys, inverse = np.unique(q_col * span + id_col, return_inverse=True)
+    per_source = np.zeros((len(keys), n_sources))
+    np.add.at(per_source, (inverse, np.concatenate(src_parts)), np.concatenate(contrib_parts))
+
+    total = per_source.sum(axis=1)
+    if method == "combmnz":
+        total = total * np.bincount(inverse, minlength=len(keys))
+
+    q_of, id_of = keys // span, keys % span
+    order = np.lexsort((id_of, -total, q_of))
+    q_of, id_of, total, per_source = q_of[order], id_of[order], total[order], per_source[order]
+    bounds = np.searchsorted(q_of, np.arange(n_queries + 1))
+
+    out: List[FusionResult] = []
+    for q in range(n_queries):
+        lo, hi = bounds[q], bounds[q + 1]
+        if top_k is not None:
+            hi = min(hi, lo + top_k)
+        out.append(FusionResult(id_of[lo:hi], total[lo:hi], per_source[lo:hi]))
+    return out
+
+
+def fuse(sources: Sequence[RankList], weights: Sequence[float], method: str = FUSION_METHOD,
+         k0: int = 60, top_k: Optional[int] = None) -> FusionResult:
+    return fuse_batch([sources], weights, method=method, k0=k0, top_k=top_k)[0]
@@ -1,34 +1,158 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import os
 from pathlib import Path
+from typing import Any, Dict, List
 from dotenv import load_dotenv
 
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import DirectoryLoader, TextLoader
 from langchain_chroma import Chroma
+from langchain_core.documents import Document
 
 from retail_rag_sim.llms.factory import get_embeddings
+from retail_rag_sim.retrieval.registry import bump_index_version
+from retail_rag_sim.retrieval.retriever import doc_key, load_store_documents
+from retail_rag_sim.retrieval.bm25 import BM25Retriever, artifact_exists
+from retail_rag_sim.retrieval.rerank_tokens import (
+    RERANK_TOKENS_DIR,
+    PassageTokens,
+    load_rerank_tokenizer,
+    passage_tokens_exist,
+)
+from retail_rag_sim.retrieval.reranker import RERANK_MODEL
+from retail_rag_sim.retrieval.vector_index import (
+    ANN_BACKENDS,
+    VECTOR_BACKEND,
+    VECTOR_DIR,
+    load_vector_meta,
+    save_vector_artifact,
+)
 
 load_dotenv()
 
 DOCS_DIR = os.getenv("DOCS_DIR", "./data/docs")
 CHROMA_DIR = os.getenv("CHROMA_DIR", "./data/chroma")
+BM25_DIR = os.getenv("BM25_DIR", "./data/bm25")
 COLLECTION = "retail_kb"
+MANIFEST_NAME = "ingest_manifest.json"
+ADD_BATCH_SIZE = 500
 
-def main():
-    loader = DirectoryLoader(
-        DOCS_DIR,
-        glob="**/*.md",
-        loader_cls=TextLoader,
-        loader_kwargs={"encoding": "utf-8"},
-        show_progress=True,
-    )
-    docs = loader.load()
 
-    splitter = RecursiveCharacterTextSplitter(chunk_size=900, chunk_overlap=120)
-    chunks = splitter.split_documents(docs)
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def chunk_id(source: str, text: str, occurrence: int = 0) -> str:
+    """
+    Deterministic chunk ID: same source + same text => same ID across runs and processes.
+    `occurrence` disambiguates identical chunks repeated inside one file.
+    """
+    return _sha256(f"{source}\x00{occurrence}\x00{text}".encode("utf-8"))[:32]
+
+
+def split_file(path: Path, splitter: RecursiveCharacterTextSplitter) -> List[Document]:
+    source = str(path)
+    doc = Document(page_content=path.read_text(encoding="utf-8"), metadata={"source": source})
+    chunks = splitter.split_documents([doc])
+    seen: Dict[str, int] = {}
+    for c in chunks:
+        n = seen.get(c.page_content, 0)
+        seen[c.page_content] = n + 1
+        c.metadata["chunk_id"] = chunk_id(source, c.page_content, n)
+    return chunks
+
+
+def load_manifest(path: Path) -> Dict[str, Any]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_manifest(path: Path, manifest: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def sync_index(vs, docs_dir: str, manifest_path: Path,
+               splitter: RecursiveCharacterTextSplitter) -> Dict[str, int]:
+    """
+    Bring the vector store in line with `docs_dir`, touching only what changed.
+
+    - unchanged files (same sha256) are not even re-split
+    - changed files: only chunks whose ID is new get embedded; vanished chunk IDs are deleted
+    - files gone from disk: all of their chunks are deleted
+    """
+    manifest = load_manifest(manifest_path)
+    old_files: Dict[str, Dict[str, Any]] = manifest.get("files", {})
+    counts = {"files_added": 0, "files_updated": 0, "files_deleted": 0, "files_unchanged": 0,
+              "chunks_added": 0, "chunks_deleted": 0, "chunks_unchanged": 0, "legacy_chunks_removed": 0}
+
+    if not manifest:
+        # Collections written before the manifest existed have random IDs; start clean to avoid duplicates.
+        legacy_ids = vs.get(include=[]).get("ids", [])
+        if legacy_ids:
+            vs.delete(ids=legacy_ids)
+            counts["legacy_chunks_removed"] = len(legacy_ids)
 
+    new_files: Dict[str, Dict[str, Any]] = {}
+    to_add: List[Document] = []
+    to_delete: List[str] = []
+
+    for path in sorted(Path(docs_dir).glob("**/*.md")):
+        source = str(path)
+        file_hash = _sha256(path.read_bytes())
+        prev = old_files.get(source)
+        if prev and prev["sha256"] == file_hash:
+            new_files[source] = prev
+            counts["files_unchanged"] += 1
+            counts["chunks_unchanged"] += len(prev["chunks"])
+            continue
+
+        chunks = split_file(path, splitter)
+        ids = [c.metadata["chunk_id"] for c in chunks]
+        prev_ids = set(prev["chunks"]) if prev else set()
+        to_add.extend(c for c in chunks if c.metadata["chunk_id"] not in prev_ids)
+        to_delete.extend(prev_ids - set(ids))
+        counts["chunks_unchanged"] += len(prev_ids & set(ids))
+        counts["files_updated" if prev else "files_added"] += 1
+        new_files[source] = {"sha256": file_hash, "chunks": ids}
+
+    for source, prev in old_files.items():
+        if source not in new_files:
+            to_delete.extend(prev["chunks"])
+            counts["files_deleted"] += 1
+
+    if to_delete:
+        vs.delete(ids=to_delete)
+    for i in range(0, len(to_add), ADD_BATCH_SIZE):
+        batch = to_add[i:i + ADD_BATCH_SIZE]
+        vs.add_documents(batch, ids=[c.metadata["chunk_id"] for c in batch])
+    counts["chunks_added"] = len(to_add)
+    counts["chunks_deleted"] = len(to_delete)
+
+    save_manifest(manifest_path, {"files": new_files})
+    return counts
+
+
+def write_artifacts(vs) -> None:
+    """
+    Lexical index + in-process vector matrix over the whole collection, in the same row order,
+    memory-mapped by the retriever at startup. Embeddings come from Chroma (no re-embedding).
+    Also per-chunk token lengths for the reranker's truncation and length bucketing.
+    """
+    docs, vectors = load_store_documents(vs, with_embeddings=True)
+    BM25Retriever.from_documents(docs).save(BM25_DIR)
+    PassageTokens(load_rerank_tokenizer(RERANK_MODEL)).save(RERANK_TOKENS_DIR, docs)
+    if docs:
+        backends = ["exact"] + ([VECTOR_BACKEND] if VECTOR_BACKEND in ANN_BACKENDS else [])
+        save_vector_artifact(VECTOR_DIR, vectors, [doc_key(d) for d in docs], backends=backends)
+
+
+def main():
     embeddings = get_embeddings()
     Path(CHROMA_DIR).mkdir(parents=True, exist_ok=True)
     vs = Chroma(
@@ -36,8 +160,25 @@ def main():
         embedding_function=embeddings,
         persist_directory=CHROMA_DIR,
     )
-    vs.add_documents(chunks)
-    print(f"Indexed {len(chunks)} chunks into Chroma at {CHROMA_DIR}")
+    splitter = RecursiveCharacterTextSplitter(chunk_size=900, chunk_overlap=120)
+    counts = sync_index(vs, DOCS_DIR, Path(CHROMA_DIR) / MANIFEST_NAME, splitter)
+
+    changed = counts["chunks_added"] or counts["chunks_deleted"] or counts["legacy_chunks_removed"]
+    vector_meta = load_vector_meta(VECTOR_DIR)
+    vectors_stale = vector_meta is None or (
+        VECTOR_BACKEND in ANN_BACKENDS and VECTOR_BACKEND not in vector_meta["backends"])
+    if changed or not artifact_exists(BM25_DIR) or vectors_stale or not passage_tokens_exist(RERANK_TOKENS_DIR):
+        write_artifacts(vs)
+        # any rewritten artifact (e.g. a newly built ANN backend) must be picked up by running apps
+        bump_index_version(CHROMA_DIR)
+
+    print(
+        f"Files: +{counts['files_added']} ~{counts['files_updated']} -{counts['files_deleted']} "
+        f"(unchanged {counts['files_unchanged']}) | "
+        f"Chunks: +{counts['chunks_added']} -{counts['chunks_deleted']} (unchanged {counts['chunks_unchanged']})"
+    )
+    print(f"Chroma at {CHROMA_DIR}, BM25 artifact at {BM25_DIR}, vectors at {VECTOR_DIR}, "
+          f"rerank token lengths at {RERANK_TOKENS_DIR}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import os
+from abc import ABC, abstractmethod
+from typing import List, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from retail_rag_sim.retrieval.vector_index import _BLOCK_ROWS, Hits, _topk_rows, normalize
+
+load_dotenv()
+
+# First pass keeps k * QUANT_OVERSAMPLE candidates, which are rescored in full precision
+QUANT_OVERSAMPLE = int(os.getenv("QUANT_OVERSAMPLE", "8"))
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(x: np.ndarray) -> np.ndarray:
+        return np.bitwise_count(x)
+else:  # numpy < 2.0
+    _POPCOUNT_LUT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(x: np.ndarray) -> np.ndarray:
+        return _POPCOUNT_LUT[x]
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-dimension scalar quantization: x ~= codes * scale."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scale = np.abs(vectors).max(axis=0) / 127.0
+    scale = np.where(scale > 0, scale, 1.0).astype(np.float32)
+    codes = np.clip(np.rint(vectors / scale), -127, 127).astype(np.int8)
+    return codes, scale
+
+
+def quantize_binary(vectors: np.ndarray) -> np.ndarray:
+    """1 bit per dimension (sign), packed 8 dims per byte."""
+    return np.packbits(np.asarray(vectors) > 0, axis=1)
+
+
+class _RescoringIndex(ABC):
+    """
+    Shared second stage: exact cosine over the (memory-mapped) full-precision rows of the
+    candidates only, so the float matrix never has to be resident in every worker.
+    """
+
+    def __init__(self, full: np.ndarray, oversample: int = QUANT_OVERSAMPLE):
+        self.full = full
+        self.oversample = oversample
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.full)
+
+    @abstractmethod
+    def _candidates(self, queries: np.ndarray, n: int) -> np.ndarray:
+        """(n_queries, n) candidate row ids from the compressed first pass, in any order."""
+
+    def search_batch(self, queries: np.ndarray, k: int) -> List[Hits]:
+        queries = normalize(queries)
+        n_cand = min(self.n_rows, max(k, k * self.oversample))
+        out: List[Hits] = []
+        for q, cands in zip(queries, self._candidates(queries, n_cand), strict=True):
+            cands = np.sort(cands)
+            sims = np.asarray(self.full[cands], dtype=np.float32) @ q
+            rows, scores = _topk_rows(sims[None, :], k)[0]
+            out.append((cands[rows], scores))
+        return out
+
+    def search(self, query: np.ndarray, k: int) -> Hits:
+        return self.search_batch(np.asarray(query)[None, :], k)[0]
+
+
+class Int8Index(_RescoringIndex):
+    """First pass: dot products against int8 codes (4x smaller than float32)."""
+
+    def __init__(self, codes: np.ndarray, scale: np.ndarray, full: np.ndarray, oversample: int = QUANT_OVERSAMPLE):
+        super().__init__(full, oversample)
+        self.codes = codes
+        self.scale = scale
+
+    def _candidates(self, queries: np.ndarray, n: int) -> np.ndarray:
+        q_scaled = queries * self.scale
+        approx = np.empty((len(queries), len(self.codes)), dtype=np.float32)
+        for lo in range(0, len(self.codes), _BLOCK_ROWS):
+            block = np.asarray(self.codes[lo:lo + _BLOCK_ROWS], dtype=np.float32)
+            approx[:, lo:lo + len(block)] = q_scaled @ block.T
+        return np.argpartition(-approx, n - 1, axis=1)[:, :n]
+
+
+class BinaryIndex(_RescoringIndex):
+    """First pass: Hamming distance over sign bits (32x smaller than float32)."""
+
+    def __init__(self, codes: np.ndarray, full: np.ndarray, oversample: int = QUANT_OVERSAMPLE):
+        super().__init__(full, oversample)
+        self.codes = codes
+
+    def _candidates(self, queries: np.ndarray, n: int) -> np.ndarray:
+        q_bits = quantize_binary(queries)
+        dist = np.empty((len(queries), len(self.codes)), dtype=np.int32)
+        for lo in range(0, len(self.codes), _BLOCK_ROWS):
+            block = np.asarray(self.codes[lo:lo + _BLOCK_ROWS])
+            xor = np.bitwise_xor(q_bits[:, None, :], block[None, :, :])
+            dist[:, lo:lo + len(block)] = _popcount(xor).sum(axis=2, dtype=np.int32)
+        return np.argpartition(dist, n - 1, axis=1)[:, :n]
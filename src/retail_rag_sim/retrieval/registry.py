@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+
+from retail_rag_sim.retrieval.retriever import HybridRetriever, build_hybrid_retriever
+
+load_dotenv()
+
+CHROMA_DIR = os.getenv("CHROMA_DIR", "./data/chroma")
+INDEX_VERSION_CHECK_SECONDS = float(os.getenv("INDEX_VERSION_CHECK_SECONDS", "5"))
+INDEX_VERSION_FILE = "index_version"
+
+
+def current_index_version(chroma_dir: str = CHROMA_DIR) -> str:
+    """
+    Version token of the on-disk index.
+    `ingest` writes an explicit token; indexes built before that fall back to the
+    Chroma sqlite mtime so they are still picked up when rebuilt.
+    """
+    token_path = Path(chroma_dir) / INDEX_VERSION_FILE
+    if token_path.exists():
+        return token_path.read_text(encoding="utf-8").strip()
+    db_path = Path(chroma_dir) / "chroma.sqlite3"
+    if db_path.exists():
+        return f"mtime:{db_path.stat().st_mtime_ns}"
+    return "missing"
+
+
+def bump_index_version(chroma_dir: str = CHROMA_DIR) -> str:
+    """
+    Write a fresh version token (atomically) so running processes rebuild their retriever.
+    """
+    token = str(time.time_ns())
+    token_path = Path(chroma_dir) / INDEX_VERSION_FILE
+    token_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = token_path.with_suffix(".tmp")
+    tmp.write_text(token, encoding="utf-8")
+    os.replace(tmp, token_path)
+    return token
+
+
+class RetrieverRegistry:
+    """
+    Process-wide holder for the HybridRetriever.
+
+    The retriever is built once and shared across threads (it is read-only after build).
+    Every `check_interval` seconds the index version is re-read; a changed version
+    triggers a rebuild, otherwise callers get the cached instance without locking.
+    """
+
+    def __init__(self, builder: Callable[[], HybridRetriever] = build_hybrid_retriever,
+                 version_fn: Callable[[], str] = current_index_version,
+                 check_interval: float = INDEX_VERSION_CHECK_SECONDS):
+        self.builder = builder
+        self.version_fn = version_fn
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._retriever: Optional[HybridRetriever] = None
+        self._version: Optional[str] = None
+        self._last_check = 0.0
+        self._stats: Dict[str, Any] = {
+            "builds": 0,
+            "hits": 0,
+            "last_build_seconds": 0.0,
+            "total_build_seconds": 0.0,
+            "last_built_at": None,
+        }
+
+    def get(self) -> HybridRetriever:
+        retr = self._retriever
+        if retr is not None and time.monotonic() - self._last_check < self.check_interval:
+            # counters are best-effort; no lock on the hot path
+            self._stats["hits"] += 1
+            return retr
+
+        with self._lock:
+            version = self.version_fn()
+            self._last_check = time.monotonic()
+            if self._retriever is None or version != self._version:
+                self._build(version)
+            else:
+                self._stats["hits"] += 1
+            return self._retriever
+
+    def reload(self) -> HybridRetriever:
+        """Force a rebuild regardless of the index version."""
+        with self._lock:
+            self._build(self.version_fn())
+            self._last_check = time.monotonic()
+            return self._retriever
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "version": self._version, "loaded": self._retriever is not None}
+
+    def _build(self, version: str) -> None:
+        t0 = time.perf_counter()
+        retr = self.builder()
+        elapsed = time.perf_counter() - t0
+        self._retriever = retr
+        self._version = version
+        self._stats["builds"] += 1
+        self._stats["last_build_seconds"] = elapsed
+        self._stats["total_build_seconds"] += elapsed
+        self._stats["last_built_at"] = time.time()
+
+
+_REGISTRY = RetrieverRegistry()
+
+
+def get_retriever() -> HybridRetriever:
+    return _REGISTRY.get()
+
+
+def reload_retriever() -> HybridRetriever:
+    return _REGISTRY.reload()
+
+
+def retriever_stats() -> Dict[str, Any]:
+    return _REGISTRY.stats()
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+
+from retail_rag_sim.llms.tokens import FALLBACK_CHARS_PER_TOKEN
+from retail_rag_sim.retrieval.retriever import doc_key
+
+load_dotenv()
+
+RERANK_TOKENS_DIR = os.getenv("RERANK_TOKENS_DIR", "./data/rerank_tokens")
+# Token budgets for the cross-encoder input (0 = no truncation beyond the model's own max_length)
+RERANK_MAX_QUERY_TOKENS = int(os.getenv("RERANK_MAX_QUERY_TOKENS", "32"))
+RERANK_MAX_PASSAGE_TOKENS = int(os.getenv("RERANK_MAX_PASSAGE_TOKENS", "256"))
+FALLBACK_TOKENIZER = f"chars/{FALLBACK_CHARS_PER_TOKEN}"
+
+
+def load_rerank_tokenizer(model_name: str) -> Optional[Any]:
+    """Hugging Face tokenizer of the cross-encoder, or None if transformers/the files are unavailable."""
+    try:
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(model_name)
+    except Exception:
+        return None
+
+
+def tokenizer_name(tokenizer: Optional[Any]) -> str:
+    return (getattr(tokenizer, "name_or_path", None) if tokenizer is not None else None) or FALLBACK_TOKENIZER
+
+
+class PassageTokens:
+    """
+    Per chunk: token length and the character offset where `max_tokens` ends, so the reranker can
+    truncate passages and sort pairs by length without re-tokenizing chunks on every request.
+    Filled from the ingest artifact (RERANK_TOKENS_DIR) and, for chunks missing from it, on first use.
+    Without a tokenizer (or a fast one with offsets), lengths are estimated as chars / 4.
+    """
+
+    def __init__(self, tokenizer: Optional[Any] = None, max_tokens: int = RERANK_MAX_PASSAGE_TOKENS,
+                 max_query_tokens: int = RERANK_MAX_QUERY_TOKENS):
+        self.tokenizer = tokenizer if getattr(tokenizer, "is_fast", False) else None
+        self.name = tokenizer_name(self.tokenizer)
+        self.max_tokens = max_tokens
+        self.max_query_tokens = max_query_tokens
+        self._by_key: Dict[str, Tuple[int, int]] = {}
+
+    def measure(self, texts: Sequence[str], max_tokens: Optional[int] = None) -> List[Tuple[int, int]]:
+        """(n_tokens, cut) per text; text[:cut] holds at most `max_tokens` tokens."""
+        budget = self.max_tokens if max_tokens is None else max_tokens
+        if self.tokenizer is None:
+            out = []
+            for t in texts:
+                n = (len(t) + FALLBACK_CHARS_PER_TOKEN - 1) // FALLBACK_CHARS_PER_TOKEN
+                limit = budget * FALLBACK_CHARS_PER_TOKEN
+                if budget <= 0 or len(t) <= limit:
+                    out.append((n, len(t)))
+                else:
+                    space = t.rfind(" ", 0, limit)
+                    out.append((n, space if space > 0 else limit))
+            return out
+        enc = self.tokenizer(list(texts), add_special_tokens=False, return_offsets_mapping=True, truncation=False)
+        return [(len(offs), offs[budget - 1][1] if 0 < budget < len(offs) else len(t))
+                for t, offs in zip(texts, enc["offset_mapping"], strict=True)]
+
+    def truncate_query(self, query: str) -> Tuple[str, int]:
+        n, cut = self.measure([query], self.max_query_tokens)[0]
+        return query[:cut], min(n, self.max_query_tokens) if self.max_query_tokens > 0 else n
+
+    def lookup(self, docs: Sequence[Document]) -> List[Tuple[int, int]]:
+        """(n_tokens, cut) per doc from the cache; unseen chunks are measured in one tokenizer call."""
+        keys = [doc_key(d) for d in docs]
+        missing = [i for i, k in enumerate(keys) if k not in self._by_key]
+        if missing:
+            for i, m in zip(missing, self.measure([docs[i].page_content for i in missing]), strict=True):
+                self._by_key[keys[i]] = m
+        return [self._by_key[k] for k in keys]
+
+    def __len__(self) -> int:
+        return len(self._by_key)
+
+    def save(self, path: str | Path, docs: Sequence[Document]) -> None:
+        """Measure every chunk and write the artifact to a temp dir, then swap it in."""
+        measured = self.measure([d.page_content for d in docs])
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        np.save(tmp / "keys.npy", np.asarray([doc_key(d) for d in docs], dtype=str))
+        np.save(tmp / "n_tokens.npy", np.asarray([n for n, _ in measured], dtype=np.int32))
+        np.save(tmp / "cuts.npy", np.asarray([c for _, c in measured], dtype=np.int32))
+        meta = {"tokenizer": self.name, "max_tokens": self.max_tokens, "n_rows": len(docs)}
+        (tmp / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+
+        old = path.with_name(path.name + ".old")
+        shutil.rmtree(old, ignore_errors=True)
+        if path.exists():
+            os.replace(path, old)
+        os.replace(tmp, path)
+        shutil.rmtree(old, ignore_errors=True)
+
+    def load(self, path: str | Path) -> bool:
+        """Fill the cache from an artifact built with the same tokenizer and budget; False if none matches."""
+        path = Path(path)
+        meta_path = path / "meta.json"
+        if not meta_path.exists():
+            return False
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta.get("tokenizer") != self.name or meta.get("max_tokens") != self.max_tokens:
+            return False
+        keys = np.load(path / "keys.npy")
+        n_tokens = np.load(path / "n_tokens.npy")
+        cuts = np.load(path / "cuts.npy")
+        self._by_key.update(zip(keys.tolist(), zip(n_tokens.tolist(), cuts.tolist(), strict=True), strict=True))
+        return True
+
+
+def passage_tokens_exist(path: str | Path = RERANK_TOKENS_DIR) -> bool:
+    return (Path(path) / "meta.json").exists()
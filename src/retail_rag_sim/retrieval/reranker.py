@@ -1,49 +1,460 @@
 from __future__ import annotations
 
+import hashlib
+import logging
 import os
-from typing import List, Tuple
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
 from dotenv import load_dotenv
 
 from langchain_core.documents import Document
 
+from retail_rag_sim.retrieval.bm25 import tokenize
+from retail_rag_sim.retrieval.rerank_tokens import RERANK_TOKENS_DIR, PassageTokens
+from retail_rag_sim.retrieval.retriever import doc_key
+
 load_dotenv()
 
 RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
 TOP_K_RERANK = int(os.getenv("TOP_K_RERANK", "5"))
+# torch | onnx | openvino (CrossEncoder onnx/openvino backends need sentence-transformers>=4.1)
+RERANK_BACKEND = os.getenv("RERANK_BACKEND", "torch").lower()
+# e.g. onnx/model_qint8_avx512.onnx for the int8-quantized export shipped with the model
+RERANK_ONNX_FILE = os.getenv("RERANK_ONNX_FILE", "")
+# torch backend only: dynamic int8 quantization of the Linear layers for CPU inference
+RERANK_QUANTIZE_INT8 = os.getenv("RERANK_QUANTIZE_INT8", "false").lower() == "true"
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "50000"))
+# Pairs from concurrent requests arriving within this window are scored in one predict() call; 0 disables
+RERANK_BATCH_WINDOW_MS = float(os.getenv("RERANK_BATCH_WINDOW_MS", "2"))
+RERANK_MAX_BATCH = int(os.getenv("RERANK_MAX_BATCH", "64"))
+# Pairs are sorted by token length and fed to the model in buckets of this size (padding is per bucket)
+RERANK_BUCKET_SIZE = int(os.getenv("RERANK_BUCKET_SIZE", "16"))
+# Cascade: skip the cross-encoder on a clear first-stage winner, otherwise only score the
+# RERANK_CASCADE_KEEP best candidates by that cheap first-stage score
+RERANK_CASCADE = os.getenv("RERANK_CASCADE", "false").lower() == "true"
+# gap between the top two first-stage scores (both in [0, 1]); RRF fused scores themselves differ
+# by ~1e-4 between ranks, so their raw gap is no usable threshold
+RERANK_SKIP_MARGIN = float(os.getenv("RERANK_SKIP_MARGIN", "0.35"))
+RERANK_CASCADE_KEEP = int(os.getenv("RERANK_CASCADE_KEEP", "6"))
+# first stage = w * query-term coverage + (1 - w) * min-max normalized fused score
+RERANK_STAGE1_LEXICAL_WEIGHT = float(os.getenv("RERANK_STAGE1_LEXICAL_WEIGHT", "0.5"))
+# While the model is still loading in the background, rerank waits at most this long (s) and then
+# keeps the retriever order; negative = wait for the load as before
+RERANK_READY_TIMEOUT = float(os.getenv("RERANK_READY_TIMEOUT", "-1"))
+
+logger = logging.getLogger(__name__)
+
+Pair = Tuple[str, str]
+
+
+def load_cross_encoder():
+    """
+    Sentence-Transformers CrossEncoder per RERANK_BACKEND. Raises if the heavy deps
+    (torch, etc.) are missing; the service then falls back to "no rerank".
+    """
+    from sentence_transformers import CrossEncoder
+    if RERANK_BACKEND == "torch":
+        model = CrossEncoder(RERANK_MODEL)
+        if RERANK_QUANTIZE_INT8:
+            import torch
+            model.model = torch.quantization.quantize_dynamic(model.model, {torch.nn.Linear}, dtype=torch.qint8)
+        return model
+    model_kwargs = {"file_name": RERANK_ONNX_FILE} if RERANK_ONNX_FILE else {}
+    return CrossEncoder(RERANK_MODEL, backend=RERANK_BACKEND, model_kwargs=model_kwargs)
+
+
+def query_hash(query: str) -> str:
+    return hashlib.sha1(" ".join(query.split()).encode("utf-8")).hexdigest()
+
+
+def score_margin(scores: Sequence[float]) -> float:
+    """Gap between the two best scores (1.0 for a single candidate)."""
+    if len(scores) < 2:
+        return 1.0
+    s0, s1 = sorted(scores, reverse=True)[:2]
+    return float(s0 - s1)
+
+
+def stage1_scores(query: str, docs: List[Document], fused_scores: Sequence[float],
+                  lexical_weight: float = RERANK_STAGE1_LEXICAL_WEIGHT) -> np.ndarray:
+    """
+    Cheap first stage: share of distinct query terms present in the chunk, blended with the
+    fused retrieval score (already paid for). No model call.
+    """
+    q = set(tokenize(query))
+    coverage = np.array([len(q & set(tokenize(d.page_content))) / len(q) if q else 0.0 for d in docs])
+    f = np.asarray(fused_scores, dtype=np.float64)
+    span = f.max() - f.min() if len(f) else 0.0
+    f = (f - f.min()) / span if span > 0 else np.ones_like(f)
+    return lexical_weight * coverage + (1.0 - lexical_weight) * f
+
+
+class _ScoreCache:
+    """LRU of cross-encoder scores keyed by (query hash, chunk id)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys: Sequence[Tuple[str, str]]) -> List[Optional[float]]:
+        out: List[Optional[float]] = []
+        with self._lock:
+            for k in keys:
+                v = self._data.get(k)
+                if v is None:
+                    self.misses += 1
+                else:
+                    self._data.move_to_end(k)
+                    self.hits += 1
+                out.append(v)
+        return out
+
+    def put_many(self, items: Sequence[Tuple[Tuple[str, str], float]]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            for k, v in items:
+                self._data[k] = v
+                self._data.move_to_end(k)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class _MicroBatcher:
+    """
+    Single worker thread that coalesces pair lists submitted within `window_s` of each other
+    (up to `max_batch` pairs) into one predict() call and splits the scores back per request.
+    """
 
-_model = None
-_disabled_reason = None
+    def __init__(self, predict: Callable[[List[Pair], List[int]], Sequence[float]], window_s: float,
+                 max_batch: int, on_batch: Callable[[int, int, float], None]):
+        self.predict = predict
+        self.window_s = window_s
+        self.max_batch = max_batch
+        self.on_batch = on_batch
+        self._queue: "queue.Queue[Tuple[List[Pair], List[int], Future]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name="rerank-batcher", daemon=True)
+        self._thread.start()
 
-def _get_model():
+    def submit(self, pairs: List[Pair], lengths: List[int]) -> Future:
+        fut: Future = Future()
+        self._queue.put((pairs, lengths, fut))
+        return fut
+
+    def _collect(self) -> List[Tuple[List[Pair], List[int], Future]]:
+        batch = [self._queue.get()]
+        n = len(batch[0][0])
+        deadline = time.monotonic() + self.window_s
+        while n < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            n += len(item[0])
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._collect()
+            pairs = [p for req, _, _ in batch for p in req]
+            lengths = [n for _, lens, _ in batch for n in lens]
+            t0 = time.perf_counter()
+            try:
+                scores = [float(s) for s in self.predict(pairs, lengths)]
+            except Exception as e:
+                for _, _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            self.on_batch(len(batch), len(pairs), time.perf_counter() - t0)
+            lo = 0
+            for req, _, fut in batch:
+                fut.set_result(scores[lo:lo + len(req)])
+                lo += len(req)
+
+
+class RerankService:
     """
-    Try to load a Sentence-Transformers CrossEncoder.
-    If the environment lacks the heavy deps (torch, etc.), we fall back gracefully
-    (no rerank) so the app still runs.
+    Cross-encoder scoring with a (query, chunk) score cache and cross-request micro-batching.
+    `loader` returns an object with `predict(pairs, batch_size=...)`; if it raises, the service
+    is disabled and `rerank` keeps the retriever order.
     """
-    global _model, _disabled_reason
-    if _model is not None or _disabled_reason is not None:
-        return _model
 
-    try:
-        from sentence_transformers import CrossEncoder
-        _model = CrossEncoder(RERANK_MODEL)
-        return _model
-    except Exception as e:
-        _disabled_reason = str(e)
-        return None
+    def __init__(self, loader: Callable[[], Any] = load_cross_encoder, cache_size: int = RERANK_CACHE_SIZE,
+                 batch_window_ms: float = RERANK_BATCH_WINDOW_MS, max_batch: int = RERANK_MAX_BATCH,
+                 cascade: bool = RERANK_CASCADE, skip_margin: float = RERANK_SKIP_MARGIN,
+                 cascade_keep: int = RERANK_CASCADE_KEEP, ready_timeout: float = RERANK_READY_TIMEOUT,
+                 bucket_size: int = RERANK_BUCKET_SIZE, tokens_dir: Optional[str] = RERANK_TOKENS_DIR,
+                 max_passage_tokens: Optional[int] = None, max_query_tokens: Optional[int] = None):
+        self.loader = loader
+        self.bucket_size = bucket_size
+        self.tokens_dir = tokens_dir
+        self._token_budgets = {k: v for k, v in (("max_tokens", max_passage_tokens),
+                                                 ("max_query_tokens", max_query_tokens)) if v is not None}
+        self.tokens: Optional[PassageTokens] = None
+        self.tokens_error: Optional[str] = None
+        self.ready_timeout = ready_timeout
+        self.cascade = cascade
+        self.skip_margin = skip_margin
+        self.cascade_keep = cascade_keep
+        self.batch_window_s = batch_window_ms / 1000.0
+        self.max_batch = max_batch
+        self.cache = _ScoreCache(cache_size)
+        self.model: Any = None
+        self.disabled_reason: Optional[str] = None
+        self._load_lock = threading.Lock()
+        self._batcher: Optional[_MicroBatcher] = None
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._requests_batched = 0
+        self._pairs_scored = 0
+        self._max_batch_pairs = 0
+        self._batch_ms: deque = deque(maxlen=1000)
+        self._cascade = {"requests": 0, "skipped_margin": 0, "pruned_pairs": 0}
+        # set once loading has finished, successfully or not
+        self.ready = threading.Event()
+        self.load_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+        self._warmup_thread: Optional[threading.Thread] = None
+        self._not_ready_fallbacks = 0
+        self._padding = {"pair_tokens": 0, "padded_tokens": 0, "unbucketed_padded_tokens": 0, "truncated_passages": 0}
+
+    def _get_model(self):
+        if self.model is not None or self.disabled_reason is not None:
+            return self.model
+        with self._load_lock:
+            if self.model is None and self.disabled_reason is None:
+                t0 = time.perf_counter()
+                try:
+                    model = self.loader()
+                except Exception as e:
+                    self.disabled_reason = f"{type(e).__name__}: {e}"
+                    logger.warning("Reranker disabled, keeping retriever order: %s", self.disabled_reason)
+                else:
+                    self.tokens = self._load_tokens(model)
+                    self.model = model
+                self.load_seconds = time.perf_counter() - t0
+                self.ready.set()
+        return self.model
+
+    def _load_tokens(self, model: Any) -> PassageTokens:
+        """
+        Lengths/truncation points with the model's own tokenizer, prefilled from the ingest artifact.
+        A broken artifact only costs the prefill: chunks are then measured on first use.
+        """
+        tokens = PassageTokens(getattr(model, "tokenizer", None), **self._token_budgets)
+        if not self.tokens_dir:
+            return tokens
+        try:
+            tokens.load(self.tokens_dir)
+        except Exception as e:
+            self.tokens_error = f"{type(e).__name__}: {e}"
+            logger.warning("Ignoring rerank token artifact %s, measuring chunks on first use: %s",
+                           self.tokens_dir, self.tokens_error)
+            tokens = PassageTokens(getattr(model, "tokenizer", None), **self._token_budgets)
+        return tokens
+
+    def _warm_up(self) -> None:
+        if self._get_model() is None:
+            return
+        t0 = time.perf_counter()
+        try:
+            # first predict() pays for kernel selection / graph optimization; keep it off the request path
+            self._predict([("warm up", "warm up the reranker")], [8])
+        except Exception as e:
+            logger.warning("Reranker warm-up prediction failed: %s: %s", type(e).__name__, e)
+        self.warmup_seconds = time.perf_counter() - t0
+
+    def warm_up(self, block: bool = False) -> threading.Thread:
+        """
+        Load the model and run one dummy prediction in a background thread (started once).
+        Requests that do not rerank are served meanwhile; `ready` is set when loading ends.
+        """
+        with self._load_lock:
+            if self._warmup_thread is None:
+                self._warmup_thread = threading.Thread(target=self._warm_up, name="rerank-warmup", daemon=True)
+                self._warmup_thread.start()
+        if block:
+            self._warmup_thread.join()
+        return self._warmup_thread
+
+    def _model_or_wait(self):
+        if (self.ready_timeout >= 0 and self._warmup_thread is not None
+                and not self.ready.wait(self.ready_timeout)):
+            with self._stats_lock:
+                self._not_ready_fallbacks += 1
+            return None
+        return self._get_model()
+
+    def _predict(self, pairs: List[Pair], lengths: List[int]) -> List[float]:
+        """
+        Score pairs sorted by token length, `bucket_size` at a time, so each forward pass pads to
+        its own longest pair instead of the longest in the whole batch; scores come back in input order.
+        """
+        order = np.argsort(np.asarray(lengths), kind="stable")
+        bucket = max(min(self.bucket_size, len(pairs)), 1)
+        scores = self.model.predict([pairs[i] for i in order], batch_size=bucket, show_progress_bar=False)
+        out = [0.0] * len(pairs)
+        for i, sc in zip(order, scores, strict=True):
+            out[i] = float(sc)
+        sorted_lens = [lengths[i] for i in order]
+        padded = sum(len(b) * max(b) for b in (sorted_lens[lo:lo + bucket] for lo in range(0, len(pairs), bucket)))
+        with self._stats_lock:
+            self._padding["pair_tokens"] += sum(lengths)
+            self._padding["padded_tokens"] += padded
+            self._padding["unbucketed_padded_tokens"] += len(lengths) * max(lengths)
+        return out
+
+    def _record_batch(self, n_requests: int, n_pairs: int, seconds: float) -> None:
+        with self._stats_lock:
+            self._batches += 1
+            self._requests_batched += n_requests
+            self._pairs_scored += n_pairs
+            self._max_batch_pairs = max(self._max_batch_pairs, n_pairs)
+            self._batch_ms.append(seconds * 1000.0)
+
+    def _score_pairs(self, pairs: List[Pair], lengths: List[int]) -> List[float]:
+        if self.batch_window_s <= 0:
+            t0 = time.perf_counter()
+            scores = self._predict(pairs, lengths)
+            self._record_batch(1, len(pairs), time.perf_counter() - t0)
+            return scores
+        if self._batcher is None:
+            with self._load_lock:
+                if self._batcher is None:
+                    self._batcher = _MicroBatcher(self._predict, self.batch_window_s, self.max_batch,
+                                                  self._record_batch)
+        return self._batcher.submit(pairs, lengths).result()
+
+    def score(self, query: str, docs: List[Document]) -> Optional[List[float]]:
+        """Cross-encoder scores aligned with `docs`, or None when the model is unavailable (or still loading)."""
+        if self._model_or_wait() is None:
+            return None
+        qh = query_hash(query)
+        keys = [(qh, doc_key(d)) for d in docs]
+        scores = self.cache.get_many(keys)
+        missing = [i for i, s in enumerate(scores) if s is None]
+        if missing:
+            q, q_len = self.tokens.truncate_query(query)
+            measured = self.tokens.lookup([docs[i] for i in missing])
+            pairs = [(q, docs[i].page_content[:cut]) for i, (_, cut) in zip(missing, measured, strict=True)]
+            lengths = [q_len + min(n, self.tokens.max_tokens) if self.tokens.max_tokens > 0 else q_len + n
+                       for n, _ in measured]
+            with self._stats_lock:
+                self._padding["truncated_passages"] += sum(
+                    cut < len(docs[i].page_content) for i, (_, cut) in zip(missing, measured, strict=True))
+            fresh = self._score_pairs(pairs, lengths)
+            for i, s in zip(missing, fresh, strict=True):
+                scores[i] = s
+            self.cache.put_many([(keys[i], s) for i, s in zip(missing, fresh, strict=True)])
+        return scores
 
-def rerank(query: str, docs: List[Document], top_k: int = TOP_K_RERANK) -> List[Tuple[Document, float]]:
+    def rerank(self, query: str, docs: List[Document], top_k: int = TOP_K_RERANK,
+               fused_scores: Optional[Sequence[float]] = None) -> List[Tuple[Document, float]]:
+        """
+        With `fused_scores` (aligned with `docs`) and cascade enabled, candidates get `stage1_scores`:
+        a winner ahead by `skip_margin` skips the cross-encoder (stage-1 order and scores are returned),
+        otherwise only the `cascade_keep` best by stage 1 are cross-encoded; pruned ones follow them
+        with score -inf.
+        """
+        if not docs:
+            return []
+        pruned: List[Document] = []
+        if self.cascade and fused_scores is not None and len(fused_scores) == len(docs):
+            with self._stats_lock:
+                self._cascade["requests"] += 1
+            stage1 = stage1_scores(query, docs, fused_scores)
+            order = np.argsort(-stage1, kind="stable")
+            if len(docs) > 1 and score_margin(stage1) >= self.skip_margin:
+                with self._stats_lock:
+                    self._cascade["skipped_margin"] += 1
+                return [(docs[i], float(stage1[i])) for i in order[:top_k]]
+            if len(docs) > self.cascade_keep:
+                pruned = [docs[i] for i in order[self.cascade_keep:]]
+                docs = [docs[i] for i in order[:self.cascade_keep]]
+                with self._stats_lock:
+                    self._cascade["pruned_pairs"] += len(pruned)
+
+        scores = self.score(query, docs)
+        if scores is None:
+            return [(d, 0.0) for d in (docs + pruned)[:top_k]]
+        ranked = sorted(zip(docs, scores), key=lambda x: float(x[1]), reverse=True)
+        ranked += [(d, float("-inf")) for d in pruned]
+        return ranked[:top_k]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            batch_ms = sorted(self._batch_ms)
+            s: Dict[str, Any] = {
+                "ready": self.ready.is_set(),
+                "model_loaded": self.model is not None,
+                "disabled_reason": self.disabled_reason,
+                "warming_up": self._warmup_thread is not None and self._warmup_thread.is_alive(),
+                "load_seconds": self.load_seconds,
+                "warmup_seconds": self.warmup_seconds,
+                "not_ready_fallbacks": self._not_ready_fallbacks,
+                "batches": self._batches,
+                "pairs_scored": self._pairs_scored,
+                "mean_batch_pairs": (self._pairs_scored / self._batches) if self._batches else 0.0,
+                "max_batch_pairs": self._max_batch_pairs,
+                "mean_requests_per_batch": (self._requests_batched / self._batches) if self._batches else 0.0,
+                "mean_batch_ms": (sum(batch_ms) / len(batch_ms)) if batch_ms else 0.0,
+                "p95_batch_ms": batch_ms[int(0.95 * (len(batch_ms) - 1))] if batch_ms else 0.0,
+            }
+            s.update({f"cascade_{k}": v for k, v in self._cascade.items()})
+            s.update(self._padding)
+            s["padding_ratio"] = (self._padding["padded_tokens"] / self._padding["pair_tokens"]
+                                  if self._padding["pair_tokens"] else 0.0)
+            s["unbucketed_padding_ratio"] = (self._padding["unbucketed_padded_tokens"] / self._padding["pair_tokens"]
+                                             if self._padding["pair_tokens"] else 0.0)
+            s["token_lengths_cached"] = len(self.tokens) if self.tokens is not None else 0
+            s["token_artifact_error"] = self.tokens_error
+        lookups = self.cache.hits + self.cache.misses
+        s.update({"cache_entries": len(self.cache), "cache_hits": self.cache.hits,
+                  "cache_hit_rate": (self.cache.hits / lookups) if lookups else 0.0})
+        return s
+
+
+_service = RerankService()
+
+
+def get_rerank_service() -> RerankService:
+    return _service
+
+
+def rerank(query: str, docs: List[Document], top_k: int = TOP_K_RERANK,
+           fused_scores: Optional[Sequence[float]] = None) -> List[Tuple[Document, float]]:
     """
     Returns list of (Document, score), highest first.
     Fallback: if reranker unavailable, keep original order with score=0.0.
+    Passing the retriever's fused scores enables the cascade (RERANK_CASCADE).
     """
-    if not docs:
-        return []
-    model = _get_model()
-    if model is None:
-        return [(d, 0.0) for d in docs[:top_k]]
+    return _service.rerank(query, docs, top_k, fused_scores=fused_scores)
+
+
+def warm_up_reranker(block: bool = False) -> threading.Thread:
+    """Startup hook: load the cross-encoder in the background (see RerankService.warm_up)."""
+    return _service.warm_up(block=block)
+
+
+def reranker_ready() -> bool:
+    return _service.ready.is_set()
+
 
-    pairs = [(query, d.page_content) for d in docs]
-    scores = model.predict(pairs)
-    ranked = sorted(zip(docs, scores), key=lambda x: float(x[1]), reverse=True)
-    return ranked[:top_k]
+def reranker_stats() -> Dict[str, Any]:
+    return _service.stats()
@@ -1,59 +1,260 @@
 from __future__ import annotations
 
+import asyncio
+import contextvars
 import os
-from typing import Dict, List, Tuple
+import threading
+import time
+import warnings
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 from dotenv import load_dotenv
 
+import numpy as np
 from langchain_chroma import Chroma
-from langchain_community.retrievers import BM25Retriever
 from langchain_core.documents import Document
 
+from retail_rag_sim.llms.embedding_cache import embed_queries
 from retail_rag_sim.llms.factory import get_embeddings
+from retail_rag_sim.retrieval.bm25 import BM25Retriever, artifact_exists
+from retail_rag_sim.retrieval.chunk_store import corpus_keys, doc_key
+from retail_rag_sim.retrieval.fusion import FUSION_METHOD, fuse_batch
+from retail_rag_sim.retrieval.vector_index import (
+    VECTOR_BACKEND,
+    VECTOR_DIR,
+    DenseVectorRetriever,
+    keys_fingerprint,
+    load_vector_index,
+    load_vector_meta,
+)
 
 load_dotenv()
 
 CHROMA_DIR = os.getenv("CHROMA_DIR", "./data/chroma")
+BM25_DIR = os.getenv("BM25_DIR", "./data/bm25")
 TOP_K_RETRIEVE = int(os.getenv("TOP_K_RETRIEVE", "10"))
 COLLECTION = "retail_kb"
+RETRIEVE_CONCURRENT = os.getenv("RETRIEVE_CONCURRENT", "true").lower() == "true"
+RETRIEVE_LEG_TIMEOUT = float(os.getenv("RETRIEVE_LEG_TIMEOUT", "5.0"))
+
+# Shared by all retriever instances; two legs per in-flight query
+_LEG_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("RETRIEVE_POOL_SIZE", "16")), thread_name_prefix="retrieve")
+
+
+# A leg result: integer row ids (or Documents still to be mapped to ids) plus optional raw scores
+Leg = Tuple[Union[np.ndarray, List[Document]], Optional[np.ndarray]]
+_EMPTY_LEG: Leg = (np.empty(0, dtype=np.int64), None)
 
 
 class HybridRetriever:
     """
     Lightweight hybrid retriever (BM25 + Vector) that does NOT depend on `langchain.retrievers`.
 
-    Uses Reciprocal Rank Fusion (RRF) with weights to merge results:
+    Both legs are fused over integer row ids (see `fusion.py`). The default is weighted
+    Reciprocal Rank Fusion:
       score += weight / (k0 + rank)
+    CombSUM / CombMNZ are selectable with `method` (FUSION_METHOD).
+
+    With `concurrent=True` both legs run at the same time (the vector leg is network-bound,
+    BM25 is CPU-bound). A leg that misses `leg_timeout` contributes no results instead of
+    stalling the request.
     """
 
     def __init__(self, bm25: BM25Retriever, vector_retriever, weights: Tuple[float, float] = (0.4, 0.6),
-                 top_k: int = TOP_K_RETRIEVE, k0: int = 60):
+                 top_k: int = TOP_K_RETRIEVE, k0: int = 60, concurrent: bool = RETRIEVE_CONCURRENT,
+                 leg_timeout: float = RETRIEVE_LEG_TIMEOUT, method: str = FUSION_METHOD):
         self.bm25 = bm25
         self.vector = vector_retriever
         self.weights = weights
         self.top_k = top_k
         self.k0 = k0
+        self.concurrent = concurrent
+        self.leg_timeout = leg_timeout
+        self.method = method
+        self.leg_timeouts = {"bm25": 0, "vector": 0}
+        # timed-out legs still running on _LEG_POOL (a started thread cannot be cancelled)
+        self.late_legs = 0
+        self._late_lock = threading.Lock()
+
+        # Row ids are positions in the BM25 corpus; vector hits are mapped onto them by chunk ID
+        # (a ChunkStore when loaded from the ingest artifact: Documents are built only for hits)
+        self.corpus: Sequence[Document] = getattr(bm25, "docs", [])
+        self._row_of: Dict[str, int] = {k: i for i, k in enumerate(corpus_keys(self.corpus))}
+
+    @property
+    def chunk_ids(self):
+        """Live chunk IDs of the loaded index (O(1) membership)."""
+        return self._row_of.keys()
+
+    # ---- legs ----
+    def _bm25_leg(self, query: str) -> Leg:
+        index = getattr(self.bm25, "index", None)
+        if index is not None:
+            return index.search(query, self.bm25.k)
+        docs = self.bm25.invoke(query) if hasattr(self.bm25, "invoke") else self.bm25.get_relevant_documents(query)
+        return docs, None
+
+    def _vector_k(self) -> int:
+        return int(getattr(self.vector, "search_kwargs", {}).get("k", self.top_k))
+
+    def _vector_leg(self, query: str) -> Leg:
+        if hasattr(self.vector, "search_rows"):
+            return self.vector.search_rows(query)
+        vs = getattr(self.vector, "vectorstore", None)
+        if vs is None:
+            return self.vector.invoke(query), None
+        hits = vs.similarity_search_with_score(query, k=self._vector_k())
+        # distances: lower is better
+        return [d for d, _ in hits], -np.asarray([dist for _, dist in hits], dtype=np.float64)
+
+    async def _avector_leg(self, query: str) -> Leg:
+        vs = getattr(self.vector, "vectorstore", None)
+        if hasattr(self.vector, "search_rows") or (vs is None and not hasattr(self.vector, "ainvoke")):
+            return await self._apool_leg(self._vector_leg, query)
+        if vs is None:
+            return await asyncio.wait_for(self.vector.ainvoke(query), self.leg_timeout), None
+        hits = await asyncio.wait_for(vs.asimilarity_search_with_score(query, k=self._vector_k()), self.leg_timeout)
+        return [d for d, _ in hits], -np.asarray([dist for _, dist in hits], dtype=np.float64)
+
+    async def _apool_leg(self, fn, query: str) -> Leg:
+        """Run a blocking leg on _LEG_POOL so a timed-out one is abandoned (and counted) like in `_legs`."""
+        fut = _LEG_POOL.submit(contextvars.copy_context().run, fn, query)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(fut), self.leg_timeout)
+        except asyncio.TimeoutError:
+            self._abandon(fut)
+            raise
+
+    def _legs(self, query: str) -> List[Leg]:
+        if not self.concurrent:
+            return [self._bm25_leg(query), self._vector_leg(query)]
+
+        futures = {"bm25": _LEG_POOL.submit(self._bm25_leg, query),
+                   "vector": _LEG_POOL.submit(self._vector_leg, query)}
+        deadline = time.monotonic() + self.leg_timeout
+        legs: List[Leg] = []
+        for name, fut in futures.items():
+            try:
+                legs.append(fut.result(timeout=max(0.0, deadline - time.monotonic())))
+            except FuturesTimeout:
+                self.leg_timeouts[name] += 1
+                legs.append(_EMPTY_LEG)
+                self._abandon(fut)
+        return legs
+
+    def _abandon(self, fut: Future) -> None:
+        """Cancel a leg that has not started; otherwise count it as late until its worker frees up."""
+        if fut.cancel():
+            return
+        with self._late_lock:
+            self.late_legs += 1
+
+        def _done(_):
+            with self._late_lock:
+                self.late_legs -= 1
+        fut.add_done_callback(_done)
+
+    async def _alegs(self, query: str) -> List[Leg]:
+        results = await asyncio.gather(
+            self._apool_leg(self._bm25_leg, query),
+            self._avector_leg(query),
+            return_exceptions=True,
+        )
+        legs: List[Leg] = []
+        for name, res in zip(["bm25", "vector"], results, strict=True):
+            if isinstance(res, asyncio.TimeoutError):
+                self.leg_timeouts[name] += 1
+                legs.append(_EMPTY_LEG)
+            elif isinstance(res, BaseException):
+                raise res
+            else:
+                legs.append(res)
+        return legs
 
+    # ---- public API ----
     def invoke(self, query: str) -> List[Document]:
-        bm_docs = self.bm25.invoke(query) if hasattr(self.bm25, "invoke") else self.bm25.get_relevant_documents(query)
-        vec_docs = self.vector.invoke(query)
+        return [d for d, _ in self._fuse([self._legs(query)])[0]]
 
-        scores: Dict[str, float] = {}
-        docs_map: Dict[str, Document] = {}
+    async def ainvoke(self, query: str) -> List[Document]:
+        return [d for d, _ in self._fuse([await self._alegs(query)])[0]]
 
-        def _key(d: Document) -> str:
-            # stable-ish key for dedupe
-            src = (d.metadata or {}).get("source", "unknown")
-            return f"{src}::{hash(d.page_content)}"
+    def invoke_with_scores(self, query: str) -> List[Tuple[Document, Dict[str, float]]]:
+        """
+        Like `invoke`, but each doc comes with {"fused", "bm25", "vector"} scores
+        (debugging, and the reranker's cascade decisions).
+        """
+        return self._fuse([self._legs(query)])[0]
 
-        # RRF scoring
-        for w, docs in zip(self.weights, [bm_docs, vec_docs]):
-            for rank, d in enumerate(docs, start=1):
-                k = _key(d)
-                docs_map[k] = d
-                scores[k] = scores.get(k, 0.0) + float(w) / float(self.k0 + rank)
+    async def ainvoke_with_scores(self, query: str) -> List[Tuple[Document, Dict[str, float]]]:
+        return self._fuse([await self._alegs(query)])[0]
 
-        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
-        return [docs_map[k] for k, _ in ranked[: self.top_k]]
+    def batch_invoke(self, queries: List[str]) -> List[List[Document]]:
+        """
+        Retrieve for many queries at once (offline eval, FAQ precomputation):
+        one BM25 pass over shared postings, one embeddings request plus one vector search
+        (per-vector searches for a vector store), and one fusion pass for the whole batch.
+        """
+        if not queries:
+            return []
+        index = getattr(self.bm25, "index", None)
+        if index is not None:
+            bm_legs: List[Leg] = index.search_batch(queries, self.bm25.k)
+        else:
+            bm_legs = [self._bm25_leg(q) for q in queries]
+        vec_legs = self._vector_legs_batch(queries)
+        fused = self._fuse([[bm, vec] for bm, vec in zip(bm_legs, vec_legs, strict=True)])
+        return [[d for d, _ in hits] for hits in fused]
+
+    def _vector_legs_batch(self, queries: List[str]) -> List[Leg]:
+        if hasattr(self.vector, "search_rows_batch"):
+            # one matrix multiply for the whole batch
+            return self.vector.search_rows_batch(queries)
+        vs = getattr(self.vector, "vectorstore", None)
+        by_vector = getattr(vs, "similarity_search_by_vector_with_relevance_scores", None)
+        if by_vector is None:
+            return list(_LEG_POOL.map(self._vector_leg, queries))
+        # one embeddings request for the batch; the per-vector store searches are local
+        k = self._vector_k()
+
+        def _search(vec: List[float]) -> Leg:
+            hits = by_vector(vec, k=k)
+            return [d for d, _ in hits], -np.asarray([dist for _, dist in hits], dtype=np.float64)
+
+        return list(_LEG_POOL.map(_search, embed_queries(vs.embeddings, queries)))
+
+    # ---- fusion ----
+    def _fuse(self, batch: List[List[Leg]]) -> List[List[Tuple[Document, Dict[str, float]]]]:
+        # Docs missing from the BM25 corpus (e.g. stale artifact) get ids past the end, per call
+        extra_rows: Dict[str, int] = {}
+        extra_docs: List[Document] = []
+
+        def _ids(docs: List[Document]) -> np.ndarray:
+            out = np.empty(len(docs), dtype=np.int64)
+            for j, d in enumerate(docs):
+                key = doc_key(d)
+                row = self._row_of.get(key)
+                if row is None:
+                    row = extra_rows.get(key)
+                    if row is None:
+                        row = extra_rows[key] = len(self.corpus) + len(extra_docs)
+                        extra_docs.append(d)
+                out[j] = row
+            return out
+
+        rank_lists = [[(ids if isinstance(ids, np.ndarray) else _ids(ids), scores) for ids, scores in legs]
+                      for legs in batch]
+        results = fuse_batch(rank_lists, self.weights, method=self.method, k0=self.k0, top_k=self.top_k)
+
+        n = len(self.corpus)
+        out = []
+        for res in results:
+            hits = []
+            for row, score, per_source in zip(res.ids.tolist(), res.scores.tolist(), res.per_source.tolist(), strict=True):
+                doc = self.corpus[row] if row < n else extra_docs[row - n]
+                hits.append((doc, {"fused": score, "bm25": per_source[0], "vector": per_source[1]}))
+            out.append(hits)
+        return out
 
 
 def build_hybrid_retriever() -> HybridRetriever:
@@ -63,18 +264,47 @@ def build_hybrid_retriever() -> HybridRetriever:
         embedding_function=embeddings,
         persist_directory=CHROMA_DIR,
     )
-    vector_retriever = vs.as_retriever(search_kwargs={"k": TOP_K_RETRIEVE})
 
-    # Build BM25 corpus from stored chunks (simple demo approach)
-    all_docs = vs.get(include=["documents", "metadatas"])
+    # Prefer the memory-mapped artifact written by ingest; fall back to building from stored chunks
+    if artifact_exists(BM25_DIR):
+        bm25 = BM25Retriever.load(BM25_DIR, k=TOP_K_RETRIEVE)
+    else:
+        bm25 = build_bm25_from_store(vs)
+
+    return HybridRetriever(bm25=bm25, vector_retriever=build_vector_leg(vs, embeddings, bm25.docs))
+
+
+def build_vector_leg(vs: Chroma, embeddings, corpus: Sequence[Document]):
+    """
+    Chroma retriever by default; with VECTOR_BACKEND=exact|ivf|hnsw, the in-process index from
+    VECTOR_DIR (only if it was built for the same rows as the BM25 corpus).
+    """
+    chroma_leg = vs.as_retriever(search_kwargs={"k": TOP_K_RETRIEVE})
+    if VECTOR_BACKEND == "chroma":
+        return chroma_leg
+
+    meta = load_vector_meta(VECTOR_DIR)
+    if (meta is None or VECTOR_BACKEND not in meta["backends"]
+            or meta["keys_sha256"] != keys_fingerprint(corpus_keys(corpus))):
+        warnings.warn(f"VECTOR_BACKEND={VECTOR_BACKEND} but {VECTOR_DIR} is missing or out of date; "
+                      "falling back to Chroma. Re-run ingest to rebuild it.", stacklevel=2)
+        return chroma_leg
+    return DenseVectorRetriever(load_vector_index(VECTOR_DIR, VECTOR_BACKEND), embeddings, corpus, k=TOP_K_RETRIEVE)
+
+
+def load_store_documents(vs: Chroma, with_embeddings: bool = False) -> Tuple[List[Document], Optional[np.ndarray]]:
+    include = ["documents", "metadatas"] + (["embeddings"] if with_embeddings else [])
+    all_docs = vs.get(include=include)
     docs: List[Document] = []
     for txt, md in zip(all_docs.get("documents", []), all_docs.get("metadatas", [])):
         docs.append(Document(page_content=txt, metadata=md or {}))
+    vectors = np.asarray(all_docs["embeddings"], dtype=np.float32) if with_embeddings else None
+    return docs, vectors
 
-    bm25 = BM25Retriever.from_documents(docs)
-    bm25.k = TOP_K_RETRIEVE
 
-    return HybridRetriever(bm25=bm25, vector_retriever=vector_retriever)
+def build_bm25_from_store(vs: Chroma) -> BM25Retriever:
+    docs, _ = load_store_documents(vs)
+    return BM25Retriever.from_documents(docs, k=TOP_K_RETRIEVE)
 
 
 def format_citations(docs: List[Document]) -> List[dict]:
@@ -82,5 +312,5 @@ def format_citations(docs: List[Document]) -> List[dict]:
     for i, d in enumerate(docs, start=1):
         src = (d.metadata or {}).get("source", "unknown")
         excerpt = d.page_content[:220].replace("\n", " ") + "..."
-        cites.append({"id": i, "source": src, "excerpt": excerpt})
+        cites.append({"id": i, "source": src, "excerpt": excerpt, "chunk_id": doc_key(d)})
     return cites
@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+
+from retail_rag_sim.llms.embedding_cache import embed_queries
+
+load_dotenv()
+
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")  # chroma | exact | ivf | hnsw | int8 | binary
+VECTOR_DIR = os.getenv("VECTOR_DIR", "./data/vectors")
+VECTOR_DTYPE = os.getenv("VECTOR_DTYPE", "float32")     # float32 | float16
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+HNSW_EF = int(os.getenv("HNSW_EF", "64"))
+FORMAT_VERSION = 1
+# Backends that need extra structures next to the exact matrix (built at ingest on demand)
+ANN_BACKENDS = ("ivf", "hnsw", "int8", "binary")
+
+_BLOCK_ROWS = 65536  # rows scored per matmul block (bounds temp memory for float16 upcasts)
+
+Hits = Tuple[np.ndarray, np.ndarray]  # (row ids, cosine scores), best first
+
+
+def normalize(x: np.ndarray) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float32)
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.where(norms > 0, norms, 1.0)
+
+
+def keys_fingerprint(keys: Sequence[str]) -> str:
+    """Identifies the row order an artifact was built for (must match the BM25 corpus)."""
+    h = hashlib.sha256()
+    for k in keys:
+        h.update(k.encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+def _topk_rows(sims: np.ndarray, k: int) -> List[Hits]:
+    """Row-wise top-k of a (n_queries, n_candidates) score matrix."""
+    k = min(k, sims.shape[1])
+    if k == 0:
+        return [(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)) for _ in range(len(sims))]
+    part = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(sims, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    rows = np.take_along_axis(part, order, axis=1)
+    scores = np.take_along_axis(part_scores, order, axis=1)
+    return list(zip(rows.astype(np.int64), scores, strict=True))
+
+
+class ExactIndex:
+    """
+    Exact cosine top-k over a row-normalized (n, dim) matrix, typically memory-mapped so
+    forked workers share the same pages read-only.
+    """
+
+    def __init__(self, vectors: np.ndarray, block_rows: int = _BLOCK_ROWS):
+        self.vectors = vectors
+        self.block_rows = block_rows
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.vectors)
+
+    def search_batch(self, queries: np.ndarray, k: int) -> List[Hits]:
+        """
+        Scores one block of rows at a time and keeps a running top-k per query, so temp memory
+        is (n_queries, block_rows) rather than (n_queries, n_rows).
+        """
+        queries = normalize(queries)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for lo in range(0, self.n_rows, self.block_rows):
+            block = np.asarray(self.vectors[lo:lo + self.block_rows], dtype=np.float32)
+            block_hits = _topk_rows(queries @ block.T, k)
+            rows = np.hstack([best_rows, np.stack([r + lo for r, _ in block_hits])])
+            scores = np.hstack([best_scores, np.stack([sc for _, sc in block_hits])])
+            merged = _topk_rows(scores, k)
+            best_rows = np.stack([r[idx] for r, (idx, _) in zip(rows, merged, strict=True)])
+            best_scores = np.stack([sc for _, sc in merged])
+        return list(zip(best_rows, best_scores, strict=True))
+
+    def search(self, query: np.ndarray, k: int) -> Hits:
+        return self.search_batch(np.asarray(query)[None, :], k)[0]
+
+
+def _spherical_kmeans(x: np.ndarray, n_clusters: int, iters: int = 10, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(x), n_clusters * 64)
+    sample = np.asarray(x[np.sort(rng.choice(len(x), size=sample_size, replace=False))], dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), size=n_clusters, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        filled = np.bincount(assign, minlength=n_clusters) > 0
+        centroids[filled] = normalize(sums[filled])
+    return centroids
+
+
+class IVFIndex(ExactIndex):
+    """
+    Inverted-file index: rows are bucketed by their nearest centroid; a query scores only the
+    rows in its `nprobe` closest buckets (exactly, against the same matrix).
+    """
+
+    def __init__(self, vectors: np.ndarray, centroids: np.ndarray, list_ptr: np.ndarray, list_rows: np.ndarray,
+                 nprobe: int = IVF_NPROBE):
+        super().__init__(vectors)
+        self.centroids = centroids
+        self.list_ptr = list_ptr
+        self.list_rows = list_rows
+        self.nprobe = nprobe
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, n_lists: Optional[int] = None, nprobe: int = IVF_NPROBE) -> IVFIndex:
+        n_lists = n_lists or max(1, int(np.sqrt(len(vectors))))
+        n_lists = min(n_lists, len(vectors))
+        centroids = _spherical_kmeans(vectors, n_lists)
+        assign = np.empty(len(vectors), dtype=np.int64)
+        for lo in range(0, len(vectors), _BLOCK_ROWS):
+            block = np.asarray(vectors[lo:lo + _BLOCK_ROWS], dtype=np.float32)
+            assign[lo:lo + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        list_rows = np.argsort(assign, kind="stable").astype(np.int64)
+        list_ptr = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assign, minlength=n_lists), out=list_ptr[1:])
+        return cls(vectors, centroids, list_ptr, list_rows, nprobe=nprobe)
+
+    def search_batch(self, queries: np.ndarray, k: int) -> List[Hits]:
+        queries = normalize(queries)
+        nprobe = min(self.nprobe, len(self.centroids))
+        probes = _topk_rows(queries @ self.centroids.T, nprobe)
+        out: List[Hits] = []
+        for q, (lists, _) in zip(queries, probes, strict=True):
+            # sorted candidates -> sequential reads from the memory-mapped matrix
+            cands = np.sort(np.concatenate([self.list_rows[self.list_ptr[c]:self.list_ptr[c + 1]] for c in lists]))
+            sims = np.asarray(self.vectors[cands], dtype=np.float32) @ q
+            rows, scores = _topk_rows(sims[None, :], k)[0]
+            out.append((cands[rows], scores))
+        return out
+
+
+class HNSWIndex:
+    """
+    Graph-based ANN via the optional `hnswlib` package (pip install hnswlib).
+    """
+
+    def __init__(self, index: Any, n_rows: int, ef: int = HNSW_EF):
+        self.index = index
+        self._n_rows = n_rows
+        self.index.set_ef(max(ef, 1))
+
+    @property
+    def n_rows(self) -> int:
+        return self._n_rows
+
+    @staticmethod
+    def _hnswlib():
+        try:
+            import hnswlib
+        except ImportError as e:
+            raise ImportError("VECTOR_BACKEND=hnsw requires `pip install hnswlib`") from e
+        return hnswlib
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, m: int = 16, ef_construction: int = 200, ef: int = HNSW_EF) -> HNSWIndex:
+        hnswlib = cls._hnswlib()
+        index = hnswlib.Index(space="ip", dim=vectors.shape[1])
+        index.init_index(max_elements=len(vectors), M=m, ef_construction=ef_construction)
+        for lo in range(0, len(vectors), _BLOCK_ROWS):
+            block = np.asarray(vectors[lo:lo + _BLOCK_ROWS], dtype=np.float32)
+            index.add_items(block, np.arange(lo, lo + len(block)))
+        return cls(index, len(vectors), ef=ef)
+
+    @classmethod
+    def load(cls, path: Path, dim: int, n_rows: int, ef: int = HNSW_EF) -> HNSWIndex:
+        index = cls._hnswlib().Index(space="ip", dim=dim)
+        index.load_index(str(path), max_elements=n_rows)
+        return cls(index, n_rows, ef=ef)
+
+    def search_batch(self, queries: np.ndarray, k: int) -> List[Hits]:
+        k = min(k, self.n_rows)
+        labels, dists = self.index.knn_query(normalize(queries), k=k)
+        return [(lab.astype(np.int64), (1.0 - d).astype(np.float32)) for lab, d in zip(labels, dists, strict=True)]
+
+    def search(self, query: np.ndarray, k: int) -> Hits:
+        return self.search_batch(np.asarray(query)[None, :], k)[0]
+
+
+def save_vector_artifact(path: str | Path, embeddings: np.ndarray, keys: Sequence[str],
+                         backends: Sequence[str] = ("exact",), dtype: str = VECTOR_DTYPE) -> None:
+    """
+    Write normalized vectors (+ optional IVF / HNSW structures) to a temp dir and swap it in.
+    Row i corresponds to keys[i], i.e. the same row order as the BM25 artifact.
+    """
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    vectors = normalize(embeddings).astype(dtype)
+    np.save(tmp / "vectors.npy", vectors)
+    if "ivf" in backends and len(vectors):
+        ivf = IVFIndex.build(vectors)
+        np.save(tmp / "ivf_centroids.npy", ivf.centroids)
+        np.save(tmp / "ivf_list_ptr.npy", ivf.list_ptr)
+        np.save(tmp / "ivf_list_rows.npy", ivf.list_rows)
+    if "hnsw" in backends and len(vectors):
+        HNSWIndex.build(vectors).index.save_index(str(tmp / "hnsw.bin"))
+    if "int8" in backends:
+        from retail_rag_sim.retrieval.quantized import quantize_int8
+        codes, scale = quantize_int8(vectors)
+        np.save(tmp / "int8_codes.npy", codes)
+        np.save(tmp / "int8_scale.npy", scale)
+    if "binary" in backends:
+        from retail_rag_sim.retrieval.quantized import quantize_binary
+        np.save(tmp / "binary_codes.npy", quantize_binary(vectors))
+
+    meta = {"format_version": FORMAT_VERSION, "n_rows": len(vectors), "dim": int(vectors.shape[1]) if len(vectors) else 0,
+            "dtype": dtype, "keys_sha256": keys_fingerprint(keys), "backends": sorted(set(backends) | {"exact"})}
+    (tmp / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+
+    old = path.with_name(path.name + ".old")
+    shutil.rmtree(old, ignore_errors=True)
+    if path.exists():
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def load_vector_meta(path: str | Path) -> Optional[Dict[str, Any]]:
+    meta_path = Path(path) / "meta.json"
+    if not meta_path.exists():
+        return None
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    if meta.get("format_version") != FORMAT_VERSION:
+        return None
+    return meta
+
+
+def load_vector_index(path: str | Path, backend: str, mmap: bool = True):
+    path = Path(path)
+    meta = load_vector_meta(path)
+    if meta is None:
+        raise FileNotFoundError(f"No vector artifact at {path}")
+    if backend not in meta["backends"]:
+        raise ValueError(f"Vector artifact at {path} was built without {backend!r}; re-run ingest "
+                         f"with VECTOR_BACKEND={backend}")
+    if backend == "hnsw":
+        return HNSWIndex.load(path / "hnsw.bin", dim=meta["dim"], n_rows=meta["n_rows"])
+    if backend in ("int8", "binary"):
+        from retail_rag_sim.retrieval.quantized import BinaryIndex, Int8Index
+        # full-precision rows stay memory-mapped (whatever `mmap` says) and are only touched for rescoring
+        full = np.load(path / "vectors.npy", mmap_mode="r")
+        if backend == "int8":
+            return Int8Index(np.load(path / "int8_codes.npy"), np.load(path / "int8_scale.npy"), full)
+        return BinaryIndex(np.load(path / "binary_codes.npy"), full)
+    vectors = np.load(path / "vectors.npy", mmap_mode="r" if mmap else None)
+    if backend == "ivf":
+        return IVFIndex(vectors, np.load(path / "ivf_centroids.npy"), np.load(path / "ivf_list_ptr.npy"),
+                        np.load(path / "ivf_list_rows.npy"))
+    return ExactIndex(vectors)
+
+
+class DenseVectorRetriever:
+    """
+    Vector leg backed by an in-process index. Rows line up with the BM25 corpus, so
+    `search_rows` hands integer ids straight to fusion.
+    """
+
+    def __init__(self, index, embeddings, docs: List[Document], k: int = 4):
+        self.index = index
+        self.embeddings = embeddings
+        self.docs = docs
+        self.k = k
+
+    def search_rows(self, query: str) -> Hits:
+        return self.index.search(np.asarray(self.embeddings.embed_query(query), dtype=np.float32), self.k)
+
+    def search_rows_batch(self, queries: List[str]) -> List[Hits]:
+        # one embeddings request for the whole batch, through the query-side hook where there is one
+        vecs = np.asarray(embed_queries(self.embeddings, queries), dtype=np.float32)
+        return self.index.search_batch(vecs, self.k)
+
+    def invoke(self, query: str) -> List[Document]:
+        rows, _ = self.search_rows(query)
+        return [self.docs[i] for i in rows]
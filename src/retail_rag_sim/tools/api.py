@@ -16,3 +16,10 @@ def call_api(path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, An
         r = client.get(url, params=params or {})
         r.raise_for_status()
         return r.json()
+
+async def acall_api(path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    url = BASE_URL.rstrip("/") + "/" + path.lstrip("/")
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        r = await client.get(url, params=params or {})
+        r.raise_for_status()
+        return r.json()
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import os
 import sqlite3
 from typing import Any, Dict, List
@@ -26,5 +27,9 @@ def run_select(sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
     finally:
         conn.close()
 
+async def arun_select(sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+    """sqlite3 has no async driver; run the (short, read-only) query off the event loop."""
+    return await asyncio.to_thread(run_select, sql, params)
+
 def dollars(cents: int) -> str:
     return f"${cents/100:.2f}"
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import os
 import smtplib
 from email.message import EmailMessage
@@ -28,3 +29,7 @@ def send_gmail_smtp(to_email: str, subject: str, body: str) -> str:
         smtp.send_message(msg)
 
     return "sent"
+
+async def asend_gmail_smtp(to_email: str, subject: str, body: str) -> str:
+    """smtplib is blocking; run it off the event loop."""
+    return await asyncio.to_thread(send_gmail_smtp, to_email, subject, body)
@@ -3,8 +3,12 @@ import re
 
 EMAIL_RE = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
 PHONE_RE = re.compile(r"\b(?:\+?1[-.\s]?)?(?:\(?\d{3}\)?[-.\s]?){2}\d{4}\b")
+ORDER_ID_RE = re.compile(r"\bR-\d+\b|(?<=order )#?\d+\b", re.IGNORECASE)
 
 def redact_pii(text: str) -> str:
     text = EMAIL_RE.sub("[REDACTED_EMAIL]", text)
     text = PHONE_RE.sub("[REDACTED_PHONE]", text)
     return text
+
+def redact_order_ids(text: str) -> str:
+    return ORDER_ID_RE.sub("[REDACTED_ORDER_ID]", text)
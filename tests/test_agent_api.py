@@ -0,0 +1,48 @@
+import threading
+
+from fastapi.testclient import TestClient
+
+import retail_rag_sim.retrieval.reranker as reranker
+from api.agent_api import app
+from retail_rag_sim.retrieval.reranker import RerankService
+
+
+class FakeCrossEncoder:
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        return [0.0 for _ in pairs]
+
+
+def test_readyz_is_503_until_the_reranker_has_loaded(monkeypatch):
+    release = threading.Event()
+
+    def slow_loader():
+        release.wait(5)
+        return FakeCrossEncoder()
+
+    svc = RerankService(loader=slow_loader, batch_window_ms=0, tokens_dir=None)
+    monkeypatch.setattr(reranker, "_service", svc)
+    with TestClient(app) as client:  # the lifespan starts the background warm-up
+        assert client.get("/healthz").json() == {"status": "ok"}
+        r = client.get("/readyz")
+        assert r.status_code == 503 and r.json() == {"ready": False}
+
+        release.set()
+        svc.warm_up(block=True)
+        r = client.get("/readyz")
+        assert r.status_code == 200 and r.json() == {"ready": True}
+
+
+def test_status_reports_reranker_and_retriever(monkeypatch):
+    def broken():
+        raise ImportError("No module named 'sentence_transformers'")
+
+    svc = RerankService(loader=broken, batch_window_ms=0, tokens_dir=None)
+    monkeypatch.setattr(reranker, "_service", svc)
+    with TestClient(app) as client:
+        svc.warm_up(block=True)
+        assert client.get("/readyz").status_code == 200  # failed loads are ready too (reranking off)
+        body = client.get("/status").json()
+    assert set(body) == {"reranker", "retriever"}
+    assert body["reranker"]["ready"] and not body["reranker"]["model_loaded"]
+    assert "sentence_transformers" in body["reranker"]["disabled_reason"]
+    assert {"builds", "version", "loaded"} <= set(body["retriever"])
@@ -0,0 +1,50 @@
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from retail_rag_sim.agents.answer_cache import SemanticAnswerCache
+
+RESULT = {
+    "answer": "Returns are accepted within 14 days.",
+    "plan": {"intent": "returns", "needs_db": False, "needs_api": False, "needs_email": False},
+    "citations": [{"id": 1, "source": "returns.md", "excerpt": "...", "chunk_id": "c1"}],
+    "tool_outputs": [{"tool": "retrieve_kb", "args": {}, "output": {}}],
+    "confidence": 0.9,
+    "recommended_action": "answer",
+}
+
+
+def test_hit_on_normalized_repeat_and_stale_on_chunk_change():
+    live = {"c1"}
+    cache = SemanticAnswerCache(DeterministicFakeEmbedding(size=16), live_chunks=lambda: live)
+    assert cache.store("What is the return window?", RESULT)
+    hit = cache.lookup("  what is the RETURN window  ")
+    assert hit["answer"] == RESULT["answer"] and hit["cache"]["hit"]
+
+    live.clear()
+    assert cache.lookup("what is the return window") is None
+    assert cache.stats()["stale"] == 1
+
+
+def test_personal_questions_are_never_cached():
+    cache = SemanticAnswerCache(DeterministicFakeEmbedding(size=16))
+    assert not cache.store("What is the total on order R-10002?", RESULT)
+    assert cache.lookup("What is the total on order R-10002?") is None
+    assert cache.stats()["bypassed"] == 1
+
+
+def test_live_chunks_resolved_outside_the_lock_and_counters_locked():
+    cache = SemanticAnswerCache(DeterministicFakeEmbedding(size=16))
+    held = []
+
+    def live_chunks():
+        held.append(cache._lock.locked())
+        return {"c1"}
+
+    cache.live_chunks = live_chunks
+    assert cache.store("What is the return window?", RESULT)
+    assert cache.lookup("what is the return window")["cache"]["hit"]
+    assert held == [False]
+
+    cache.embeddings = None  # embed_query now raises
+    assert cache.lookup("what is the return window") is None
+    assert cache.stats()["errors"] == 1 and cache.stats()["hits"] == 1
+
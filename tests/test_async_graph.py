@@ -0,0 +1,74 @@
+import asyncio
+import threading
+import time
+
+from langchain_core.documents import Document
+
+import retail_rag_sim.agents.graph as graph
+from retail_rag_sim.llms.fake import HashingEmbeddings, ScriptedChatModel
+from retail_rag_sim.retrieval.bm25 import BM25Retriever
+from retail_rag_sim.retrieval.retriever import HybridRetriever
+from retail_rag_sim.retrieval.vector_index import DenseVectorRetriever, ExactIndex, normalize
+
+DOCS = [
+    Document(page_content="In-store pickup orders can be returned within 14 days with a receipt.",
+             metadata={"source": "data/docs/returns.md", "chunk_id": "r1"}),
+    Document(page_content="Gift cards cannot be redeemed for cash.",
+             metadata={"source": "data/docs/gift_cards.md", "chunk_id": "g1"}),
+]
+QUESTION = "What is the return window for in-store pickup?"
+
+
+def _setup(monkeypatch, token_ms=0.0):
+    emb = HashingEmbeddings(dim=64, latency_ms=0)
+    vectors = normalize(emb.embed_documents([d.page_content for d in DOCS]))
+    retr = HybridRetriever(bm25=BM25Retriever.from_documents(DOCS),
+                           vector_retriever=DenseVectorRetriever(ExactIndex(vectors), emb, DOCS))
+    threads = []
+
+    def get_retriever():
+        threads.append(threading.current_thread() is threading.main_thread())
+        return retr
+
+    model = ScriptedChatModel(token_ms=token_ms)
+    monkeypatch.setattr(graph, "get_retriever", get_retriever)
+    monkeypatch.setattr(graph, "rerank", lambda q, docs, top_k=5, fused_scores=None: [(d, 0.0) for d in docs][:top_k])
+    monkeypatch.setattr(graph, "get_chat_model", lambda role=None: model)
+    monkeypatch.setattr(graph, "get_tool_model", lambda tools, role="executor": model.bind_tools(tools))
+    monkeypatch.setattr(graph, "get_answer_cache", lambda: None)
+    monkeypatch.setattr(graph, "get_intent_classifier", lambda: None)
+    return threads
+
+
+def test_achat_runs_tools_async_and_builds_retriever_off_the_loop(monkeypatch):
+    threads = _setup(monkeypatch)
+    result = asyncio.run(graph.achat(QUESTION))
+    assert "14 days" in result["answer"]
+    assert result["citations"][0]["source"] == "data/docs/returns.md"
+    assert threads == [False]
+
+    state = asyncio.run(graph.GRAPH.ainvoke(graph._initial_state(QUESTION)))
+    assert state["tool_outputs"][0]["tool"] == "retrieve_kb"
+
+
+
+def test_astream_chat_matches_achat(monkeypatch):
+    _setup(monkeypatch)
+
+    async def collect():
+        return [e async for e in graph.astream_chat(QUESTION, hold_sensitive=False)]
+
+    events = asyncio.run(collect())
+    assert events[-1]["type"] == "final"
+    streamed = "".join(e["text"] for e in events if e["type"] in ("token", "footer"))
+    assert streamed == events[-1]["result"]["answer"]
+    assert events[-1]["result"]["answer"] == asyncio.run(graph.achat(QUESTION))["answer"]
+
+
+def test_answer_tokens_are_sent_as_they_are_generated(monkeypatch):
+    _setup(monkeypatch, token_ms=30)
+    arrivals = [(time.monotonic(), e["type"]) for e in graph.stream_chat(QUESTION, hold_sensitive=False)]
+    tokens = [t for t, kind in arrivals if kind == "token"]
+    assert len(tokens) > 5
+    # ~30 ms per generated token: buffering the turn would deliver them all at once
+    assert tokens[-1] - tokens[0] > 0.1
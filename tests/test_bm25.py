@@ -0,0 +1,43 @@
+from langchain_core.documents import Document
+
+from retail_rag_sim.retrieval.bm25 import BM25Retriever
+from retail_rag_sim.retrieval.chunk_store import ChunkStore, doc_key
+
+DOCS = [
+    Document(page_content="Returns are accepted within 14 days of pickup.", metadata={"source": "returns.md"}),
+    Document(page_content="Store hours vary by location.", metadata={"source": "ops.md"}),
+    Document(page_content="Refunds go back to the original payment method.", metadata={"source": "refunds.md"}),
+]
+
+
+def test_bm25_ranks_matching_doc_first():
+    retr = BM25Retriever.from_documents(DOCS, k=2)
+    hits = retr.search("return window for pickup")
+    assert hits[0][0].metadata["source"] == "returns.md"
+    assert retr.search("nonexistent term") == []
+
+
+def test_bm25_artifact_roundtrip(tmp_path):
+    retr = BM25Retriever.from_documents(DOCS, k=3)
+    retr.save(tmp_path / "bm25")
+    loaded = BM25Retriever.load(tmp_path / "bm25", k=3)
+    assert [(d.page_content, round(s, 5)) for d, s in loaded.search("store hours")] == \
+        [(d.page_content, round(s, 5)) for d, s in retr.search("store hours")]
+
+
+def test_bm25_batch_matches_single_queries():
+    retr = BM25Retriever.from_documents(DOCS, k=2)
+    queries = ["return pickup", "store hours", "nothing here", "original payment refunds"]
+    assert retr.batch_invoke(queries) == [retr.invoke(q) for q in queries]
+
+
+def test_artifact_corpus_is_a_lazy_chunk_store(tmp_path):
+    docs = DOCS + [Document(page_content="Gift cards — no cash value.", metadata={"chunk_id": "g1", "page": 2}),
+                   Document(page_content="No metadata at all.")]
+    BM25Retriever.from_documents(docs).save(tmp_path / "bm25")
+    loaded = BM25Retriever.load(tmp_path / "bm25")
+    store = loaded.docs
+    assert isinstance(store, ChunkStore) and len(store) == len(docs)
+    assert list(store) == docs and store[-1] == docs[-1]
+    assert store.chunk_keys() == [doc_key(d) for d in docs]
+    assert store.sources == ["returns.md", "ops.md", "refunds.md"]
@@ -0,0 +1,50 @@
+from langchain_core.embeddings import Embeddings
+
+from retail_rag_sim.llms.embedding_cache import CachedEmbeddings
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += len(texts)
+        return [[float(len(t)), 1.0] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_cache_skips_inner_on_repeat(tmp_path):
+    inner = CountingEmbeddings()
+    emb = CachedEmbeddings(inner, model="m", path=str(tmp_path / "cache.sqlite3"))
+    assert emb.embed_documents(["a", "bb", "a"]) == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+    assert emb.embed_documents(["bb"]) == [[2.0, 1.0]]
+    assert inner.calls == 2
+    assert emb.stats()["hits"] == 1
+
+
+def test_query_and_document_embeddings_are_cached_apart(tmp_path):
+    inner = CountingEmbeddings()
+    inner.embed_query = lambda text: [float(len(text)), 3.0]
+    emb = CachedEmbeddings(inner, model="m", path=str(tmp_path / "cache.sqlite3"))
+    assert emb.embed_documents(["bb"]) == [[2.0, 1.0]]
+    assert emb.embed_query("bb") == [2.0, 3.0]
+    assert emb.embed_query("bb") == [2.0, 3.0] and emb.embed_documents(["bb"]) == [[2.0, 1.0]]
+    assert emb.stats()["hits"] == 2 and emb.stats()["misses"] == 2
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    emb = CachedEmbeddings(CountingEmbeddings(), model="m", path=str(tmp_path / "cache.sqlite3"), max_entries=10)
+    emb.embed_documents([str(i) * (i + 1) for i in range(12)])
+    assert emb.stats()["entries"] <= 10
+
+
+def test_embed_queries_sends_misses_in_one_request(tmp_path):
+    inner = CountingEmbeddings()
+    requests = []
+    inner.embed_queries = lambda texts: requests.append(texts) or [[float(len(t)), 2.0] for t in texts]
+    emb = CachedEmbeddings(inner, model="m", path=str(tmp_path / "cache.sqlite3"))
+    assert emb.embed_queries(["a", "bb", "a"]) == [[1.0, 2.0], [2.0, 2.0], [1.0, 2.0]]
+    assert emb.embed_queries(["bb", "ccc"]) == [[2.0, 2.0], [3.0, 2.0]]
+    assert requests == [["a", "bb"], ["ccc"]] and inner.calls == 0
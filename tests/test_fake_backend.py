@@ -0,0 +1,32 @@
+import json
+
+import numpy as np
+from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+
+from retail_rag_sim.agents.graph import TOOLS
+from retail_rag_sim.agents.prompts import PLANNER_INSTRUCTIONS, SYSTEM_BRAND_TONE
+from retail_rag_sim.llms.fake import HashingEmbeddings, ScriptedChatModel
+
+
+def test_scripted_model_plans_calls_tools_then_answers_from_outputs():
+    model = ScriptedChatModel()
+    plan = json.loads(model.invoke([SystemMessage(content=PLANNER_INSTRUCTIONS),
+                                    HumanMessage(content="How much tax did I pay on order R-10002?")]).content)
+    assert plan["intent"] == "order_status" and plan["needs_db"]
+
+    messages = [SystemMessage(content=SYSTEM_BRAND_TONE), HumanMessage(content="Tax on order R-10002?")]
+    resp = model.bind_tools(TOOLS).invoke(messages)
+    assert [tc["name"] for tc in resp.tool_calls] == ["db_select", "retrieve_kb"]
+
+    rows = {"rows": [{"order_id": "R-10002", "tax_cents": 1250}]}
+    messages += [resp, ToolMessage(content=json.dumps(rows), tool_call_id=resp.tool_calls[0]["id"])]
+    answer = model.bind_tools(TOOLS).invoke(messages)
+    assert not answer.tool_calls and "1250" in answer.content
+
+
+def test_hashing_embeddings_are_deterministic_and_lexically_similar():
+    emb = HashingEmbeddings(dim=256)
+    a, b, c = (np.array(emb.embed_query(t)) for t in
+               ["return window for pickup orders", "pickup orders return window", "store hours in Chicago"])
+    assert np.allclose(a, emb.embed_documents(["return window for pickup orders"])[0])
+    assert a @ b > 0.8 and a @ c < 0.5
@@ -0,0 +1,17 @@
+import numpy as np
+
+from retail_rag_sim.retrieval.fusion import fuse, fuse_batch
+
+
+def test_rrf_rewards_agreement_and_reports_per_source():
+    res = fuse([(np.array([3, 1]), None), (np.array([1, 7]), None)], weights=(0.4, 0.6), k0=60)
+    assert res.ids.tolist()[0] == 1
+    assert np.allclose(res.per_source[0], [0.4 / 62, 0.6 / 61])
+
+
+def test_batch_matches_single_and_combmnz():
+    q1 = [(np.array([2, 5]), np.array([3.0, 1.0])), (np.array([5]), None)]
+    q2 = [(np.array([], dtype=np.int64), None), (np.array([9, 2]), None)]
+    batch = fuse_batch([q1, q2], weights=(1.0, 1.0), method="combmnz")
+    assert batch[0].ids.tolist() == fuse(q1, weights=(1.0, 1.0), method="combmnz").ids.tolist() == [5, 2]
+    assert batch[1].ids.tolist() == [9, 2]
@@ -0,0 +1,41 @@
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from retail_rag_sim.retrieval.ingest import sync_index
+
+
+class FakeStore:
+    def __init__(self):
+        self.docs = {}
+
+    def get(self, include=None):
+        return {"ids": list(self.docs)}
+
+    def add_documents(self, docs, ids):
+        self.docs.update(zip(ids, docs, strict=True))
+
+    def delete(self, ids):
+        for i in ids:
+            self.docs.pop(i, None)
+
+
+def test_reingest_only_touches_delta(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "a.md").write_text("Returns within 14 days.", encoding="utf-8")
+    (docs / "b.md").write_text("Pickup needs ID.", encoding="utf-8")
+    manifest = tmp_path / "manifest.json"
+    splitter = RecursiveCharacterTextSplitter(chunk_size=900, chunk_overlap=120)
+    store = FakeStore()
+
+    first = sync_index(store, str(docs), manifest, splitter)
+    assert first["chunks_added"] == 2 and len(store.docs) == 2
+
+    again = sync_index(store, str(docs), manifest, splitter)
+    assert again["chunks_added"] == 0 and again["files_unchanged"] == 2
+
+    (docs / "a.md").write_text("Returns within 30 days.", encoding="utf-8")
+    (docs / "b.md").unlink()
+    delta = sync_index(store, str(docs), manifest, splitter)
+    assert (delta["files_updated"], delta["files_deleted"]) == (1, 1)
+    assert (delta["chunks_added"], delta["chunks_deleted"]) == (1, 2)
+    assert [d.page_content for d in store.docs.values()] == ["Returns within 30 days."]
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from langchain_core.tools import tool
+
+from retail_rag_sim.llms import factory
+from retail_rag_sim.llms.http_pool import LoopLocalAsyncClient
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@tool
+def lookup(query: str) -> str:
+    """Look something up."""
+    return query
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def fresh_registry(monkeypatch):
+    monkeypatch.setattr(factory, "_chat_models", {})
+    monkeypatch.setattr(factory, "_tool_models", {})
+    monkeypatch.setattr(factory, "_http_clients", None)
+    monkeypatch.setattr(factory, "_model_stats", dict.fromkeys(factory._model_stats, 0))
+
+
+def test_async_client_survives_sequential_event_loops(server_url):
+    client = LoopLocalAsyncClient(limits=httpx.Limits(max_keepalive_connections=5))
+
+    async def get():
+        r = await client.get(server_url)
+        return r.text, client.for_loop()
+
+    first_text, first_pool = asyncio.run(get())
+    second_text, second_pool = asyncio.run(get())
+    assert first_text == second_text == "ok"
+    assert first_pool is not second_pool
+
+
+def test_async_pool_is_reused_within_a_loop(server_url):
+    client = LoopLocalAsyncClient()
+
+    async def run():
+        await asyncio.gather(*(client.get(server_url) for _ in range(4)))
+        pool = client.for_loop()
+        await client.get(server_url)
+        return pool is client.for_loop(), len(client.clients())
+
+    assert asyncio.run(run()) == (True, 1)
+
+
+def test_registry_shares_models_per_name(monkeypatch, fresh_registry):
+    monkeypatch.setattr(factory, "LLM_BACKEND", "fake")
+    monkeypatch.setenv("OPENAI_MODEL", "m-default")
+    monkeypatch.setenv("OPENAI_MODEL_VERIFIER", "m-verifier")
+    assert factory.get_chat_model("planner") is factory.get_chat_model("executor")
+    assert factory.get_chat_model("verifier") is not factory.get_chat_model("planner")
+
+    bound = factory.get_tool_model([lookup])
+    assert factory.get_tool_model([lookup]) is bound
+    stats = factory.chat_pool_stats()
+    assert stats["models"] == ["m-default", "m-verifier"]
+    assert stats["models_created"] == 2 and stats["tool_models_created"] == 1 and stats["tool_models_reused"] == 1
+
+
+def test_openai_models_share_one_loop_local_async_client(monkeypatch, fresh_registry):
+    monkeypatch.setattr(factory, "LLM_BACKEND", "openai")
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("OPENAI_MODEL_VERIFIER", "m-verifier")
+    planner, verifier = factory.get_chat_model("planner"), factory.get_chat_model("verifier")
+    assert isinstance(planner.http_async_client, LoopLocalAsyncClient)
+    assert planner.http_async_client is verifier.http_async_client
+    assert factory.chat_pool_stats()["async_pool"]["loops"] == 0
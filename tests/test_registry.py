@@ -0,0 +1,19 @@
+from retail_rag_sim.retrieval.registry import RetrieverRegistry
+
+
+def test_registry_builds_once_and_rebuilds_on_version_change():
+    version = {"v": "1"}
+    built = []
+
+    def builder():
+        built.append(object())
+        return built[-1]
+
+    reg = RetrieverRegistry(builder=builder, version_fn=lambda: version["v"], check_interval=0.0)
+    first = reg.get()
+    assert reg.get() is first
+    assert reg.stats()["builds"] == 1
+
+    version["v"] = "2"
+    assert reg.get() is not first
+    assert reg.stats()["builds"] == 2
@@ -0,0 +1,153 @@
+import threading
+
+from langchain_core.documents import Document
+
+from retail_rag_sim.llms.fake import HashingEmbeddings
+from retail_rag_sim.retrieval.bm25 import BM25Retriever
+from retail_rag_sim.retrieval.rerank_tokens import PassageTokens
+from retail_rag_sim.retrieval.reranker import RerankService, score_margin, stage1_scores
+from retail_rag_sim.retrieval.retriever import HybridRetriever
+from retail_rag_sim.retrieval.vector_index import DenseVectorRetriever, ExactIndex, normalize
+
+
+class FakeCrossEncoder:
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.calls.append(len(pairs))
+        return [float(len(set(q.split()) & set(t.split()))) for q, t in pairs]
+
+
+DOCS = [Document(page_content=t, metadata={"chunk_id": f"c{i}"}) for i, t in enumerate(
+    ["store hours chicago", "return window is 14 days", "return an opened laptop within the window"])]
+
+
+def test_scores_are_cached_per_query_and_chunk():
+    model = FakeCrossEncoder()
+    svc = RerankService(loader=lambda: model, batch_window_ms=0)
+    ranked = svc.rerank("return window laptop", DOCS, top_k=2)
+    assert [d.metadata["chunk_id"] for d, _ in ranked] == ["c2", "c1"]
+    svc.rerank("return  window laptop", DOCS + [Document(page_content="gift cards", metadata={"chunk_id": "c9"})])
+    assert model.calls == [3, 1]  # only the new chunk is scored again
+    assert svc.stats()["cache_hits"] == 3
+
+
+def test_concurrent_requests_share_a_batch():
+    model = FakeCrossEncoder()
+    svc = RerankService(loader=lambda: model, batch_window_ms=50, max_batch=64)
+    barrier = threading.Barrier(4)
+
+    def one(i):
+        barrier.wait()
+        svc.rerank(f"query {i} return", DOCS)
+
+    threads = [threading.Thread(target=one, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(model.calls) == 12 and len(model.calls) < 4
+    assert svc.stats()["mean_requests_per_batch"] > 1
+
+
+def test_missing_model_keeps_retriever_order():
+    def broken():
+        raise ImportError("No module named 'sentence_transformers'")
+    svc = RerankService(loader=broken)
+    assert [s for _, s in svc.rerank("q", DOCS)] == [0.0, 0.0, 0.0]
+    assert "sentence_transformers" in svc.stats()["disabled_reason"]
+
+
+def test_cascade_skips_clear_winner_and_prunes_the_rest():
+    model = FakeCrossEncoder()
+    svc = RerankService(loader=lambda: model, batch_window_ms=0, cascade=True, skip_margin=0.3, cascade_keep=2)
+    ranked = svc.rerank("return window laptop", DOCS, top_k=2, fused_scores=[0.1, 0.2, 0.9])
+    assert [d.metadata["chunk_id"] for d, _ in ranked] == ["c2", "c1"] and model.calls == []
+
+    ranked = svc.rerank("return window laptop", DOCS, top_k=3, fused_scores=[0.48, 0.50, 0.49])
+    assert model.calls == [2]  # "store hours chicago" covers no query term and is pruned
+    assert [d.metadata["chunk_id"] for d, _ in ranked] == ["c2", "c1", "c0"]
+    assert ranked[-1][1] == float("-inf")
+    st = svc.stats()
+    assert st["cascade_skipped_margin"] == 1 and st["cascade_pruned_pairs"] == 1
+
+
+def test_skip_margin_is_a_real_knob_on_rrf_output():
+    emb = HashingEmbeddings(dim=64, latency_ms=0)
+    retr = HybridRetriever(bm25=BM25Retriever.from_documents(DOCS), method="rrf",
+                           vector_retriever=DenseVectorRetriever(
+                               ExactIndex(normalize(emb.embed_documents([d.page_content for d in DOCS]))), emb, DOCS))
+    query = "return window laptop"
+    scored = retr.invoke_with_scores(query)
+    docs, fused = [d for d, _ in scored], [s["fused"] for _, s in scored]
+    gap = score_margin(stage1_scores(query, docs, fused))
+    assert max(fused) - min(fused) < 0.01 < gap  # raw RRF scores are bunched up
+
+    skips = []
+    for margin in (gap - 0.05, gap + 0.05):
+        model = FakeCrossEncoder()
+        svc = RerankService(loader=lambda m=model: m, batch_window_ms=0, cascade=True, skip_margin=margin)
+        svc.rerank(query, docs, fused_scores=fused)
+        skips.append(svc.stats()["cascade_skipped_margin"] == 1 and model.calls == [])
+    assert skips == [True, False]
+
+
+def test_background_warm_up_sets_ready_and_records_timings():
+    release = threading.Event()
+    model = FakeCrossEncoder()
+
+    def slow_loader():
+        release.wait(5)
+        return model
+
+    svc = RerankService(loader=slow_loader, batch_window_ms=0, ready_timeout=0.01)
+    svc.warm_up()
+    assert not svc.ready.is_set() and svc.stats()["warming_up"]
+    ranked = svc.rerank("return window", DOCS)  # still loading: retriever order, no wait
+    assert [s for _, s in ranked] == [0.0, 0.0, 0.0] and svc.stats()["not_ready_fallbacks"] == 1
+
+    release.set()
+    svc.warm_up(block=True)
+    st = svc.stats()
+    assert st["ready"] and st["model_loaded"] and st["load_seconds"] > 0 and st["warmup_seconds"] is not None
+    assert model.calls == [1]  # the dummy warm-up prediction
+
+
+def test_pairs_are_truncated_and_length_bucketed(tmp_path):
+    long_text = "return policy " * 200
+    docs = [Document(page_content=t, metadata={"chunk_id": f"b{i}"})
+            for i, t in enumerate(["return window", long_text, "laptop return window details", "return"])]
+    PassageTokens(max_tokens=16).save(tmp_path, docs)
+    tokens = PassageTokens(max_tokens=16)
+    assert tokens.load(tmp_path) and len(tokens) == 4
+
+    seen = []
+
+    class RecordingCrossEncoder(FakeCrossEncoder):
+        def predict(self, pairs, batch_size=32, show_progress_bar=False):
+            seen.append([len(t) for _, t in pairs])
+            return super().predict(pairs, batch_size)
+
+    model = RecordingCrossEncoder()
+    svc = RerankService(loader=lambda: model, batch_window_ms=0, bucket_size=2, tokens_dir=str(tmp_path),
+                        max_passage_tokens=16)
+    ranked = svc.rerank("return window", docs, top_k=4)
+    assert seen[0] == sorted(seen[0]) and max(seen[0]) <= 16 * 4  # shortest first, long chunk cut
+    assert {d.metadata["chunk_id"] for d, _ in ranked[:2]} == {"b0", "b2"}
+    st = svc.stats()
+    assert st["token_lengths_cached"] == 4 and st["truncated_passages"] == 1
+    assert st["padded_tokens"] < st["unbucketed_padded_tokens"]
+
+
+def test_corrupt_token_artifact_does_not_disable_reranking(tmp_path):
+    PassageTokens().save(tmp_path, DOCS)
+    (tmp_path / "n_tokens.npy").write_bytes(b"not a numpy file")
+    model = FakeCrossEncoder()
+    svc = RerankService(loader=lambda: model, batch_window_ms=0, tokens_dir=str(tmp_path))
+    ranked = svc.rerank("return window laptop", DOCS, top_k=2)
+    assert [d.metadata["chunk_id"] for d, _ in ranked] == ["c2", "c1"] and model.calls == [3]
+    st = svc.stats()
+    assert st["model_loaded"] and st["disabled_reason"] is None
+    assert st["token_artifact_error"].startswith("ValueError")
+    assert st["token_lengths_cached"] == 3  # measured on first use instead
@@ -0,0 +1,114 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+
+from retail_rag_sim.retrieval.bm25 import BM25Retriever
+from retail_rag_sim.retrieval.retriever import HybridRetriever
+from retail_rag_sim.retrieval.vector_index import DenseVectorRetriever, ExactIndex
+
+DOCS = [
+    Document(page_content="Returns are accepted within 14 days of pickup.", metadata={"chunk_id": "r1"}),
+    Document(page_content="Store hours vary by location.", metadata={"chunk_id": "h1"}),
+]
+
+
+class SlowVectorLeg:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.release = threading.Event()
+
+    def invoke(self, query):
+        self.release.wait(self.delay)
+        return [DOCS[1]]
+
+
+def test_slow_leg_times_out_and_is_tracked_until_it_finishes():
+    vector = SlowVectorLeg(delay=5)
+    retr = HybridRetriever(bm25=BM25Retriever.from_documents(DOCS), vector_retriever=vector, leg_timeout=0.05)
+    t0 = time.monotonic()
+    docs = retr.invoke("return pickup")
+    assert time.monotonic() - t0 < 1
+    assert [d.metadata["chunk_id"] for d in docs] == ["r1"]
+    assert retr.leg_timeouts == {"bm25": 0, "vector": 1} and retr.late_legs == 1
+
+    vector.release.set()
+    for _ in range(100):
+        if retr.late_legs == 0:
+            break
+        time.sleep(0.01)
+    assert retr.late_legs == 0
+
+
+
+def test_async_slow_leg_is_tracked_until_it_finishes():
+    vector = SlowVectorLeg(delay=5)
+    retr = HybridRetriever(bm25=BM25Retriever.from_documents(DOCS), vector_retriever=vector, leg_timeout=0.05)
+    docs = asyncio.run(retr.ainvoke("return pickup"))
+    assert [d.metadata["chunk_id"] for d in docs] == ["r1"]
+    assert retr.leg_timeouts == {"bm25": 0, "vector": 1} and retr.late_legs == 1
+
+    vector.release.set()
+    for _ in range(100):
+        if retr.late_legs == 0:
+            break
+        time.sleep(0.01)
+    assert retr.late_legs == 0
+
+def test_concurrent_legs_match_sequential():
+    vector = SlowVectorLeg(delay=0)
+    bm25 = BM25Retriever.from_documents(DOCS)
+    seq = HybridRetriever(bm25=bm25, vector_retriever=vector, concurrent=False).invoke_with_scores("store hours")
+    conc = HybridRetriever(bm25=bm25, vector_retriever=vector, concurrent=True).invoke_with_scores("store hours")
+    assert seq == conc and conc[0][0].metadata["chunk_id"] == "h1"
+
+
+class BatchCountingEmbeddings:
+    """Asymmetric embedder stand-in with a query-side batch hook; records every request."""
+
+    def __init__(self):
+        self.batches = []
+
+    def embed_query(self, text):
+        return [1.0, 0.0] if "return" in text else [0.0, 1.0]
+
+    def embed_queries(self, texts):
+        self.batches.append(list(texts))
+        return [self.embed_query(t) for t in texts]
+
+    def embed_documents(self, texts):
+        raise AssertionError("queries embedded with embed_documents despite the query hook")
+
+
+class FakeVectorStore:
+    def __init__(self):
+        self.embeddings = BatchCountingEmbeddings()
+
+    def similarity_search_by_vector_with_relevance_scores(self, embedding, k=4):
+        return [(DOCS[0], 0.1), (DOCS[1], 0.9)] if embedding[0] else [(DOCS[1], 0.1)]
+
+    def similarity_search_with_score(self, query, k=4):
+        return self.similarity_search_by_vector_with_relevance_scores(self.embeddings.embed_query(query), k)
+
+
+class FakeStoreRetriever:
+    def __init__(self):
+        self.vectorstore = FakeVectorStore()
+        self.search_kwargs = {"k": 2}
+
+
+def test_batch_invoke_embeds_the_batch_in_one_request():
+    bm25 = BM25Retriever.from_documents(DOCS)
+    queries = ["return pickup", "store hours", "return window"]
+    store = FakeStoreRetriever()
+    retr = HybridRetriever(bm25=bm25, vector_retriever=store)
+    assert retr.batch_invoke(queries) == [retr.invoke(q) for q in queries]
+    assert store.vectorstore.embeddings.batches == [queries]
+
+    emb = BatchCountingEmbeddings()
+    vectors = np.asarray([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+    retr = HybridRetriever(bm25=bm25, vector_retriever=DenseVectorRetriever(ExactIndex(vectors), emb, DOCS, k=1))
+    assert retr.batch_invoke(queries) == [retr.invoke(q) for q in queries]
+    assert emb.batches == [queries]
@@ -0,0 +1,48 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from retail_rag_sim.agents import speculative
+from retail_rag_sim.agents.speculative import SpeculativeRetriever
+
+
+def _slow_search(query):
+    time.sleep(0.01)
+    return {"citations": [query]}
+
+
+def test_matching_query_claims_speculation(monkeypatch):
+    spec = SpeculativeRetriever(_slow_search, min_overlap=0.5)
+    monkeypatch.setattr(speculative, "_speculator", spec)
+    with speculative.speculate("What is the return window for electronics?"):
+        fut = speculative.claim("return window electronics")
+        assert fut.result()[0] == {"citations": ["What is the return window for electronics?"]}
+        assert speculative.claim("return window electronics") is None  # claimed once
+    assert spec.stats()["hits"] == 1 and spec.stats()["unused"] == 0
+
+
+def test_unrelated_query_or_personal_input_is_not_reused(monkeypatch):
+    spec = SpeculativeRetriever(_slow_search, min_overlap=0.5)
+    monkeypatch.setattr(speculative, "_speculator", spec)
+    with speculative.speculate("What is the return window for electronics?"):
+        assert speculative.claim("store hours downtown") is None
+    with speculative.speculate("Where is order R-10002?"):
+        assert speculative.claim("order R-10002") is None
+    stats = spec.stats()
+    assert stats["mismatched"] == 1 and stats["unused"] == 1 and stats["skipped"] == 1
+    assert speculative.claim("anything") is None  # outside a turn
+
+
+def test_concurrent_claims_get_the_speculation_once():
+    spec = SpeculativeRetriever(_slow_search, min_overlap=0.5)
+    speculation = spec.start("What is the return window for electronics?")
+    barrier = threading.Barrier(8)
+
+    def race():
+        barrier.wait()
+        return speculation.claim("return window electronics")
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(race) for _ in range(8)]
+    assert sum(f.result() is not None for f in futures) == 1
+    assert spec.stats()["hits"] == 1
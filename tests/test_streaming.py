@@ -0,0 +1,87 @@
+import contextvars
+import json
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+
+import retail_rag_sim.agents.graph as graph
+from retail_rag_sim.agents import speculative
+from retail_rag_sim.agents.speculative import SpeculativeRetriever
+
+
+class FakeToolModel(GenericFakeChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def _fake_model(sensitivity):
+    replies = iter([
+        AIMessage(content=json.dumps({"intent": "returns", "needs_retrieval": False, "sensitivity": sensitivity})),
+        AIMessage(content="Returns are accepted within 14 days."),
+        AIMessage(content=json.dumps({"grounded": True, "confidence": 0.9, "recommended_action": "answer"})),
+    ])
+    return FakeToolModel(messages=replies)
+
+
+def _run(monkeypatch, sensitivity):
+    model = _fake_model(sensitivity)
+    monkeypatch.setattr(graph, "get_chat_model", lambda role=None: model)
+    monkeypatch.setattr(graph, "get_tool_model", lambda tools, role="executor": model)
+    monkeypatch.setattr(graph, "get_answer_cache", lambda: None)
+    monkeypatch.setattr(graph, "get_intent_classifier", lambda: None)
+    return list(graph.stream_chat("What is the return window?", hold_sensitive=True))
+
+
+def test_tokens_stream_before_footer_and_match_final_answer(monkeypatch):
+    events = _run(monkeypatch, "low")
+    tokens = [e for e in events if e["type"] == "token"]
+    assert len(tokens) > 1
+    assert [e["type"] for e in events[-2:]] == ["footer", "final"]
+    streamed = "".join(e["text"] for e in events if e["type"] in ("token", "footer"))
+    assert streamed == events[-1]["result"]["answer"]
+
+
+def test_high_sensitivity_draft_is_held_until_verified(monkeypatch):
+    events = _run(monkeypatch, "high")
+    assert [e["type"] for e in events] == ["token", "footer", "final"]
+    assert events[0]["text"] == "Returns are accepted within 14 days."
+
+
+def test_text_of_tool_calling_turns_and_tool_results_is_not_streamed():
+    stream = graph._AnswerStream(hold_sensitive=False)
+    meta = {"langgraph_node": "executor"}
+    parts = [
+        ("updates", {"planner": {"plan": {"sensitivity": "low"}}}),
+        ("messages", (AIMessageChunk(content="", id="t1", tool_call_chunks=[
+            {"name": "retrieve_kb", "args": "{}", "id": "c1", "index": 0}]), meta)),
+        ("messages", (AIMessageChunk(content="Let me check.", id="t1"), meta)),
+        ("messages", (AIMessageChunk(content="", id="t1", chunk_position="last"), meta)),
+        ("messages", (ToolMessage(content='{"citations": []}', tool_call_id="c1"), meta)),
+        ("messages", (AIMessageChunk(content="\n Returns are", id="t2"), meta)),
+        ("messages", (AIMessageChunk(content=" accepted within 14 days. \n", id="t2"), meta)),
+        ("messages", (AIMessageChunk(content="", id="t2", chunk_position="last"), meta)),
+        ("updates", {"executor": {"final_answer": "\n Returns are accepted within 14 days. \n"}}),
+    ]
+    events = [e for mode, payload in parts for e in stream.feed(mode, payload)]
+    assert [e["text"] for e in events] == ["Returns are", " accepted within 14 days."]
+
+    verified = {"final_answer": "Returns are accepted within 14 days.\n\nConfidence: 0.90 | Next: answer",
+                "confidence": 0.9, "recommended_action": "answer"}
+    footer = stream.feed("updates", {"verifier": verified})
+    assert footer == [{"type": "footer", "text": "\n\nConfidence: 0.90 | Next: answer"}]
+
+
+def test_stream_closed_from_another_context_finishes_speculation(monkeypatch):
+    model = _fake_model("low")
+    spec = SpeculativeRetriever(lambda q: ({"citations": []}), min_overlap=0.5)
+    monkeypatch.setattr(speculative, "_speculator", spec)
+    monkeypatch.setattr(graph, "get_chat_model", lambda role=None: model)
+    monkeypatch.setattr(graph, "get_tool_model", lambda tools, role="executor": model)
+    monkeypatch.setattr(graph, "get_answer_cache", lambda: None)
+    monkeypatch.setattr(graph, "get_intent_classifier", lambda: None)
+
+    events = graph.stream_chat("What is the return window?")
+    assert contextvars.copy_context().run(next, events)["type"] == "token"
+    contextvars.copy_context().run(events.close)
+    assert spec.stats()["unused"] == 1
+    assert speculative.claim("return window") is None
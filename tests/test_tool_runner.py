@@ -0,0 +1,98 @@
+import asyncio
+import contextvars
+import threading
+import time
+
+import pytest
+from langchain_core.tools import StructuredTool
+
+from retail_rag_sim.agents import tool_runner
+from retail_rag_sim.agents.tool_runner import arun_tool_calls, run_tool_calls
+
+REQUEST_ID = contextvars.ContextVar("request_id", default=None)
+
+
+def _tool(name, fn):
+    return StructuredTool.from_function(fn, name=name, description=name)
+
+
+def _calls(*names_args):
+    return [{"name": n, "args": a, "id": f"c{i}"} for i, (n, a) in enumerate(names_args)]
+
+
+def test_results_keep_call_order_when_later_calls_finish_first():
+    def wait_then_echo(delay: float) -> float:
+        time.sleep(delay)
+        return delay
+
+    tools = {"echo": _tool("echo", wait_then_echo)}
+    delays = [0.15, 0.05, 0.0, 0.1]
+    assert run_tool_calls(_calls(*[("echo", {"delay": d}) for d in delays]), tools) == delays
+    assert asyncio.run(arun_tool_calls(_calls(*[("echo", {"delay": d}) for d in delays]), tools)) == delays
+
+
+def test_per_tool_semaphore_caps_in_flight_calls(monkeypatch):
+    monkeypatch.setitem(tool_runner.TOOL_CONCURRENCY, "capped_tool", 2)
+    lock = threading.Lock()
+    state = {"now": 0, "max": 0}
+
+    def capped(i: int) -> int:
+        with lock:
+            state["now"] += 1
+            state["max"] = max(state["max"], state["now"])
+        time.sleep(0.05)
+        with lock:
+            state["now"] -= 1
+        return i
+
+    tools = {"capped_tool": _tool("capped_tool", capped)}
+    assert run_tool_calls(_calls(*[("capped_tool", {"i": i}) for i in range(6)]), tools) == list(range(6))
+    assert state["max"] == 2
+
+
+def test_exception_in_one_tool_is_raised_after_the_others_finish():
+    finished = threading.Event()
+
+    def boom() -> str:
+        raise RuntimeError("db down")
+
+    def slow() -> str:
+        time.sleep(0.1)
+        finished.set()
+        return "ok"
+
+    tools = {"boom": _tool("boom", boom), "slow": _tool("slow", slow)}
+    with pytest.raises(RuntimeError, match="db down"):
+        run_tool_calls(_calls(("boom", {}), ("slow", {})), tools)
+    assert finished.is_set()
+    assert run_tool_calls(_calls(("slow", {}), ("missing", {})), tools) == ["ok", {"error": "Unknown tool missing"}]
+
+
+
+def test_async_tool_error_waits_for_sync_tools():
+    finished = threading.Event()
+
+    async def aboom() -> str:
+        raise RuntimeError("api down")
+
+    def slow() -> str:
+        time.sleep(0.1)
+        finished.set()
+        return "ok"
+
+    tools = {"aboom": StructuredTool.from_function(coroutine=aboom, name="aboom", description="aboom"),
+             "slow": _tool("slow", slow)}
+    with pytest.raises(RuntimeError, match="api down"):
+        run_tool_calls(_calls(("slow", {}), ("aboom", {}), ("slow", {})), tools)
+    assert finished.is_set()
+
+def test_contextvars_reach_worker_threads():
+    def read_request_id(i: int) -> str:
+        return f"{REQUEST_ID.get()}:{threading.current_thread().name.startswith('tools')}"
+
+    tools = {"ctx": _tool("ctx", read_request_id)}
+    token = REQUEST_ID.set("req-42")
+    try:
+        assert run_tool_calls(_calls(("ctx", {"i": 0}), ("ctx", {"i": 1})), tools) == ["req-42:True"] * 2
+    finally:
+        REQUEST_ID.reset(token)
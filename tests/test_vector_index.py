@@ -0,0 +1,46 @@
+import numpy as np
+
+from retail_rag_sim.retrieval.vector_index import (
+    ExactIndex,
+    IVFIndex,
+    load_vector_index,
+    normalize,
+    save_vector_artifact,
+)
+
+
+def test_exact_and_ivf_agree_after_roundtrip(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(200, 16)).astype(np.float32)
+    save_vector_artifact(tmp_path / "vec", vectors, [str(i) for i in range(200)], backends=["ivf"])
+
+    exact = load_vector_index(tmp_path / "vec", "exact")
+    rows, scores = exact.search(vectors[17], k=3)
+    assert rows[0] == 17 and abs(scores[0] - 1.0) < 1e-5
+
+    ivf = load_vector_index(tmp_path / "vec", "ivf")
+    assert isinstance(ivf, IVFIndex)
+    ivf.nprobe = len(ivf.centroids)
+    assert ivf.search(vectors[5], k=5)[0].tolist() == exact.search(vectors[5], k=5)[0].tolist()
+
+
+def test_quantized_backends_rescore_to_exact_top1(tmp_path):
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(300, 64)).astype(np.float32)
+    save_vector_artifact(tmp_path / "vec", vectors, [str(i) for i in range(300)], backends=["int8", "binary"])
+    for backend in ("int8", "binary"):
+        index = load_vector_index(tmp_path / "vec", backend)
+        rows, scores = index.search(vectors[42], k=3)
+        assert rows[0] == 42 and abs(scores[0] - 1.0) < 1e-5
+
+
+def test_exact_blocked_topk_matches_single_block():
+    rng = np.random.default_rng(2)
+    vectors = normalize(rng.normal(size=(100, 8)))
+    queries = rng.normal(size=(5, 8)).astype(np.float32)
+    whole = ExactIndex(vectors).search_batch(queries, k=4)
+    blocked = ExactIndex(vectors, block_rows=7).search_batch(queries, k=4)
+    for (r1, s1), (r2, s2) in zip(whole, blocked, strict=True):
+        assert r1.tolist() == r2.tolist() and np.allclose(s1, s2)
+    full = normalize(queries) @ vectors.T
+    assert whole[0][0].tolist() == np.argsort(-full[0])[:4].tolist()
@@ -0,0 +1,28 @@
+from retail_rag_sim.agents.verification import VerifierPolicy, deterministic_checks
+
+CITES = [{"id": 1, "source": "returns.md", "excerpt": "Returns are accepted within 14 days.", "chunk_id": "c1"}]
+
+
+def _state(answer, citations=(), sensitivity="low", tool_outputs=()):
+    return {"final_answer": answer, "citations": list(citations), "tool_outputs": list(tool_outputs),
+            "plan": {"sensitivity": sensitivity}}
+
+
+def test_deterministic_checks():
+    assert deterministic_checks(_state("You can return it within 14 days.", CITES)) == []
+    assert deterministic_checks(_state("You can return it within 30 days.", CITES)) == ["number_not_in_sources"]
+    assert deterministic_checks(_state("Our return policy is generous.")) == ["policy_claim_without_citation"]
+    rows = [{"tool": "db_select", "output": {"rows": [{"total": 107.25}]}}]
+    assert deterministic_checks(_state("Your total was $107.25.", tool_outputs=rows)) == []
+
+
+def test_llm_verifier_only_when_needed():
+    policy = VerifierPolicy(mode="conditional")
+    assert policy.decide(_state("You can return it within 14 days.", CITES))["recommended_action"] == "answer"
+    assert policy.decide(_state("You can return it within 14 days.", CITES, sensitivity="high")) is None
+    assert policy.decide(_state("You can return it within 30 days.", CITES)) is None
+    policy.record_llm(0.5)
+    stats = policy.stats()
+    assert (stats["skipped"], stats["llm_high_sensitivity"], stats["llm_checks_failed"]) == (1, 1, 1)
+    assert stats["est_ms_saved"] == 500.0
+    assert VerifierPolicy(mode="always").decide(_state("Hello!", CITES)) is None
@@ -0,0 +1,56 @@
+import json
+
+from retail_rag_sim.agents.verifier_payload import build_verifier_payload
+
+ROWS = [{"order_id": f"R-{10000 + i}", "status": "picked_up", "tax": 7.25 + i, "total": 107.25 + i,
+         "notes": "x" * 200} for i in range(50)]
+CITE = {"id": 1, "source": "returns.md", "excerpt": "Returns are accepted within 14 days. " * 5, "chunk_id": "c1"}
+
+
+def test_rows_are_cut_to_referenced_fields_and_citations_deduped():
+    draft = "Order R-10002 had $9.25 tax, total $109.25."
+    tools = [{"tool": "db_select", "args": {"sql": "SELECT * FROM orders"}, "output": {"rows": ROWS}},
+             {"tool": "retrieve_kb", "args": {"query": "tax"}, "output": {"citations": [CITE, CITE]}}]
+    text, stats = build_verifier_payload(draft, [CITE, dict(CITE, id=2)], tools, budget=1000)
+    payload = json.loads(text)
+    db = payload["tool_outputs"][0]["output"]
+    assert db["rows"] == [{"order_id": "R-10002", "tax": 9.25, "total": 109.25}]
+    assert db["omitted_rows"] == 49
+    assert len(payload["citations"]) == 1
+    assert stats["tokens_saved"] > 0 and stats["tokens_compact"] < stats["tokens_full"]
+
+
+def test_budget_is_enforced_without_touching_the_draft():
+    draft = "Returns are accepted within 14 days."
+    cites = [dict(CITE, id=i, chunk_id=f"c{i}") for i in range(20)]
+    text, stats = build_verifier_payload(draft, cites, [], budget=200)
+    assert stats["tokens_compact"] <= 200
+    assert json.loads(text)["draft_answer"] == draft
+
+
+SLOTS = {"store_id": "ST-CHI-01", "service": "consultation",
+         "slots": [{"date": "2026-10-18", "time": t, "service": "consultation"} for t in ("11:00", "15:30", "18:10")]}
+INVENTORY = {"store_id": "ST-CHI-01", "sku": "SKU-HEADPHONES-01", "available": True, "qty": 7, "pickup_eta": "Today"}
+
+
+def test_outputs_within_budget_are_passed_through():
+    draft = "Yes, they are available for pickup today, and there are consultation slots at 11:00 and 15:30."
+    tools = [{"tool": "inventory_lookup", "args": {}, "output": INVENTORY},
+             {"tool": "appointment_slots", "args": {}, "output": SLOTS}]
+    payload = json.loads(build_verifier_payload(draft, [], tools, budget=10_000)[0])
+    assert [t["output"] for t in payload["tool_outputs"]] == [INVENTORY, SLOTS]
+
+
+def test_compaction_keeps_booleans_lists_and_separator_variants():
+    draft = "Order R-10002 was picked up; 7 headphones are in stock for pickup today. Slots: 11:00, 15:30."
+    rows = [{"order_id": "R-10001", "status": "ready_for_pickup", "notes": "x" * 4000},
+            {"order_id": "R-10002", "status": "picked_up", "notes": "x" * 4000}]
+    tools = [{"tool": "db_select", "args": {}, "output": {"rows": rows}},
+             {"tool": "inventory_lookup", "args": {}, "output": INVENTORY},
+             {"tool": "appointment_slots", "args": {}, "output": SLOTS}]
+    text, stats = build_verifier_payload(draft, [], tools, budget=1000)
+    db, inventory, slots = [t["output"] for t in json.loads(text)["tool_outputs"]]
+    assert stats["tokens_compact"] <= 1000
+    assert db["rows"] == [{"order_id": "R-10002", "status": "picked_up"}]
+    assert inventory == {"available": True, "qty": 7, "pickup_eta": "Today"}
+    assert slots["slots"] == SLOTS["slots"]
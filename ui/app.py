@@ -2,9 +2,19 @@ import streamlit as st
 from dotenv import load_dotenv
 load_dotenv()
 
-from retail_rag_sim.agents.graph import chat
+from retail_rag_sim.agents.graph import stream_chat  # noqa: E402
+from retail_rag_sim.retrieval.reranker import reranker_stats, warm_up_reranker  # noqa: E402
 
 st.set_page_config(page_title="Retail RAG Concierge (Sanitized)", layout="wide")
+
+
+@st.cache_resource
+def _warm_up():
+    # once per server process: load the reranker in the background while the first page renders
+    return warm_up_reranker()
+
+
+_warm_up()
 st.title("Customer Service RAG")
 st.caption("LangChain + LangGraph A2A + Hybrid Retrieval + Tool Calling + LangSmith-ready")
 
@@ -15,12 +25,6 @@ if "last_debug" not in st.session_state:
 
 user_msg = st.chat_input("Ask about returns, pickup, store hours, orders, appointments...")
 
-if user_msg:
-    st.session_state.history.append(("user", user_msg))
-    out = chat(user_msg)
-    st.session_state.history.append(("assistant", out["answer"]))
-    st.session_state.last_debug = out
-
 col1, col2 = st.columns([2, 1])
 
 with col1:
@@ -28,6 +32,25 @@ with col1:
         with st.chat_message(role):
             st.write(msg)
 
+    if user_msg:
+        st.session_state.history.append(("user", user_msg))
+        with st.chat_message("user"):
+            st.write(user_msg)
+
+        final = {}
+
+        def _text_events():
+            for event in stream_chat(user_msg):
+                if event["type"] == "final":
+                    final.update(event["result"])
+                else:
+                    yield event["text"]
+
+        with st.chat_message("assistant"):
+            st.write_stream(_text_events())
+        st.session_state.history.append(("assistant", final["answer"]))
+        st.session_state.last_debug = final
+
 with col2:
     st.subheader("Debug / Observability")
     if st.session_state.last_debug:
@@ -41,3 +64,6 @@ with col2:
             st.write(st.session_state.last_debug.get("tool_outputs", []))
     else:
         st.info("Send a message to see plan, tools, and citations.")
+    with st.expander("Reranker status"):
+        rs = reranker_stats()
+        st.json({k: rs[k] for k in ("ready", "model_loaded", "disabled_reason", "load_seconds", "warmup_seconds")})